@@ -0,0 +1,39 @@
+#Benchmark of the command line conversion with a cold and a warm model cache
+#Run from the repository root with: python benchmarks/bench_cli.py
+#Each conversion runs in a new process, as a reporting job would. Total times include starting Python and
+#importing sammi, and conversion times are the times reported by the command
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)),'..')
+
+#Run the command line in a new process, returning the total and the conversion seconds
+def convert(args,folder):
+    start = time.perf_counter()
+    out = subprocess.check_output([sys.executable,'-m','sammi'] + args,cwd = folder,
+        env = dict(os.environ,PYTHONPATH = ROOT + os.pathsep + os.environ.get('PYTHONPATH',''),PYTHONWARNINGS = 'ignore')).decode()
+    return time.perf_counter() - start,float(re.search(r'in ([0-9.]+) s',out).group(1))
+
+if __name__ == '__main__':
+    import cobra
+    data = os.path.join(os.path.dirname(cobra.__file__),'data')
+    folder = tempfile.mkdtemp()
+    try:
+        print('%-12s %-10s %12s %12s %12s %12s' % ('model','parse','cold total','warm total','cold conv.','warm conv.'))
+        for name in ['textbook.xml.gz','salmonella.xml.gz','iJO1366.xml.gz']:
+            if not os.path.isfile(os.path.join(data,name)):
+                continue
+            for parse in [[],['--parse','subsystem']]:
+                cache = os.path.join(folder,'cache')
+                shutil.rmtree(cache,ignore_errors = True)
+                args = [os.path.join(data,name),'-o','out.html','--cache',cache] + parse
+                cold = convert(args,folder)
+                warm = min(convert(args,folder) for i in range(3))
+                print('%-12s %-10s %12.2f %12.2f %12.3f %12.3f' % (name.split('.')[0],parse[1] if parse else 'whole',cold[0],warm[0],cold[1],warm[1]))
+    finally:
+        shutil.rmtree(folder,ignore_errors = True)
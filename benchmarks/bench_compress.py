@@ -0,0 +1,66 @@
+#Benchmark of file size, write time and load time of plain and compressed pages
+#Run from the repository root with: python benchmarks/bench_compress.py
+#Load times are measured with node (if found on the path) as the time to inflate and compile the payload
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.realpath(__file__)),'..'))
+import sammi
+from bench_makejson import loadModel
+
+#Node script timing the decompression and compilation of the code in a page
+NODEJS = r'''
+const fs = require('fs');
+const html = fs.readFileSync(process.argv[2],'utf8');
+const code = html.slice(html.indexOf('setdisplay()') + 12,html.lastIndexOf('},1000)'));
+const m = code.match(/inflatePayload\("([^"]*)","([a-z]*)"\)/);
+const t = performance.now();
+if (m) {
+    const bytes = Buffer.from(m[1],'base64');
+    new Response(new Blob([bytes]).stream().pipeThrough(new DecompressionStream(m[2]))).text().then(function(c) {
+        new Function(c);
+        console.log(performance.now() - t);
+    })
+} else {
+    new Function(code);
+    console.log(performance.now() - t);
+}
+'''
+
+#Random data layers for the model
+def makeData(model,ncond = 3):
+    rx = [f.id for f in model.reactions]
+    met = [m.id for m in model.metabolites]
+    cond = ['c' + str(i) for i in range(ncond)]
+    return [sammi.data('reactions','color',np.random.rand(len(rx),ncond),rx,cond),
+        sammi.data('reactions','size',np.random.rand(len(rx),ncond),rx,cond),
+        sammi.data('metabolites','color',np.random.rand(len(met),ncond),met,cond)]
+
+#Time to load the page code in node, in milliseconds
+def loadTime(path,jsfile):
+    if shutil.which('node') is None:
+        return float('nan')
+    return float(subprocess.check_output(['node',jsfile,path]).decode().strip())
+
+if __name__ == '__main__':
+    folder = os.path.join(sammi.__path__[0],'browser')
+    jsfile = os.path.join(tempfile.mkdtemp(),'load.js')
+    open(jsfile,'w').write(NODEJS)
+    print('%-12s %-8s %12s %10s %10s' % ('model','compress','size (MB)','write (s)','load (ms)'))
+    for name in ['textbook','salmonella','ecoli']:
+        model = loadModel(name)
+        datat = makeData(model)
+        for method in [None,'gzip','deflate']:
+            html = 'bench_compress.html'
+            t = time.perf_counter()
+            sammi.plot(model,datat = datat,opts = sammi.options(htmlName = html,load = False,compress = method))
+            t = time.perf_counter() - t
+            path = os.path.join(folder,html)
+            print('%-12s %-8s %12.3f %10.3f %10.1f' % (name,str(method),os.path.getsize(path)/1e6,t,loadTime(path,jsfile)))
+            os.remove(path)
@@ -0,0 +1,47 @@
+#Benchmark of frame times of the salmonella subsystem maps, with the simulation in the page and in a Web Worker
+#Run from the repository root with: python benchmarks/bench_frames.py
+#Pages are measured with a headless Chrome or Chromium if one is found on the path. Otherwise open the written
+#pages in a browser; frame times are logged to the console and shown in the page title once measured
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.realpath(__file__)),'..'))
+import sammi
+from bench_makejson import loadModel
+
+#Measurement time in milliseconds. The map is panned every frame while the simulation runs
+DURATION = 10000
+JSCODE = 'measureFrames(' + str(DURATION) + ',true,function(res) {document.title = "frames " + JSON.stringify(res)})'
+
+#Find a headless browser
+def findBrowser():
+    for f in ['google-chrome','google-chrome-stable','chromium','chromium-browser','chrome']:
+        if shutil.which(f) is not None:
+            return shutil.which(f)
+    return None
+
+#Measure a page in a headless browser, returning the frame statistics
+def measure(browser,path):
+    html = subprocess.check_output([browser,'--headless','--disable-gpu','--allow-file-access-from-files',
+        '--virtual-time-budget=' + str(DURATION + 10000),'--dump-dom','file://' + path],stderr = subprocess.DEVNULL).decode()
+    m = re.search(r'<title>frames (\{.*?\})</title>',html)
+    return json.loads(m.group(1).replace('&quot;','"')) if m else None
+
+if __name__ == '__main__':
+    folder = os.path.join(sammi.__path__[0],'browser')
+    model = loadModel('salmonella')
+    browser = findBrowser()
+    print('%-8s %8s %8s %10s %10s %10s' % ('mode','nodes','frames','mean (ms)','p95 (ms)','max (ms)'))
+    for worker in [False,True]:
+        name = 'bench_frames_' + ('worker' if worker else 'page') + '.html'
+        sammi.plot(model,'subsystem',opts = sammi.options(htmlName = name,load = False,jscode = JSCODE,worker = worker))
+        path = os.path.join(folder,name)
+        res = measure(browser,path) if browser is not None else None
+        if res is None:
+            print('%-8s written to %s' % ('worker' if worker else 'page',path))
+        else:
+            print('%-8s %8d %8d %10.2f %10.2f %10.2f' % ('worker' if res['worker'] else 'page',res['nodes'],res['frames'],res['mean'],res['p95'],res['max']))
@@ -0,0 +1,52 @@
+#Benchmark of the time taken to import sammi, checked against a budget
+#Run from the repository root with: python benchmarks/bench_import.py
+#Each import runs in a new process, as a worker process or command line job would, and the time of starting
+#Python alone is subtracted. Imports over the budget, or importing modules that sammi should only load when
+#used, are listed as regressions and the script exits with 1
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.realpath(__file__)),'..')
+
+#Modules loaded on first use only
+HEAVY = ['cobra','numpy','scipy','pandas','asyncio','urllib.request','webbrowser','concurrent.futures']
+
+#Best time of repeat runs of code in a new process
+def run(code,repeat):
+    env = dict(os.environ,PYTHONPATH = ROOT + os.pathsep + os.environ.get('PYTHONPATH',''),PYTHONWARNINGS = 'ignore')
+    best = float('inf')
+    for i in range(repeat):
+        start = time.perf_counter()
+        subprocess.check_call([sys.executable,'-c',code],env = env)
+        best = min(best,time.perf_counter() - start)
+    return best,env
+
+#Modules of HEAVY loaded by importing module
+def loaded(module,env):
+    out = subprocess.check_output([sys.executable,'-c','import sys,' + module + ';print(" ".join(m for m in ' + repr(HEAVY) + ' if m in sys.modules))'],env = env)
+    return out.decode().split()
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description = 'Benchmark importing sammi')
+    ap.add_argument('--repeat',type = int,default = 10,help = 'imports timed for each module')
+    ap.add_argument('--budget',type = float,default = 0.1,help = 'seconds allowed for each import')
+    args = ap.parse_args()
+
+    python,env = run('pass',args.repeat)
+    regressions = []
+    print('%-12s %10s  %s' % ('module','time (s)','heavy modules loaded'))
+    for module in ['sammi','sammi.cli']:
+        t = run('import ' + module,args.repeat)[0] - python
+        heavy = loaded(module,env)
+        print('%-12s %10.3f  %s' % (module,t,' '.join(heavy) if heavy else '-'))
+        if t > args.budget:
+            regressions.append(module + ' takes ' + str(round(t,3)) + ' s to import (budget ' + str(args.budget) + ' s)')
+        if heavy:
+            regressions.append(module + ' imports ' + ', '.join(heavy))
+    for r in regressions:
+        print('Regression: ' + r)
+    if regressions:
+        sys.exit(1)
@@ -0,0 +1,123 @@
+#Benchmark of the Python layout (sammi.forceLayout) against its previous repulsion, which ran every iteration
+#Run from the repository root with: python benchmarks/bench_layout.py
+#Reports the time of each layout, the number of iterations run, and the mean error of the repulsion against the
+#exact sum over all pairs of nodes, for the positions reached by the layout
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.realpath(__file__)),'..'))
+import sammi
+from sammi import layout
+from bench_makejson import loadModel
+
+#Previous repulsion, exact between neighbouring grid cells and between cell centroids otherwise, kept for comparison
+def legacyRepulsion(pos,strength,distanceMax,cellSize,rng):
+    n = len(pos)
+    dmax2 = distanceMax*distanceMax
+    #Small graphs are cheaper to solve exactly
+    if n <= 400:
+        d = pos[None,:,:] - pos[:,None,:]
+        l2 = np.maximum((d*d).sum(2),1.0)
+        w = np.where(l2 < dmax2,strength/l2,0)
+        return np.einsum('ijk,ij->ik',d,w)
+    force = np.zeros_like(pos)
+    #Grid with about cellSize nodes per cell
+    lo = pos.min(0)
+    span = max((pos.max(0) - lo).max(),1e-6)
+    k = max(1,int(np.sqrt(n/cellSize)))
+    cell = np.minimum(((pos - lo)/span*k).astype(int),k - 1)
+    cid = cell[:,0]*k + cell[:,1]
+    order = np.argsort(cid,kind = 'stable')
+    count = np.bincount(cid,minlength = k*k)
+    start = np.concatenate([[0],np.cumsum(count)[:-1]])
+    occ = np.nonzero(count)[0]
+    occcell = np.stack([occ//k,occ % k],1)
+    cen = np.stack([np.bincount(cid,pos[:,0],k*k)[occ],np.bincount(cid,pos[:,1],k*k)[occ]],1)/count[occ,None]
+    #Far field between the centroids of cells that are not neighbours, applied to every node of the cell
+    d = cen[None,:,:] - cen[:,None,:]
+    l2 = np.maximum((d*d).sum(2),1.0)
+    far = (np.abs(occcell[None,:,:] - occcell[:,None,:]).max(2) > 1) & (l2 < dmax2)
+    w = np.where(far,count[occ][None,:]*strength/l2,0)
+    cellforce = np.zeros((k*k,2))
+    cellforce[occ] = (d*w[:,:,None]).sum(1)
+    force += cellforce[cid]
+    #Near field between the nodes of each cell and of the cell itself and its upper and right neighbours
+    a = []
+    b = []
+    for dx,dy in [(0,0),(0,1),(1,-1),(1,0),(1,1)]:
+        nb = occcell + [dx,dy]
+        inside = ((nb >= 0) & (nb < k)).all(1)
+        nbid = nb[inside,0]*k + nb[inside,1]
+        keep = count[nbid] > 0
+        a.append(occ[inside][keep])
+        b.append(nbid[keep])
+    a = np.concatenate(a)
+    b = np.concatenate(b)
+    #Expand each pair of cells to all pairs of their nodes
+    size = count[a]*count[b]
+    block = np.repeat(np.arange(len(a)),size)
+    t = np.arange(size.sum()) - np.repeat(np.cumsum(size) - size,size)
+    ia = t//count[b][block]
+    ib = t % count[b][block]
+    keep = (a[block] != b[block]) | (ia < ib)
+    i = order[start[a[block]] + ia][keep]
+    j = order[start[b[block]] + ib][keep]
+    d = pos[j] - pos[i]
+    #Separate coincident nodes
+    same = (d == 0).all(1)
+    if same.any():
+        d[same] = (rng.random((same.sum(),2)) - 0.5)*1e-6
+    l2 = np.maximum((d*d).sum(1),1.0)
+    w = np.where(l2 < dmax2,strength/l2,0)
+    for c in range(2):
+        force[:,c] += np.bincount(i,d[:,c]*w,n) - np.bincount(j,d[:,c]*w,n)
+    return force
+
+#Exact repulsion over all pairs of nodes, in blocks of rows
+def exactRepulsion(pos,strength,distanceMax):
+    force = np.zeros_like(pos)
+    for s in range(0,len(pos),500):
+        d = pos[None,:,:] - pos[s:s + 500,None,:]
+        l2 = np.maximum((d*d).sum(2),1.0)
+        w = np.where(l2 < distanceMax*distanceMax,strength/l2,0)
+        force[s:s + 500] = np.einsum('ijk,ij->ik',d,w)
+    return force
+
+#Run a layout with a repulsion function, counting iterations and keeping the last positions
+def runLayout(graph,repulsion,**params):
+    calls = []
+    def counted(pos,*args):
+        calls.append(pos.copy())
+        return repulsion(pos,*args)
+    current = layout.repulsion
+    layout.repulsion = counted
+    try:
+        t = time.perf_counter()
+        layout.forceLayout(graph,**params)
+        t = time.perf_counter() - t
+    finally:
+        layout.repulsion = current
+    return t,len(calls),calls[-1]
+
+#Mean error of a repulsion relative to the mean exact force
+def repulsionError(repulsion,pos,*args):
+    exact = exactRepulsion(pos,args[0],args[1])
+    return np.linalg.norm(repulsion(pos,*args) - exact,axis = 1).mean()/np.linalg.norm(exact,axis = 1).mean()
+
+if __name__ == '__main__':
+    p = layout.DEFAULTS
+    print('%-12s %6s %22s %22s %8s' % ('model','nodes','legacy (s, its, err)','new (s, its, err)','speedup'))
+    for name in ['textbook','ecoli','salmonella']:
+        graph = json.loads(sammi.makeJson(loadModel(name)))
+        rng = np.random.default_rng(0)
+        #The previous layout used grid cells of about 8 nodes and always ran every iteration
+        legacy = lambda pos,strength,distanceMax,cellWidth,rng: legacyRepulsion(pos,strength,distanceMax,8,rng)
+        old,oldits,oldpos = runLayout(graph,legacy,tolerance = 0)
+        olderr = repulsionError(legacy,oldpos,-p['charge'],p['distanceMax'],p['cellWidth'],rng)
+        new,newits,newpos = runLayout(graph,layout.repulsion)
+        newerr = repulsionError(layout.repulsion,newpos,-p['charge'],p['distanceMax'],p['cellWidth'],rng)
+        print('%-12s %6d %8.2f %5d %6.3f %10.2f %5d %6.3f %7.1fx' % (name,len(oldpos),old,oldits,olderr,new,newits,newerr,old/new))
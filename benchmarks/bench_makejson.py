@@ -0,0 +1,101 @@
+#Benchmark of the graph serializer against the previous string concatenating implementation
+#Run from the repository root with: python benchmarks/bench_makejson.py
+import os
+import sys
+import time
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.realpath(__file__)),'..'))
+import sammi
+
+#Load one of the bundled cobra test models
+def loadModel(name):
+    import cobra
+    try:
+        return cobra.test.create_test_model(name)
+    except AttributeError:
+        return cobra.io.load_model({'ecoli':'iJO1366'}.get(name,name))
+
+#Previous implementation of sammi.makeJson, kept for comparison
+def legacyMakeJson(model):
+    rxnfields = []
+    for rx in model.reactions:
+        for f in dir(rx):
+            try:
+                if isinstance(getattr(model.reactions[0],f),(str,bool,float,int)) and not f.startswith('_') and not f == 'id' and f not in rxnfields:
+                    rxnfields.append(f)
+            except:
+                pass
+    metfields = []
+    for me in model.metabolites:
+        for f in dir(me):
+            try:
+                if isinstance(getattr(model.metabolites[0],f),(str,bool,float,int)) and not f.startswith('_') and not f == 'id' and f not in metfields:
+                    metfields.append(f)
+            except:
+                pass
+    fd = ['{"id":"' + f.id + '",' for f in model.metabolites]
+    sep = ','
+    for f in metfields:
+        if isinstance(getattr(model.metabolites[0],f),str):
+            fd = [x + '"' + f + '":"' + y + '"' + sep for x,y in zip(fd,[getattr(g,f) for g in model.metabolites])]
+        elif isinstance(getattr(model.metabolites[0],f),bool):
+            fd = [x + '"' + f + '":' + y + sep for x,y in zip(fd,[str(getattr(g,f)).lower() for g in model.metabolites])]
+        else:
+            fd = [x + '"' + f + '":' + y + sep for x,y in zip(fd,[str(getattr(g,f)) for g in model.metabolites])]
+        if metfields.index(f) == len(metfields)-2:
+            sep = '}'
+    fd = [f.replace("\":None,\"","\":NaN,\"") for f in fd]
+    jsonstr = '{"metabolites":[' + ','.join(fd) + '],"reactions":['
+    fd = ['{"id":"' + f.id + '",' for f in model.reactions]
+    for f in rxnfields:
+        if isinstance(getattr(model.reactions[0],f),str):
+            fd = [x + '"' + f + '":"' + y + '",' for x,y in zip(fd,[getattr(g,f) for g in model.reactions])]
+        elif isinstance(getattr(model.reactions[0],f),bool):
+            fd = [x + '"' + f + '":' + y + ',' for x,y in zip(fd,[str(getattr(g,f)).lower() for g in model.reactions])]
+        else:
+            fd = [x + '"' + f + '":' + y + ',' for x,y in zip(fd,[str(getattr(g,f)) for g in model.reactions])]
+    fd = [f.replace("\":None,\"","\":NaN,\"") for f in fd]
+    metarr = [','.join(['"' + str(x) + '":' + str(y) for x,y in zip(z.metabolites.keys(),z.metabolites.values())]) for z in model.reactions ]
+    fd = ','.join([x + '"metabolites":{' + y + '}}' for x,y, in zip(fd,metarr)])
+    return jsonstr + fd + ']}'
+
+#Check that sammi.makeJson writes the same graphs as the previous implementation, for several models in one process.
+#The first model has a metabolite without charge, formula, or compartment, so it is written without these fields
+def checkOutput(models):
+    import json
+    odd = models[0].copy()
+    for f in ['charge','formula','compartment']:
+        setattr(odd.metabolites[0],f,None)
+    for model in [odd] + models:
+        old = json.loads(legacyMakeJson(model))
+        new = json.loads(sammi.makeJson(model))
+        if json.dumps(old,sort_keys = True) != json.dumps(new,sort_keys = True):
+            raise Exception('makeJson output of ' + model.id + ' differs from the previous implementation')
+
+#Best wall time of a few repetitions
+def timeit(fun,model,repeat = 3):
+    best = float('inf')
+    for i in range(repeat):
+        t = time.perf_counter()
+        fun(model)
+        best = min(best,time.perf_counter() - t)
+    return best
+
+if __name__ == '__main__':
+    checkOutput([loadModel('textbook'),loadModel('ecoli')])
+    print('makeJson output matches the previous implementation')
+    print('%-12s %10s %10s %10s %8s' % ('model','legacy (s)','new (s)','cached (s)','speedup'))
+    for name in ['textbook','salmonella','ecoli']:
+        model = loadModel(name)
+        #Without the fragment cache
+        new = timeit(lambda m: sammi.makeJson(m,cache = sammi.cache(0)),model)
+        #Repeated calls with the fragment cache filled
+        sammi.makeJson(model)
+        cached = timeit(sammi.makeJson,model)
+        try:
+            old = timeit(legacyMakeJson,model)
+        except Exception:
+            #The legacy serializer fails on models with missing string fields
+            print('%-12s %10s %10.4f %10.4f %8s' % (name,'failed',new,cached,'-'))
+            continue
+        print('%-12s %10.4f %10.4f %10.4f %7.1fx' % (name,old,new,cached,old/new))
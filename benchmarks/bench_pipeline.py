@@ -0,0 +1,156 @@
+#Benchmark of the stages of the Python render pipeline on the bundled cobra models and on synthetic models
+#Run from the repository root with: python benchmarks/bench_pipeline.py
+#Each stage reports the best wall time of a few runs, the peak memory allocated by Python during one run
+#(measured separately with tracemalloc), and the size of its output. Results are compared with the baselines
+#stored in benchmarks/baselines.json, and stages slower, larger, or using more memory than their baseline by
+#more than the tolerance are listed as regressions. Use --save to store the current results as baselines.
+#Baselines depend on the machine, so store them again before comparing on a different one
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.realpath(__file__)),'..'))
+import sammi
+from bench_makejson import loadModel
+
+BASELINES = os.path.join(os.path.dirname(os.path.realpath(__file__)),'baselines.json')
+
+#Synthetic model with n reactions, about 0.8n metabolites in two compartments, and subsystems of about 50 reactions
+def syntheticModel(n,seed = 0):
+    import cobra
+    rng = np.random.default_rng(seed)
+    nmet = max(2,int(0.8*n))
+    mets = [cobra.Metabolite('m' + str(i) + '_' + c,name = 'Metabolite ' + str(i),compartment = c,formula = 'C' + str(rng.integers(1,20)) + 'H' + str(rng.integers(1,40)))
+        for i,c in zip(range(nmet),rng.choice(['c','e'],nmet,p = [0.8,0.2]))]
+    rxns = []
+    for i in range(n):
+        r = cobra.Reaction('R' + str(i),name = 'Reaction ' + str(i),subsystem = 'Subsystem ' + str(i//50),lower_bound = -1000.0 if rng.random() < 0.3 else 0.0,upper_bound = 1000.0)
+        k = rng.integers(2,5)
+        idx = rng.choice(nmet,k,replace = False)
+        r.add_metabolites({mets[j]:float(-1 if t < k//2 else 1)*rng.integers(1,3) for t,j in enumerate(idx)})
+        rxns.append(r)
+    model = cobra.Model('synthetic' + str(n))
+    model.add_reactions(rxns)
+    return model
+
+#Random data for the reactions of the model, with some missing values
+def makeData(model,ncond,seed = 0):
+    rng = np.random.default_rng(seed)
+    rx = [f.id for f in model.reactions]
+    values = rng.standard_normal((len(rx),ncond))
+    values[rng.random(values.shape) < 0.1] = np.nan
+    return sammi.data('reactions','color',values,rx,['c' + str(i) for i in range(ncond)])
+
+#Size in bytes of the output of a stage: a string, or a file
+def outputBytes(out):
+    if isinstance(out,str) and os.path.isfile(out):
+        return os.path.getsize(out)
+    return len(out.encode('utf-8'))
+
+#Best wall time of repeat runs, peak traced memory of one run, and output size of a stage
+def measure(fun,repeat):
+    best = float('inf')
+    for i in range(repeat):
+        t = time.perf_counter()
+        out = fun()
+        best = min(best,time.perf_counter() - t)
+    del out
+    tracemalloc.start()
+    out = fun()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {'seconds':best,'peak':peak,'bytes':outputBytes(out)}
+
+#Stages depending only on the model
+def modelStages(model,folder):
+    parsers = [sammi.parser(k,v) for k,v in sammi.groupBy(model,'subsystem').items()]
+    rxns = list(model.reactions)
+    opts = sammi.options(htmlName = 'bench_pipeline.html',load = False)
+    #Fill the fragment cache for the cached stage
+    sammi.makeJson(model)
+    def page():
+        sammi.writePage(model,'subsystem',[],[],opts,folder)
+        return os.path.join(folder,opts.htmlName)
+    return [('makeJson',lambda: sammi.makeJson(model,cache = sammi.cache(0))),
+        ('makeJson cached',lambda: sammi.makeJson(model)),
+        ('structParse',lambda: sammi.structParse(model,parsers)),
+        ('makeParseVector',lambda: sammi.makeParseVector(parsers)),
+        ('makeParseIndex',lambda: sammi.makeParseIndex(parsers,rxns)),
+        ('plot subsystem',page)]
+
+#Stages depending on the model and data
+def dataStages(model,dat,folder):
+    opts = sammi.options(htmlName = 'bench_pipeline.html',load = False)
+    binopts = sammi.options(htmlName = 'bench_pipeline.html',load = False,binary = 'float64')
+    def page(o):
+        sammi.writePage(model,[],[dat],[],o,folder)
+        return os.path.join(folder,o.htmlName)
+    return [('makeDataVector',lambda: sammi.makeDataVector(dat)),
+        ('makeDataBlock',lambda: sammi.makeDataBlock(dat)),
+        ('plot data',lambda: page(opts)),
+        ('plot data binary',lambda: page(binopts))]
+
+#Compare results with baselines, returning the regressions. Differences below a floor (5 ms, 1 MB) are noise
+def compare(results,baselines,tolerance):
+    regressions = []
+    for key,res in results.items():
+        if key not in baselines:
+            continue
+        for field,tol,floor in [('seconds',tolerance,0.005),('peak',tolerance,1e6),('bytes',1.01,0)]:
+            base = baselines[key][field]
+            if res[field] > base*tol and res[field] - base > floor:
+                regressions.append((key,field,base,res[field]))
+    return regressions
+
+if __name__ == '__main__':
+    ap = argparse.ArgumentParser(description = 'Benchmark the SAMMIpy render pipeline')
+    ap.add_argument('--models',nargs = '*',default = ['textbook','salmonella','ecoli'],help = 'bundled cobra models')
+    ap.add_argument('--sizes',nargs = '*',type = int,default = [1000,10000,100000],help = 'reactions of the synthetic models')
+    ap.add_argument('--conditions',nargs = '*',type = int,default = [1,10,100,1000],help = 'data conditions')
+    ap.add_argument('--max-cells',type = float,default = 1e7,help = 'largest number of reactions times conditions benchmarked')
+    ap.add_argument('--repeat',type = int,default = 3,help = 'runs timed for each stage')
+    ap.add_argument('--tolerance',type = float,default = 1.5,help = 'ratio to the baseline time or memory reported as a regression')
+    ap.add_argument('--save',action = 'store_true',help = 'store the results as baselines')
+    args = ap.parse_args()
+
+    baselines = json.load(open(BASELINES)) if os.path.isfile(BASELINES) else {}
+    folder = tempfile.mkdtemp()
+    results = {}
+    print('%-18s %6s %-18s %10s %12s %12s %8s' % ('model','conds','stage','time (s)','peak (MB)','output (MB)','vs base'))
+    try:
+        models = [(name,lambda name = name: loadModel(name)) for name in args.models]
+        models += [('synthetic' + str(n),lambda n = n: syntheticModel(n)) for n in args.sizes]
+        for name,load in models:
+            model = load()
+            stages = [(0,s,f) for s,f in modelStages(model,folder)]
+            for c in args.conditions:
+                if len(model.reactions)*c <= args.max_cells:
+                    stages += [(c,s,f) for s,f in dataStages(model,makeData(model,c),folder)]
+            for c,stage,fun in stages:
+                key = name + '|' + str(c) + '|' + stage
+                res = measure(fun,args.repeat)
+                results[key] = res
+                ratio = '%7.2fx' % (res['seconds']/baselines[key]['seconds']) if key in baselines and baselines[key]['seconds'] > 0 else '-'
+                print('%-18s %6s %-18s %10.3f %12.1f %12.2f %8s' % (name,c if c else '-',stage,res['seconds'],res['peak']/1e6,res['bytes']/1e6,ratio))
+                sys.stdout.flush()
+    finally:
+        shutil.rmtree(folder,ignore_errors = True)
+
+    if args.save:
+        baselines.update(results)
+        with open(BASELINES,'w') as f:
+            json.dump(baselines,f,indent = 1,sort_keys = True)
+        print('Saved ' + str(len(results)) + ' baselines to ' + BASELINES)
+    else:
+        regressions = compare(results,baselines,args.tolerance)
+        for key,field,base,val in regressions:
+            print('Regression in ' + key + ': ' + field + ' ' + str(round(val,4)) + ' (baseline ' + str(round(base,4)) + ')')
+        if regressions:
+            sys.exit(1)
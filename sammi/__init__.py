@@ -1,10 +1,36 @@
 name = "sammi"
 
-import cobra
-import cobra.test
-import numpy as np
+import base64
+from collections import OrderedDict
+import copy
+import hashlib
+import io
+import json
 import os
 import re
+import time
+import zlib
+
+from sammi import maps
+from sammi import profiling
+from sammi.maps import savedmap, readMap, reconcileMap
+
+#Functions and classes of submodules, imported on first use. cobra, numpy, and the modules of the server and the
+#asset downloads are only loaded when needed, so importing sammi is fast for short-lived processes
+_lazy = {'assets':'sammi.assets','bundle':'sammi.assets','forceLayout':'sammi.layout','perturbation':'sammi.panel',
+    'fluxPanel':'sammi.panel','fluxData':'sammi.panel','session':'sammi.server'}
+
+def __getattr__(name):
+    if name not in _lazy:
+        raise AttributeError('module \'sammi\' has no attribute \'' + name + '\'')
+    import importlib
+    module = importlib.import_module(_lazy[name])
+    value = module if _lazy[name] == 'sammi.' + name else getattr(module,name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(list(globals()) + list(_lazy))
 
 #Define sammiparser class
 class parser:
@@ -12,12 +38,20 @@ class parser:
     Data to be used in parsing the model into subgraphs. Inputs:
     name: name of the subgraph.
     reactions: reactions to be included in given subgraph.
-    flux: Optional flux values matching reactions. Plotted as reaction color if given.
+    flux: Optional flux values matching reactions. Plotted as reaction color if given. Can also be a pair (ids, values) giving values for only some of the reactions, which is kept as given and written sparsely.
+    fill: Value of reactions not given in a (ids, values) flux pair. Default NaN, which leaves them uncolored.
     """
-    def __init__(self,name,reactions,flux = None):
+    def __init__(self,name,reactions,flux = None,fill = None):
+        import numpy as np
         self.reactions = reactions
         self.name = name
-        self.flux = flux if flux is not None else np.repeat(float('nan'),len(reactions))
+        self.fill = fill if fill is not None else float('nan')
+        self.sparse = isinstance(flux,tuple) and len(flux) == 2 and not np.isscalar(flux[0])
+        if self.sparse:
+            if len(flux[0]) != len(flux[1]):
+                raise Exception('Flux pairs must have one value per id')
+            flux = (list(flux[0]),list(flux[1]))
+        self.flux = flux if flux is not None else np.repeat(self.fill,len(reactions))
 
 #Define SAMMI data class
 class data:
@@ -25,26 +59,65 @@ class data:
     Data to be used to modify the model. Inputs:
     -group: one of three choices: 'reactions', 'metabolites', or 'links'. Indicated which part of the visualization to map the data onto.
     -kind: one of two choices: 'color' or 'size'. The only combination not possible is 'links' and 'color', since link colors are the same as reaction colors.
-    -data: vector of values matching ids.
+    -data: vector of values matching ids. Can be a numpy array, a scipy.sparse matrix, or a pair (ids, values) giving rows of values for only some of the ids.
     -ids: vector of reaction or metabolite IDs.
     -conditions: name of the conditions to use in labeling the data mapped
+    -fill: value of the entries not stored in a sparse data matrix or data pair. Default 0. Use NaN to leave them unmapped.
     """
-    def __init__(self,group,kind,data,ids,conditions):
+    def __init__(self,group,kind,data,ids,conditions,fill = None):
         if group not in ['reactions','metabolites','links']:
             raise Exception('Sammidata first argument must be \'reactions\', \'metabolites\', or \'links\'')
         if kind not in ['color','size']:
             raise Exception('Sammidata second argument must be \'color\' or \'size\'')
         if group == 'links' and kind == 'color':
             raise Exception('Link data does not work with color (link colors are based on reactions node)')
-        if data.shape[0] != len(ids):
+        if isinstance(data,tuple):
+            data = dataPair(data,ids,len(conditions))
+            shape = (len(ids),data[1].shape[1])
+        else:
+            shape = data.shape
+        if shape[0] != len(ids):
             raise Exception('Number of ' + group + ' do not match data size')
-        if data.shape[1] != len(conditions):
+        if shape[1] != len(conditions):
             raise Exception('Number of conditions do not match data size')
         self.group = group
         self.kind = kind
         self.data = data
         self.ids = ids
         self.conditions = conditions
+        self.fill = fill if fill is not None else 0.0
+        self.sparse = hasattr(data,'tocoo') or isinstance(data,tuple)
+
+#Check a data pair (ids, values), returning the ids as a list and the values as a matrix with one row per id
+def dataPair(pair,ids,nconditions):
+    import numpy as np
+    if len(pair) != 2:
+        raise Exception('Data pairs must be (ids, values)')
+    rows = list(pair[0])
+    vals = np.asarray(pair[1],dtype = float)
+    if vals.shape[0] != len(rows):
+        raise Exception('Data pairs must have one row of values per id')
+    if not set(rows) <= set(ids):
+        raise Exception('IDs of data pairs must be in ids')
+    return rows,vals.reshape(len(rows),-1) if len(rows) > 0 else np.zeros((0,nconditions))
+
+#Get the rows, columns, and values of the entries stored in sparse data
+def sparseEntries(dat):
+    import numpy as np
+    if isinstance(dat.data,tuple):
+        pos = {f:i for i,f in enumerate(dat.ids)}
+        rows,vals = dat.data
+        return (np.repeat(np.array([pos[f] for f in rows],dtype = int),vals.shape[1]),
+            np.tile(np.arange(vals.shape[1]),len(rows)),vals.ravel())
+    coo = dat.data.tocoo()
+    return coo.row,coo.col,coo.data
+
+#Get the flux of a parser for each of its reactions
+def parserFlux(cond):
+    if not cond.sparse:
+        return cond.flux
+    vals = dict(zip(*cond.flux))
+    return [vals.get(f,cond.fill) for f in cond.reactions]
 
 #Define default options
 class options:
@@ -53,213 +126,759 @@ class options:
     -htmlName: name of html file to write the visualization to. Default 'index_load.html'. If a previous file with a given name exists overwrites the previous file.
     -load: Boolean. Wheter to open the model on a new browser window or not. If false, use sammi.open to open the file or reload a previously openend window.
     -jscode: Additional javascript code to be run upon loading the model.
+    -binary: False, 'float32', or 'float64'. Whether to embed sammi.data matrices as base64 binary blocks of the given precision instead of text. Default False.
+    -payload: name of a javascript file, next to the html file, to write the model and data to. The page loads this file instead of embedding the model, so several html files can share one payload. Default None (embedded).
+    -compress: None, 'gzip', or 'deflate'. Whether to compress the model and data and embed them as base64, to be inflated by the browser upon loading. Default None.
+    -offline: None, 'local', or 'inline'. Whether to load external scripts and images from the copies shipped with the package or vendored by sammi.bundle(), either referencing them ('local') or embedding them in the html file ('inline'). Default None (load them from the web).
+    -layout: Boolean. Whether to lay out each graph in Python (sammi.forceLayout) so maps open with nodes already in place. Layouts are cached per subgraph in sammi.layoutcache. Default False.
+    -worker: Boolean. Whether to run the force simulation in a Web Worker, so dragging and zooming large maps stays smooth. Falls back to the page if the worker cannot load d3. Default False.
+    -renderer: 'svg' or 'canvas'. Whether to draw nodes, links, and labels as SVG elements or in a canvas. The canvas only draws elements in view and leaves out labels too small to read, so it stays responsive for whole-model maps. Default 'svg'.
+    -chunks: number of conditions per data file. When given, the conditions of each sammi.data are written as binary blocks to separate files next to the html file, and the browser only loads the conditions selected and their neighbours. Default None (embedded).
+    -profile: False, True, or a function. Whether to record the time, object counts, and output size of each stage of sammi.plot, which then returns the report (see sammi.profiling.summary). A function is also called with each stage as it finishes. The page then logs the time of its loading stages to the browser console. Default False.
     """
-    def __init__(self,htmlName = None,load = None,jscode = None):
+    def __init__(self,htmlName = None,load = None,jscode = None,binary = None,payload = None,compress = None,offline = None,layout = None,worker = None,renderer = None,chunks = None,profile = None):
         if htmlName == 'index.html' or htmlName == 'index':
             raise Exception('Output file cannot be named index.html')
+        if binary not in [None,False,'float32','float64']:
+            raise Exception('Option binary must be False, \'float32\', or \'float64\'')
+        if compress not in [None,'gzip','deflate']:
+            raise Exception('Option compress must be None, \'gzip\', or \'deflate\'')
+        if offline not in [None,'local','inline']:
+            raise Exception('Option offline must be None, \'local\', or \'inline\'')
+        if renderer not in [None,'svg','canvas']:
+            raise Exception('Option renderer must be \'svg\' or \'canvas\'')
+        if chunks is not None and (not isinstance(chunks,int) or chunks < 1):
+            raise Exception('Option chunks must be a positive integer')
+        if profile not in [None,False,True] and not callable(profile):
+            raise Exception('Option profile must be a boolean or a function')
         self.htmlName = htmlName if htmlName is not None else 'index_load.html'
         self.load = load if load is not None else True
         self.jscode = jscode if jscode is not None else ''
+        self.binary = binary if binary is not None else False
+        self.payload = payload
+        self.compress = compress
+        self.offline = offline
+        self.layout = layout if layout is not None else False
+        self.worker = worker if worker is not None else False
+        self.renderer = renderer if renderer is not None else 'svg'
+        self.chunks = chunks
+        self.profile = profile if profile is not None else False
 
-#Converts the model to a JSON string to be interpreted by SAMMI
-def makeJson (model):
-    #Get reaction fields to include
-    rxnfields = []
-    for rx in model.reactions:
-        for f in dir(rx):
-            try:
-                if isinstance(getattr(model.reactions[0],f),(str,bool,float,int)) and not f.startswith('_') and not f == 'id' and f not in rxnfields:
-                    rxnfields.append(f)
-            except:
-                pass
-    #Get metabolite fields to include
-    metfields = []
-    for me in model.metabolites:
-        for f in dir(me):
-            try:
-                if isinstance(getattr(model.metabolites[0],f),(str,bool,float,int)) and not f.startswith('_') and not f == 'id' and f not in metfields:
-                    metfields.append(f)
-            except:
-                pass
-    #make metabolite fields
-    fd = ['{"id":"' + f.id + '",' for f in model.metabolites]
-    sep = ','
-    for f in metfields:
-        if isinstance(getattr(model.metabolites[0],f),str):
-            fd = [x + '"' + f + '":"' + y + '"' + sep for x,y in zip(fd,[getattr(g,f) for g in model.metabolites])]
-        elif isinstance(getattr(model.metabolites[0],f),bool):
-            fd = [x + '"' + f + '":' + y + sep for x,y in zip(fd,[str(getattr(g,f)).lower() for g in model.metabolites])]
+#Define cache of graph fragments
+class cache:
+    """
+    Bounded cache of the JSON written for each reaction and metabolite. Entries are keyed on the
+    serialized fields and stoichiometry of each object, so only objects that changed since the last
+    call are encoded again. Inputs:
+    -maxsize: maximum number of fragments to keep. Least recently used fragments are evicted first. Default 200000.
+    """
+    def __init__(self,maxsize = None):
+        self.maxsize = maxsize if maxsize is not None else 200000
+        self.fragments = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self,key):
+        frag = self.fragments.get(key)
+        if frag is None:
+            self.misses += 1
         else:
-            fd = [x + '"' + f + '":' + y + sep for x,y in zip(fd,[str(getattr(g,f)) for g in model.metabolites])]
-        if metfields.index(f) == len(metfields)-2:
-            sep = '}'
-    fd = [f.replace("\":None,\"","\":NaN,\"") for f in fd]
-    #Make JSON string
-    jsonstr = '{"metabolites":[' + ','.join(fd) + '],"reactions":['
-    #make reaction fields
-    fd = ['{"id":"' + f.id + '",' for f in model.reactions]
-    for f in rxnfields:
-        if isinstance(getattr(model.reactions[0],f),str):
-            fd = [x + '"' + f + '":"' + y + '",' for x,y in zip(fd,[getattr(g,f) for g in model.reactions])]
-        elif isinstance(getattr(model.reactions[0],f),bool):
-            fd = [x + '"' + f + '":' + y + ',' for x,y in zip(fd,[str(getattr(g,f)).lower() for g in model.reactions])]
+            self.hits += 1
+            self.fragments.move_to_end(key)
+        return frag
+
+    def put(self,key,frag):
+        if self.maxsize <= 0:
+            return
+        self.fragments[key] = frag
+        if len(self.fragments) > self.maxsize:
+            self.fragments.popitem(last = False)
+
+    def clear(self):
+        self.fragments.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def info(self):
+        return {'hits':self.hits,'misses':self.misses,'size':len(self.fragments),'maxsize':self.maxsize}
+
+#Cache used by default when writing graphs
+graphcache = cache()
+
+#Cache of the layouts of each graph
+layoutcache = cache(1000)
+
+#Encoder used for every graph fragment. NaN is allowed since the output is read as javascript
+_encoder = json.JSONEncoder(separators=(',',':'),default=lambda x: x.item() if hasattr(x,'item') else str(x))
+
+#Get the fields of a reaction or metabolite to be written to the graph
+def getFields(obj):
+    """
+    Returns the names of the fields of obj that are written to the SAMMI graph. These are all public
+    string, boolean, or numeric attributes other than the id. Graphs take the fields of their first
+    reaction and metabolite, as worked out once per graph written.
+    """
+    fields = []
+    for f in dir(obj):
+        if f.startswith('_') or f == 'id':
+            continue
+        try:
+            if isinstance(getattr(obj,f),(str,bool,float,int)):
+                fields.append(f)
+        except:
+            pass
+    return tuple(fields)
+
+#Get the values of the fields of one reaction or metabolite
+def nodeValues(obj,fields):
+    vals = []
+    for f in fields:
+        try:
+            vals.append(getattr(obj,f))
+        except:
+            vals.append(None)
+    return tuple(vals)
+
+#Encode one reaction or metabolite as a JSON object
+def encodeNode(obj,fields,vals,stoich):
+    rec = {'id':obj.id}
+    for f,v in zip(fields,vals):
+        rec[f] = float('nan') if v is None else v
+    if stoich is not None:
+        rec['metabolites'] = dict(stoich)
+    return _encoder.encode(rec)
+
+#Write reactions or metabolites to a buffer as a comma separated list of JSON objects. Returns the number of objects encoded
+def writeNodes(objs,out,stoichiometry = False,cache = None):
+    cache = cache if cache is not None else graphcache
+    cls = None
+    sep = ''
+    encoded = 0
+    for obj in objs:
+        if type(obj) is not cls:
+            cls = type(obj)
+            fields = getFields(obj)
+        #NaN is written as None is, and never equals itself, so it would never match a key in the cache
+        vals = tuple(None if v != v else v for v in nodeValues(obj,fields))
+        stoich = tuple((m.id,v) for m,v in obj.metabolites.items()) if stoichiometry else None
+        #Only encode objects that changed since they were last written
+        key = (cls,obj.id,vals,stoich)
+        frag = cache.get(key)
+        if frag is None:
+            frag = encodeNode(obj,fields,vals,stoich)
+            cache.put(key,frag)
+            encoded += 1
+        out.write(sep)
+        out.write(frag)
+        sep = ','
+    return encoded
+
+#Get the reactions in ids and the metabolites they use, without modifying the model
+def subGraph(model,ids):
+    """
+    Returns the reactions of model whose IDs are in ids, and the metabolites taking part in them, both
+    in model order. IDs not found in the model are ignored. Lookups go through the id indexes kept by
+    the model, so the cost depends on the size of the subgraph and not on the size of the model.
+    """
+    rxpos = sorted(set(model.reactions.index(f) for f in set(ids) if f in model.reactions))
+    rxns = [model.reactions[i] for i in rxpos]
+    metpos = sorted(set(model.metabolites.index(m.id) for r in rxns for m in r.metabolites))
+    mets = [model.metabolites[i] for i in metpos]
+    return rxns,mets
+
+#Lay out reactions and metabolites in the node order of the browser graph
+def layoutGraph(rxns,mets):
+    graph = {'metabolites':[{'id':m.id} for m in mets],
+        'reactions':[{'id':r.id,'metabolites':{m.id:v for m,v in r.metabolites.items()}} for r in rxns]}
+    from sammi.layout import forceLayout
+    return forceLayout(graph,layoutcache)
+
+#Write reactions and metabolites as a JSON graph to a buffer
+def writeGraph(rxns,mets,out,cache = None,layout = False):
+    with profiling.stage('json',out,reactions = len(rxns),metabolites = len(mets)) as rec:
+        out.write('{"metabolites":[')
+        rec['encoded'] = writeNodes(mets,out,False,cache)
+        out.write('],"reactions":[')
+        rec['encoded'] += writeNodes(rxns,out,True,cache)
+        out.write(']')
+    if layout:
+        with profiling.stage('layout',out,nodes = len(rxns) + len(mets)):
+            out.write(',"layout":' + _encoder.encode(layoutGraph(rxns,mets)))
+    out.write('}')
+
+#Write the model as a JSON graph to a buffer
+def writeJson(model,out,reactions = None,cache = None,layout = False):
+    if reactions is None:
+        writeGraph(model.reactions,model.metabolites,out,cache,layout)
+    else:
+        with profiling.stage('subgraph',ids = len(reactions)):
+            rxns,mets = subGraph(model,reactions)
+        writeGraph(rxns,mets,out,cache,layout)
+
+#Converts the model to a JSON string to be interpreted by SAMMI
+def makeJson(model,reactions = None,cache = None):
+    """
+    Converts a COBRA model to the JSON graph read by SAMMI. Inputs:
+    -model: COBRA model to be converted. The model is not modified.
+    -reactions: optional list of reaction IDs. If given only these reactions, and the metabolites taking part in them, are written.
+    -cache: cache object (sammi.cache) with the JSON of previously written reactions and metabolites. Defaults to sammi.graphcache.
+    """
+    out = io.StringIO()
+    writeJson(model,out,reactions,cache)
+    return out.getvalue()
+
+#Group reaction IDs by the values of a reaction or metabolite field
+def groupBy(model,field):
+    """
+    Returns a dictionary mapping each value of a reaction or metabolite field to the IDs of the reactions
+    in that group. For metabolite fields a reaction belongs to every group of the metabolites it uses. Inputs:
+    -model: COBRA model to be grouped.
+    -field: name of a reaction field (e.g. 'subsystem') or, if no reaction has it, of a metabolite field (e.g. 'compartment').
+    Fields holding lists, sets, or tuples add the object to each value they contain. Objects where the field is
+    missing or None are left out. Groups are sorted by value. The index is built in one pass over the model,
+    so edits to the model are always reflected.
+    """
+    #Choose objects to be grouped
+    if len(model.reactions) > 0 and hasattr(model.reactions[0],field):
+        categ = model.reactions
+    elif len(model.metabolites) > 0 and hasattr(model.metabolites[0],field):
+        categ = model.metabolites
+    else:
+        raise Exception('Field ' + field + ' not found in model reactions or metabolites')
+    #Group in one pass. Dictionaries keep reaction IDs unique and in order
+    groups = {}
+    for f in categ:
+        vals = getattr(f,field,None)
+        if vals is None:
+            continue
+        if not isinstance(vals,(list,set,tuple,frozenset)):
+            vals = [vals]
+        if categ is model.reactions:
+            rxns = [f.id]
         else:
-            fd = [x + '"' + f + '":' + y + ',' for x,y in zip(fd,[str(getattr(g,f)) for g in model.reactions])]
-    fd = [f.replace("\":None,\"","\":NaN,\"") for f in fd]
-    #Make metabolites fields
-    metarr = [','.join(['"' + str(x) + '":' + str(y) for x,y in zip(z.metabolites.keys(),z.metabolites.values())]) for z in model.reactions ]
-    fd = ','.join([x + '"metabolites":{' + y + '}}' for x,y, in zip(fd,metarr)])
-    #Finalize JSON string
-    jsonstr = jsonstr + fd + ']}'
-    return jsonstr
+            rxns = [g.id for g in f.reactions]
+        for v in vals:
+            groups.setdefault(v,{}).update(dict.fromkeys(rxns))
+    return {k:list(groups[k]) for k in sorted(groups,key = str)}
+
+#Split secondaries into a tuple of regular expressions and a set of exact metabolite IDs
+def splitSecondaries(secondaries):
+    if isinstance(secondaries,(set,frozenset)):
+        secondaries = [secondaries]
+    patterns = tuple(f for f in secondaries if isinstance(f,str))
+    ids = frozenset(i for f in secondaries if not isinstance(f,str) for i in f)
+    return patterns,ids
+
+def matchSecondaries(model,secondaries):
+    """
+    Returns the IDs of the metabolites of model to be shelved, in model order. Inputs:
+    -model: COBRA model.
+    -secondaries: list of regular expressions and sets of metabolite IDs. Regular expressions are joined into one
+    pattern and searched in each metabolite ID ignoring case, as in the browser. IDs in sets are matched exactly.
+    """
+    return matchIds([m.id for m in model.metabolites],secondaries)
+
+#Get the IDs in ids matched by secondaries
+def matchIds(ids,secondaries):
+    patterns,exact = splitSecondaries(secondaries)
+    regex = re.compile('|'.join('(?:' + f + ')' for f in patterns),re.IGNORECASE) if len(patterns) > 0 else None
+    return [f for f in ids if f in exact or (regex is not None and regex.search(f) is not None)]
+
+#Write model parsed with struct to a buffer. If shared, subgraphs index the model graph loaded by the page
+def writeStructParse(model,parser,out,layout = False,shared = False):
+    if shared:
+        rxns,mets = list(model.reactions),list(model.metabolites)
+        out.write('graph = sammimodel')
+    else:
+        #Get unique reactions in parser and their metabolites
+        with profiling.stage('subgraph') as rec:
+            rx = set()
+            for f in parser:
+                rx.update(f.reactions)
+            rxns,mets = subGraph(model,rx)
+            rec['ids'] = len(rx)
+        out.write('graph = ')
+        writeGraph(rxns,mets,out)
+    #Add subgraph index and parsing line
+    with profiling.stage('parse index',out,subgraphs = len(parser),layout = layout):
+        out.write(';\ne = ' + makeParseIndex(parser,rxns,mets if layout else None) + ';\nfilterWrapper(e)')
 
 #Parse model with struct
 def structParse(model,parser):
-    #Get unique reactions in parser
-    rx = []
-    for f in parser:
-        rx = rx + f.reactions
-    rx = list(set(rx))
-    #Remove unwanted reactions
-    tormrx = [f.id for f in model.reactions if f.id not in rx]
-    model.remove_reactions(tormrx)
-    #Remove blocked metabolites
-    tormmet = [m for m in model.metabolites if len(m.reactions) == 0]
-    model.remove_metabolites(tormmet)
-    #Convert model to Json string
-    jsonstr = 'graph = ' + makeJson(model)
-    #Make conversion vector
-    convvec = makeParseVector(parser)
-    #Add parsing line
-    jsonstr = jsonstr + ';\ne = ' + convvec + ';\nfilterWrapper(e)'
-    return jsonstr
+    out = io.StringIO()
+    writeStructParse(model,parser,out)
+    return out.getvalue()
 
 #Converts data class to vector
 def makeParseVector(dat):
-    parsevec = '[' + ','.join(['["' + cond.name + '",' + ','.join(['["' + x + '","' + str(y) + '"]' 
-        for x,y in zip(cond.reactions,cond.flux)]) + ']' 
+    #Reactions without values (NaN) are written without flux
+    parsevec = '[' + ','.join(['["' + cond.name + '",' + ','.join(['["' + x + '"]' if y is None or y != y else '["' + x + '","' + str(y) + '"]'
+        for x,y in zip(cond.reactions,parserFlux(cond))]) + ']' 
         for cond in dat]) + ']'
     return parsevec
 
+#Converts parser objects to an index of reaction positions in the graph, used to build each subgraph when first shown.
+#Sparse flux is written as the positions and values of the reactions given, and the fill of the others.
+#If the graph metabolites are given, each subgraph is also laid out
+def makeParseIndex(dat,rxns,mets = None):
+    pos = {f.id:i for i,f in enumerate(rxns)}
+    value = lambda y: None if y is None or y != y else float(y)
+    index = []
+    for cond in dat:
+        if cond.sparse:
+            spec = {'name':str(cond.name),'rxns':[pos[x] for x in cond.reactions if x in pos]}
+            inrxns = set(cond.reactions)
+            sub = [(pos[x],value(y)) for x,y in zip(*cond.flux) if x in pos and x in inrxns]
+            spec.update(fluxrxns = [x for x,y in sub],fluxvals = [y for x,y in sub],fill = value(cond.fill))
+        else:
+            sub = [(pos[x],value(y)) for x,y in zip(cond.reactions,cond.flux) if x in pos]
+            spec = {'name':str(cond.name),'rxns':[x for x,y in sub],'flux':[y for x,y in sub]}
+        if mets is not None:
+            #Nodes in the order the browser builds the subgraph
+            metpos = {f.id:i for i,f in enumerate(mets)}
+            subrxns = [rxns[i] for i in sorted(set(spec['rxns']))]
+            submets = [mets[i] for i in sorted(set(metpos[m.id] for r in subrxns for m in r.metabolites))]
+            spec['layout'] = layoutGraph(subrxns,submets)
+        index.append(spec)
+    return _encoder.encode(index)
+
 #Convert data class to vector
 def makeDataVector(dat):
     datavec = '[["' + '","'.join(dat.conditions) + '"],' + ','.join(['["' + rm + '","' + '","'.join(map(str,d)) + '"]' for rm,d in zip(dat.ids,dat.data)]) + ']'
     return datavec
 
-def plot(model,parsert = [],datat = [],secondaries = [],opts = options()):
-    """
-    Plot model using SAMMI. Inputs:
-    -model: COBRA model to be plotted
-    -parsert: data used to parse the model into subgraphs. Can be one of:
-        -empty vector (default): plots the whole model.
-        -string: One of two options. (1) The name of a file pointing to a SAMMI map json file, which plots the given map. (2) The name of a reaction or metabolite field, plots one subgraph for each unique identifier in the field.
-        -list of strings: list of reaction IDs to plot. Plot only those reactions.
-        -list of parser objects: list of parser objects (sammi.parser). Plots one subgraph for each element.
-    -datat: data to be plotted onto the model. List of data objects (sammi.data).
-    -secondaries: list of regular expressions. Any metabolite matching any of the regular expressions will be shelved uppon loading.
-    -opts: options object (sammi.options) for additional loading options:
-    """
+#Convert data class to a base64 binary block decoded in the browser. Values are written one condition
+#after another, so the browser reads each condition as a column without copying
+def makeDataBlock(dat,dtype = 'float64'):
+    import numpy as np
+    vals = np.asarray(dat.data,dtype = '<f4' if dtype == 'float32' else '<f8').T
+    mask = np.isnan(vals)
+    vals = np.where(mask,0,vals)
+    block = {'conditions':[str(f) for f in dat.conditions],
+        'ids':[str(f) for f in dat.ids],
+        'dtype':dtype,
+        'values':base64.b64encode(np.ascontiguousarray(vals).tobytes()).decode('ascii'),
+        'mask':base64.b64encode(np.packbits(mask.ravel(),bitorder = 'little').tobytes()).decode('ascii')}
+    return 'decodeDataBlock(' + _encoder.encode(block) + ')'
+
+#Convert sparse data class, a sparse matrix or a data pair, to a block of its stored entries, expanded in the browser
+def makeSparseBlock(dat,dtype = 'float64'):
+    import numpy as np
+    rows,cols,vals = sparseEntries(dat)
+    vals = np.asarray(vals,dtype = '<f4' if dtype == 'float32' else '<f8')
+    #Entries equal to the fill value need not be written
+    keep = vals != dat.fill if dat.fill == dat.fill else ~np.isnan(vals)
+    block = {'conditions':[str(f) for f in dat.conditions],
+        'ids':[str(f) for f in dat.ids],
+        'dtype':dtype,
+        'fill':None if dat.fill != dat.fill else float(dat.fill),
+        'rows':base64.b64encode(np.asarray(rows[keep],dtype = '<i4').tobytes()).decode('ascii'),
+        'cols':base64.b64encode(np.asarray(cols[keep],dtype = '<i4').tobytes()).decode('ascii'),
+        'values':base64.b64encode(np.ascontiguousarray(vals[keep]).tobytes()).decode('ascii')}
+    return 'decodeSparseBlock(' + _encoder.encode(block) + ')'
+
+#Write the conditions of a data class to chunk files next to the page, returning the index loaded by the browser
+def makeDataChunks(dat,opts,name,folder = None):
+    import numpy as np
+    folder = folder if folder is not None else os.path.join(__path__[0],'browser')
+    dtype = opts.binary or 'float64'
+    if isinstance(dat.data,tuple):
+        values = dat.data
+    else:
+        values = dat.data.tocsc() if dat.sparse else np.asarray(dat.data,dtype = float)
+    index = {'conditions':[str(f) for f in dat.conditions],'ids':[str(f) for f in dat.ids],'size':opts.chunks,'chunks':[],'min':[],'max':[]}
+    for k,start in enumerate(range(0,len(dat.conditions),opts.chunks)):
+        part = slice(start,start + opts.chunks)
+        chunk = (values[0],values[1][:,part]) if isinstance(values,tuple) else values[:,part]
+        sub = data(dat.group,dat.kind,chunk,dat.ids,index['conditions'][part],dat.fill)
+        src = name + '_' + str(k) + '.js'
+        with open(os.path.join(folder,src),'w',encoding = 'utf-8') as out:
+            out.write('receivedDataChunk(' + _encoder.encode(src) + ',' + (makeSparseBlock(sub,dtype) if sub.sparse else makeDataBlock(sub,dtype)) + ');\n')
+        index['chunks'].append(src)
+        #Range of each condition, as the browser computes it. Sparse conditions take the fill value if an ID has no entry
+        if sub.sparse:
+            rows,cols,stored = sparseEntries(sub)
+            stored = np.abs(stored) if dat.kind == 'size' else np.asarray(stored,dtype = float)
+            fill = abs(sub.fill) if dat.kind == 'size' else sub.fill
+            lo = np.full(len(sub.conditions),np.inf)
+            hi = np.full(len(sub.conditions),-np.inf)
+            missing = np.isnan(stored)
+            np.minimum.at(lo,cols,np.where(missing,np.inf,stored))
+            np.maximum.at(hi,cols,np.where(missing,-np.inf,stored))
+            if fill == fill:
+                partial = np.bincount(cols,minlength = len(sub.conditions)) < len(sub.ids)
+                lo[partial] = np.minimum(lo[partial],fill)
+                hi[partial] = np.maximum(hi[partial],fill)
+            index['min'] += lo.tolist()
+            index['max'] += hi.tolist()
+            continue
+        vals = np.abs(sub.data) if dat.kind == 'size' else sub.data
+        missing = np.isnan(vals)
+        index['min'] += np.where(missing,np.inf,vals).min(0,initial = np.inf).tolist()
+        index['max'] += np.where(missing,-np.inf,vals).max(0,initial = -np.inf).tolist()
+    return 'chunkedDataStore(' + _encoder.encode(index) + ')'
+
+#Template head and tail around the code slot, keyed on file path and offline mode
+_templates = {}
+
+#Read the html template split at the code slot. Pages written to another folder point to the local files of the template
+def readTemplate(path,offline = None,outdir = None):
+    mtime = os.path.getmtime(path)
+    key = (path,offline,outdir)
+    if key not in _templates or _templates[key][0] != mtime:
+        index = open(path,encoding = 'utf-8').read()
+        from sammi import assets
+        if offline is not None:
+            index = assets.localize(index,offline,os.path.dirname(path))
+        if outdir is not None and os.path.realpath(outdir) != os.path.realpath(os.path.dirname(path)):
+            index = assets.relocate(index,os.path.dirname(path),outdir)
+        head,tail = index.split('//MATLAB_CODE_HERE//',1)
+        _templates[key] = (mtime,head,tail)
+    return _templates[key][1:]
+
+#Write the javascript that loads the model and data to a buffer. If shared, the page has loaded the model graph as sammimodel.
+#The model can also be given as the javascript written for it by writeModel, for instance read from a cache
+def writePayload(out,model,parsert,datat,secondaries,opts,folder = None,shared = False):
+    if isinstance(model,str):
+        out.write(model)
+    else:
+        writeModel(out,model,parsert,opts,shared)
+    #Add data. Data plotted on a map must match its reactions or metabolites
+    if isinstance(parsert,str) and os.path.isfile(parsert):
+        maps.checkData(readMap(parsert),datat)
+    writeData(out,datat,opts,folder)
+    #Shelve secondaries
+    if len(secondaries) > 0:
+        writeSecondaries(out,model,parsert,secondaries)
 
-    #Define options. If a given file load the file
+#Write the javascript that loads the model, parsed as given by parsert, to a buffer
+def writeModel(out,model,parsert,opts,shared = False):
+    #If a given file load the file
     if isinstance(parsert,str) and os.path.isfile(parsert):
-        jsonstr = 'e = ' + open(parsert).read() + ';\nreceivedTextSammi(JSON.stringify(e));'
+        with profiling.stage('map') as rec:
+            smap = readMap(parsert)
+            rec.update(subgraphs = len(smap.subgraphs),reactions = len(smap.reactions),metabolites = len(smap.metabolites))
+        #Embedded as an object, so the browser parses the map once
+        with profiling.stage('reconcile',out) as rec:
+            smap,report = reconcileMap(smap,model)
+            out.write('e = ' + _encoder.encode(smap.state) + ';\nreceivedSammiMap(e);')
+            rec.update({k:len(v) for k,v in report.items()})
+        maps.warnReport(parsert,report)
     #If a reactions or metabolite field
     elif isinstance(parsert,str) and not os.path.isfile(parsert):
-        dat = []
-        if parsert in dir(model.reactions[0]):
-            categ = model.reactions
-            ss = list(set([getattr(f,parsert) for f in categ]))
-            ss.sort()
-            for tmp in ss:
-                dat.append(parser(tmp,[f.id for f in categ if getattr(f,parsert) == tmp]))
-        elif parsert in dir(model.metabolites[0]):
-            categ = model.metabolites
-            ss = list(set([getattr(f,parsert) for f in categ]))
-            ss.sort()
-            for tmp in ss:
-                rxns = []
-                for f in categ:
-                    if getattr(f,parsert) == tmp:
-                        rxns = rxns + [g.id for g in list(f.reactions)]
-                dat.append(parser(tmp,list(set(rxns))))
-        else:
-            pass #return
-        jsonstr = structParse(model,dat)
+        with profiling.stage('group',field = parsert) as rec:
+            dat = [parser(k,v) for k,v in groupBy(model,parsert).items()]
+            rec['groups'] = len(dat)
+        writeStructParse(model,dat,out,opts.layout,shared)
     #If we are loading the whole model as one thing
+    elif isinstance(parsert,list) and len(parsert) == 0 and shared:
+        out.write('e = sammimodel;\nreceivedJSONwrapper(e);')
     elif isinstance(parsert,list) and len(parsert) == 0:
-        jsonstr = 'e = ' + makeJson(model) + ';\nreceivedJSONwrapper(e);'
+        out.write('e = ')
+        writeJson(model,out,layout = opts.layout)
+        out.write(';\nreceivedJSONwrapper(e);')
     elif isinstance(parsert,list) and isinstance(parsert[0],parser):
-        jsonstr = structParse(model,parsert)
+        writeStructParse(model,parsert,out,opts.layout,shared)
     elif isinstance(parsert,list):
-        if len(parsert) > 0:
-            #Remove unwanted reactions
-            tormrx = [f.id for f in model.reactions if f.id not in parsert]
-            model.remove_reactions(tormrx)
-            #Remove blocked metabolites
-            tormmet = [m for m in model.metabolites if len(m.reactions) == 0]
-            model.remove_metabolites(tormmet)
-        #Plot remaining
-        jsonstr = 'e = ' + makeJson(model) + ';\nreceivedJSONwrapper(e);'
-    #Add data
+        #Plot only the given reactions
+        out.write('e = ')
+        writeJson(model,out,parsert,layout = opts.layout)
+        out.write(';\nreceivedJSONwrapper(e);')
+
+#Write the javascript that loads data objects to a buffer. Each data object replaces the data of its group and kind.
+#Chunk files are named after name, by default the html file
+def writeData(out,datat,opts,folder = None,name = None):
+    if name is None:
+        name = os.path.splitext(opts.htmlName)[0] + '_data'
     if isinstance(datat,data) or (isinstance(datat,list) and len(datat) > 0):
         if isinstance(datat,data):
             datat = [datat]
-        for dat in datat:
-            jsonstr = jsonstr + ';\ndat = ' + makeDataVector(dat)
+        for i,dat in enumerate(datat):
+            with profiling.stage('data',out,group = dat.group,kind = dat.kind,ids = len(dat.ids),conditions = len(dat.conditions)):
+                if opts.chunks:
+                    out.write(';\ndat = ' + makeDataChunks(dat,opts,name + str(i),folder))
+                elif dat.sparse:
+                    out.write(';\ndat = ' + makeSparseBlock(dat,opts.binary or 'float64'))
+                elif opts.binary:
+                    out.write(';\ndat = ' + makeDataBlock(dat,opts.binary))
+                else:
+                    out.write(';\ndat = ' + makeDataVector(dat))
             if dat.group == 'reactions':
                 if dat.kind == 'color':
-                    jsonstr = jsonstr + ';\nreceivedTextFlux(dat)'
+                    out.write(';\nreceivedTextFlux(dat)')
                 elif dat.kind == 'size':
-                    jsonstr = jsonstr + ';\nreceivedTextSizeRxn(dat)'
+                    out.write(';\nreceivedTextSizeRxn(dat)')
             elif dat.group == 'metabolites':
                 if dat.kind == 'color':
-                    jsonstr = jsonstr + ';\nreceivedTextConcentration(dat)'
+                    out.write(';\nreceivedTextConcentration(dat)')
                 elif dat.kind == 'size':
-                    jsonstr = jsonstr + ';\nreceivedTextSizeMet(dat)'
+                    out.write(';\nreceivedTextSizeMet(dat)')
             elif dat.group == 'links':
                 if dat.kind == 'size':
-                    jsonstr = jsonstr +  ';\nreceivedTextWidth(dat)'
-    #Shelve secondaries
-    if len(secondaries) > 0:
-        jsonstr = jsonstr + ';\nshelveList("(?:' + ')|(?:'.join(secondaries) + ')");'
-    #Add last bit of code
-    jsonstr = jsonstr + opts.jscode
-    #Read in template
-    folder = __path__[0]
-    index = open(folder + '\\browser\\index.html').read()
-    #Write code in appropriate place
-    index = index.replace('//MATLAB_CODE_HERE//',jsonstr)
-    #Write to file
-    open(folder + '\\browser\\' + opts.htmlName,'w').write(index)
+                    out.write(';\nreceivedTextWidth(dat)')
+
+#Write the javascript that shelves secondaries to a buffer. Metabolites of the model, or of the map file, are matched in Python,
+#so the page only looks up IDs. Without either the page matches the regular expressions
+def writeSecondaries(out,model,parsert,secondaries):
+    with profiling.stage('secondaries',out) as rec:
+        if isinstance(parsert,str) and os.path.isfile(parsert):
+            ids = matchIds(readMap(parsert).metabolites,secondaries)
+            out.write(';\nshelveIds(' + _encoder.encode(ids) + ');')
+            rec['metabolites'] = len(ids)
+        elif model is None or isinstance(model,str):
+            patterns,ids = splitSecondaries(secondaries)
+            if len(patterns) > 0:
+                out.write(';\nshelveList(' + _encoder.encode('(?:' + ')|(?:'.join(patterns) + ')') + ');')
+            if len(ids) > 0:
+                out.write(';\nshelveIds(' + _encoder.encode(sorted(ids)) + ');')
+        else:
+            ids = matchSecondaries(model,secondaries)
+            out.write(';\nshelveIds(' + _encoder.encode(ids) + ');')
+            rec['metabolites'] = len(ids)
+
+#Writer compressing text and writing it to a buffer as base64
+class _compressedWriter:
+    def __init__(self,out,method):
+        self.out = out
+        self.z = zlib.compressobj(6,zlib.DEFLATED,31 if method == 'gzip' else 15)
+        self.rest = b''
+        self.size = 0
+
+    def write(self,text):
+        self.size += len(text)
+        self._emit(self.z.compress(text.encode('utf-8')))
+
+    #Characters written before compression, so profiled stages report the size of their javascript
+    def tell(self):
+        return self.size
+
+    #Write base64 of whole three byte groups, keeping the remainder for the next call
+    def _emit(self,data):
+        data = self.rest + data
+        n = len(data) - len(data) % 3
+        self.out.write(base64.b64encode(data[:n]).decode('ascii'))
+        self.rest = data[n:]
+
+    def close(self):
+        self._emit(self.z.flush())
+        self.out.write(base64.b64encode(self.rest).decode('ascii'))
+        self.rest = b''
+
+#Write the payload compressed, as a call to the browser function that inflates and runs it
+def writeCompressed(out,model,parsert,datat,secondaries,opts,folder = None,shared = False):
+    out.write('inflatePayload("')
+    z = _compressedWriter(out,opts.compress)
+    writePayload(z,model,parsert,datat,secondaries,opts,folder,shared)
+    z.close()
+    out.write('",' + _encoder.encode(opts.compress) + ')')
+
+def plot(model,parsert = [],datat = [],secondaries = [],opts = options()):
+    """
+    Plot model using SAMMI. Inputs:
+    -model: COBRA model to be plotted. The model is not modified.
+    -parsert: data used to parse the model into subgraphs. Can be one of:
+        -empty vector (default): plots the whole model.
+        -string: One of two options. (1) The name of a file pointing to a SAMMI map json file, which plots the given map, reconciled with the model. A warning lists the reactions removed from the map and those of the model not in it. (2) The name of a reaction or metabolite field, plots one subgraph for each unique identifier in the field.
+        -list of strings: list of reaction IDs to plot. Plot only those reactions.
+        -list of parser objects: list of parser objects (sammi.parser). Plots one subgraph for each element.
+    -datat: data to be plotted onto the model. List of data objects (sammi.data).
+    -secondaries: list of regular expressions. Any metabolite matching any of the regular expressions will be shelved uppon loading. Sets of metabolite IDs can also be given, to be matched exactly. Metabolites are matched in Python (sammi.matchSecondaries).
+    -opts: options object (sammi.options) for additional loading options:
+    If opts.profile is given returns the profiling report, a dictionary with the time, object counts, and output size
+    of each stage ('stages'), the total time ('seconds'), and the size ('bytes') and path ('file') of the page.
+    """
+
+    folder = os.path.join(__path__[0],'browser')
+    path = os.path.join(folder,opts.htmlName)
+    report = None
+    if opts.profile:
+        profiling.start(opts.profile if callable(opts.profile) else None)
+        try:
+            writePage(model,parsert,datat,secondaries,opts,folder)
+        finally:
+            report = profiling.finish(bytes = os.path.getsize(path) if os.path.isfile(path) else 0,file = path)
+    else:
+        writePage(model,parsert,datat,secondaries,opts,folder)
     #Open
     if opts.load:
-        os.system("start \"\" \"" + os.path.dirname(os.path.realpath(__file__)) + "\\browser\\" + opts.htmlName)
+        openPage(path)
+    return report
+
+#Open a page in the default browser
+def openPage(path):
+    import pathlib
+    import webbrowser
+    webbrowser.open(pathlib.Path(os.path.realpath(path)).as_uri())
+
+#Write the page of a visualization to folder. If shared is the name of a model graph script in folder, the page loads it first.
+#Local scripts are referred to from assetdir, by default the folder itself
+def writePage(model,parsert,datat,secondaries,opts,folder,shared = None,assetdir = None):
+    #Read in template
+    with profiling.stage('template'):
+        head,tail = readTemplate(os.path.join(__path__[0],'browser','index.html'),opts.offline,assetdir if assetdir is not None else folder)
+    #Write template and code to file. When profiling the page is written in memory first, to time writing the file on its own
+    if profiling.active():
+        out = io.StringIO()
+        writePageCode(out,head,tail,model,parsert,datat,secondaries,opts,folder,shared)
+        with profiling.stage('write') as rec:
+            text = out.getvalue()
+            with open(os.path.join(folder,opts.htmlName),'w',encoding = 'utf-8') as f:
+                f.write(text)
+            rec['bytes'] = len(text)
+    else:
+        with open(os.path.join(folder,opts.htmlName),'w',encoding = 'utf-8') as out:
+            writePageCode(out,head,tail,model,parsert,datat,secondaries,opts,folder,shared)
+
+#Write the template with the code loading the model and data to a buffer
+def writePageCode(out,head,tail,model,parsert,datat,secondaries,opts,folder,shared = None):
+    out.write(head)
+    if opts.profile:
+        out.write('startProfile();\n')
+    if opts.worker:
+        out.write('useworker = true;\n')
+    if opts.renderer == 'canvas':
+        out.write('usecanvas = true;\n')
+    if shared is not None:
+        out.write('loadScript(' + _encoder.encode(shared) + ',function() {\n')
+    if opts.payload is None and opts.compress:
+        writeCompressed(out,model,parsert,datat,secondaries,opts,folder,shared is not None)
+        out.write('.then(function() {\n' + opts.jscode + '\n});')
+    elif opts.payload is None:
+        writePayload(out,model,parsert,datat,secondaries,opts,folder,shared is not None)
+        out.write(';\n' + opts.jscode)
+    else:
+        #Write the payload to a separate file loaded by the page
+        with open(os.path.join(folder,opts.payload),'w',encoding = 'utf-8') as pout:
+            if opts.compress:
+                pout.write('function sammiPayload() {\nreturn ')
+                writeCompressed(pout,model,parsert,datat,secondaries,opts,folder,shared is not None)
+                pout.write(';\n}\n')
+            else:
+                pout.write('function sammiPayload() {\n')
+                writePayload(pout,model,parsert,datat,secondaries,opts,folder,shared is not None)
+                pout.write('\n}\n')
+        out.write('loadPayload(' + _encoder.encode(opts.payload) + ',function() {\n' + opts.jscode + '\n});')
+    if shared is not None:
+        out.write('\n});')
+    out.write(tail)
+
+#Write the model graph to a script in folder defining sammimodel, named after its content. Returns the file name
+def writeModelScript(model,folder,layout = False):
+    out = io.StringIO()
+    out.write('sammimodel = ')
+    writeJson(model,out,layout = layout)
+    out.write(';\n')
+    text = out.getvalue()
+    name = 'sammimodel.' + hashlib.sha256(text.encode('utf-8')).hexdigest()[:12] + '.js'
+    if not os.path.isfile(os.path.join(folder,name)):
+        with open(os.path.join(folder,name),'w',encoding = 'utf-8') as f:
+            f.write(text)
+    return name
+
+#Define a view rendered by plotMany
+class view:
+    """
+    One visualization of the model rendered by sammi.plotMany. Inputs:
+    -htmlName: name of the html file to write the visualization to.
+    -parsert: data used to parse the model into subgraphs, as in sammi.plot. Default [] (whole model).
+    -datat: data to be plotted onto the model, as in sammi.plot. Default [].
+    -secondaries: regular expressions of metabolites to shelve, as in sammi.plot. Default [].
+    -jscode: additional javascript code to be run upon loading this view, after the jscode of the options. Default ''.
+    """
+    def __init__(self,htmlName,parsert = [],datat = [],secondaries = [],jscode = None):
+        if htmlName == 'index.html' or htmlName == 'index':
+            raise Exception('Output file cannot be named index.html')
+        self.htmlName = htmlName
+        self.parsert = parsert
+        self.datat = datat
+        self.secondaries = secondaries
+        self.jscode = jscode if jscode is not None else ''
+
+#Model of the worker processes of plotMany
+_batchmodel = None
+
+def _initBatch(model):
+    global _batchmodel
+    _batchmodel = model
+
+#Write one view of plotMany
+def _writeView(v,opts,folder,shared,model = None):
+    opts = copy.copy(opts)
+    opts.htmlName = v.htmlName
+    opts.jscode = opts.jscode + '\n' + v.jscode
+    writePage(model if model is not None else _batchmodel,v.parsert,v.datat,v.secondaries,opts,folder,shared)
+    return os.path.join(folder,v.htmlName)
+
+def plotMany(model,views,opts = options(),outdir = None,processes = None):
+    """
+    Plots many views of the same model. The model graph is written once to a script shared by all
+    pages, named after its content so browsers keep it cached, and each page only holds its subgraph
+    index, data, and secondaries. Inputs:
+    -model: COBRA model to be plotted. The model is not modified.
+    -views: list of views (sammi.view) to render.
+    -opts: options object (sammi.options) used for every view. The htmlName, load, and payload fields are ignored.
+    -outdir: folder to write the pages to. Created if needed. Default the SAMMI browser folder.
+    -processes: number of worker processes rendering views in parallel. Each worker receives a copy of the
+    model once. Default None (render in this process).
+    Returns a dictionary with the written files, the number of views, the elapsed seconds, and the views
+    rendered per second.
+    """
+    start = time.perf_counter()
+    folder = outdir if outdir is not None else os.path.join(__path__[0],'browser')
+    os.makedirs(folder,exist_ok = True)
+    opts = copy.copy(opts)
+    opts.load = False
+    opts.payload = None
+    #Write the model graph once
+    shared = writeModelScript(model,folder,opts.layout and any(isinstance(v.parsert,list) and len(v.parsert) == 0 for v in views))
+    #Render views
+    if processes is None or processes <= 1:
+        files = [_writeView(v,opts,folder,shared,model) for v in views]
+    else:
+        import concurrent.futures
+        with concurrent.futures.ProcessPoolExecutor(processes,initializer = _initBatch,initargs = (model,)) as pool:
+            files = list(pool.map(_writeView,views,[opts]*len(views),[folder]*len(views),[shared]*len(views)))
+    elapsed = time.perf_counter() - start
+    return {'files':files,'views':len(views),'seconds':elapsed,'viewsPerSecond':len(views)/elapsed if elapsed > 0 else float('inf')}
 
 def openmap(htmlName):
     if not bool(re.search("\.html$",htmlName)):
         htmlName = htmlName + '.html'
-    os.system("start \"\" \"" + os.path.dirname(os.path.realpath(__file__)) + "\\browser\\" + htmlName)
+    openPage(os.path.join(os.path.dirname(os.path.realpath(__file__)),'browser',htmlName))
     return
 
+#Load one of the models used by the examples. Newer cobra versions ship them through cobra.io.load_model instead of cobra.test
+def testModel(name):
+    """
+    Returns one of the models bundled with cobra: 'textbook', 'salmonella', or 'ecoli' (iJO1366).
+    """
+    import cobra
+    try:
+        import cobra.test
+        return cobra.test.create_test_model(name)
+    except ImportError:
+        return cobra.io.load_model({'ecoli':'iJO1366'}.get(name,name))
+
 def test(n):
+    import numpy as np
     if n == 0:
         #Get sample model to plot
-        model = cobra.test.create_test_model("textbook")
+        model = testModel("textbook")
         #Plot file to default index_load.html
         plot(model)
     elif n == 1:
         #Get sample model to plot
-        model = cobra.test.create_test_model("salmonella")
+        model = testModel("salmonella")
         #Plot
         plot(model,'subsystem')
     elif n == 2:
         #Get sample model to plot
-        model = cobra.test.create_test_model("textbook")
+        model = testModel("textbook")
         #Plot
         plot(model,'compartment')
     elif n == 3:
         #Get sample model to plot
-        model = cobra.test.create_test_model("salmonella")
+        model = testModel("salmonella")
         #Generate options. This will not load a new tab upon generating the visualization
         opts = options(load = False)
         #Plot file to default index_load.html
@@ -273,7 +892,7 @@ def test(n):
         openmap('index_load2.html')
     elif n == 4:
         #Get sample model to plot
-        model = cobra.test.create_test_model("textbook")
+        model = testModel("textbook")
 
         #Define reactions
         tca = ['ACONTa','ACONTb','AKGDH','CS','FUM','ICDHyr','MDH','SUCOAS']
@@ -285,7 +904,7 @@ def test(n):
         plot(model,dat)
     elif n == 5:
         #Get sample model to plot
-        model = cobra.test.create_test_model("textbook")
+        model = testModel("textbook")
 
         #Define reactions
         tca = ['ACONTa','ACONTb','AKGDH','CS','FUM','ICDHyr','MDH','SUCOAS']
@@ -300,7 +919,7 @@ def test(n):
         plot(model,dat,secondaries = secondaries)
     elif n == 6:
         #Get sample model to plot
-        model = cobra.test.create_test_model("textbook")
+        model = testModel("textbook")
 
         #Define reactions
         tca = ['ACONTa','ACONTb','AKGDH','CS','FUM','ICDHyr','MDH','SUCOAS']
@@ -315,7 +934,7 @@ def test(n):
         plot(model,dat)
     elif n == 7:
         #Get sample model to plot
-        model = cobra.test.create_test_model("textbook")
+        model = testModel("textbook")
 
         #Define reactions
         tca = ['ACONTa','ACONTb','AKGDH','CS','FUM','ICDHyr','MDH','SUCOAS']
@@ -330,7 +949,7 @@ def test(n):
         plot(model,dat)
     elif n == 8:
         #Get sample model to plot
-        model = cobra.test.create_test_model("salmonella")
+        model = testModel("salmonella")
 
         #Get reactions and metabolites
         rx = [f.id for f in model.reactions]
@@ -357,7 +976,7 @@ def test(n):
         plot(model,'subsystem',datat = datat,secondaries = secondaries,opts = options(load=True))
     elif n == 9:
         #Get sample model to plot
-        model = cobra.test.create_test_model("salmonella")
+        model = testModel("salmonella")
 
         #Get reactions and metabolites
         rx = [f.id for f in model.reactions]
@@ -388,12 +1007,11 @@ def test(n):
     elif n == 10:
         #Import
         from cobra.flux_analysis import flux_variability_analysis
-        from cobra.flux_analysis.loopless import add_loopless, loopless_solution
+        from sammi.panel import perturbation, fluxPanel
         #Get model and tailor
-        model = cobra.test.create_test_model("salmonella")
+        model = testModel("salmonella")
         model.reactions.get_by_id('ATPM').lower_bound = 0
         model.reactions.get_by_id('ATPM').upper_bound = 1000
-        rxns = [r.id for r in model.reactions]
         #Close exchange reactions
         medium = model.medium
         for i in model.medium:
@@ -403,63 +1021,25 @@ def test(n):
         fva = flux_variability_analysis(model,fraction_of_optimum = 0)
         fva.maximum[fva.maximum < 1e-03] = 0
         fva.minimum[fva.minimum > -1e-03] = 0
-        #Initialize
-        dat = []
-        #Parse through positive reactions
-        for i in range(len(fva.maximum)):
-            if fva.maximum[i] != 0:
-                model.objective = model.reactions[i]
-                model.optimize()
-                flux = cobra.flux_analysis.pfba(model)
-                flux.fluxes[abs(flux.fluxes) < 1e-3] = 0
-                tmp = abs(flux.fluxes) >= 1e-3
-                dat.append(parser(model.reactions[i].id + ' positive',list(flux.fluxes[tmp].index),list(flux.fluxes[tmp].values)))
-        #Parse through negative reactions
-        for i in range(len(fva.minimum)):
-            if fva.minimum[i] != 0:
-                model.objective = model.reactions[i]
-                model.reactions[i].objective_coefficient = -1
-                flux = model.optimize()
-                flux = cobra.flux_analysis.pfba(model)
-                flux.fluxes[abs(flux.fluxes) < 1e-3] = 0
-                tmp = abs(flux.fluxes) >= 1e-3
-                dat.append(parser(model.reactions[i].id + ' negative',list(flux.fluxes[tmp].index),list(flux.fluxes[tmp].values)))
+        #Maximize and minimize each reaction that can carry flux
+        perts = [perturbation(model.reactions[i].id + ' positive',objective = model.reactions[i].id,direction = 'max') for i in range(len(fva.maximum)) if fva.maximum[i] != 0]
+        perts += [perturbation(model.reactions[i].id + ' negative',objective = model.reactions[i].id,direction = 'min') for i in range(len(fva.minimum)) if fva.minimum[i] != 0]
+        #Solve with parsimonious FBA in parallel
+        dat = list(fluxPanel(model,perts,method = 'pfba',threshold = 1e-3,processes = os.cpu_count()))
         #Plot
         plot(model,dat)
     elif n == 11:
-        from cobra.flux_analysis import single_reaction_deletion, moma
-        from cobra.flux_analysis.loopless import add_loopless, loopless_solution
+        from sammi.panel import perturbation, fluxPanel
 
         #Get model
-        model = cobra.test.create_test_model("ecoli")
-        #Set objective
-        model.objective = "Ec_biomass_iJO1366_core_53p95M"
-        #Initialize parsing list
-        dat = []
+        model = testModel("ecoli")
+        #Set objective. Models loaded through cobra.io.load_model use the BiGG ID of the biomass reaction
+        model.objective = "Ec_biomass_iJO1366_core_53p95M" if "Ec_biomass_iJO1366_core_53p95M" in model.reactions else "BIOMASS_Ec_iJO1366_core_53p95M"
         #Define reactions to simulate knockout
         korxns = ['ENO','FBA','TKT2','TALA','FUM','MDH','GAPD','TPI']
-        #Get original flux
-        solution = model.optimize()
-        flux = loopless_solution(model)
-        #Simulate reaction knockout
-        for r in korxns:
-            with model:
-                #Save original bounds
-                lb = model.reactions.get_by_id(r).lower_bound
-                ub = model.reactions.get_by_id(r).upper_bound
-                #Calculate adaptation
-                model.reactions.get_by_id(r).knock_out()
-                kosolution = model.optimize()
-                koflux = loopless_solution(model)
-                #Save
-                tmp = kosolution.objective_value*(flux.fluxes/solution.objective_value) - koflux.fluxes
-                bol = abs(tmp) > 1e-7
-                x = tmp[bol]
-                x[r] = float('nan')
-                dat.append(parser(r + ' - ' + str(round(kosolution.objective_value,4)),list(x.index),list(x)))
-                #Restore bounds again
-                model.reactions.get_by_id(r).lower_bound = lb
-                model.reactions.get_by_id(r).upper_bound = ub
+        #Difference of loopless fluxes to the wild type, scaled by growth
+        perts = [perturbation(r,knockouts = [r]) for r in korxns]
+        dat = list(fluxPanel(model,perts,method = 'loopless',threshold = 1e-7,difference = 'scaled',showObjective = True))
         #Define secondaries
         secondaries = ['^h_.$','^h2o_.$','^atp_.$','^adp_.','^pi_.','^o2_.','^co2_.','^nad_.','^nadh_.','^ndap_.','^ndaph_.',               '^q8_.$','^q8h2_.$','^nadp_.','^nadph_.']
         #Plot difference in scatterplot
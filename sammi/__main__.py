@@ -0,0 +1,4 @@
+import sys
+from sammi.cli import main
+
+sys.exit(main())
@@ -0,0 +1,149 @@
+#Vendoring of the external scripts and images used by the SAMMI page, for use without network access
+import base64
+import hashlib
+import json
+import mimetypes
+import os
+import pathlib
+import re
+import urllib.request
+import sammi
+
+#External assets loaded by browser/index.html
+ASSETS = ['https://d3js.org/d3.v4.js',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/liningfunctions.js',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/textandshapes.js',
+    'https://unpkg.com/tippy.js@2.5.2/dist/tippy.all.min.js',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/jscolor.js',
+    'https://ajax.googleapis.com/ajax/libs/jquery/1.12.4/jquery.min.js',
+    'https://bioinformatics.mdanderson.org/favicon.ico',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/dialogwindow.js',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/Thumbnails/MDACC2.png',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/Thumbnails/vertline.png',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/Thumbnails/horzline.png',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/Thumbnails/diagline.png',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/Thumbnails/circle.png',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/Thumbnails/rectangle.png',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/Thumbnails/rotate.png',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/Thumbnails/scale.png',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/Thumbnails/text.png',
+    'https://bioinformatics.mdanderson.org/Software/SAMMI/Thumbnails/shape.png']
+
+#Folder of assets shipped with the package, filled when the package is built
+def packageFolder():
+    return os.path.join(os.path.dirname(os.path.realpath(__file__)),'browser','vendor')
+
+#Folder of assets bundled by the user, next to the command line model cache
+def userFolder():
+    return os.path.join(os.environ.get('XDG_CACHE_HOME',os.path.join(os.path.expanduser('~'),'.cache')),'sammi','vendor')
+
+#Folders searched for bundled assets, in order
+def vendorFolders():
+    return [packageFolder(),userFolder()]
+
+#Read the manifest mapping asset URLs to bundled file names in a folder
+def readManifest(folder):
+    path = os.path.join(folder,'manifest.json')
+    if not os.path.isfile(path):
+        return {}
+    return json.load(open(path))
+
+def bundle(source = None,folder = None):
+    """
+    Vendors the external scripts and images used by SAMMI, so maps can be opened without network access
+    (see the offline field of sammi.options). Files are stored under content-hashed names, so browsers can
+    keep cached copies across maps. Inputs:
+    -source: Optional folder with previously downloaded copies of the assets, matched by file name.
+    If not given the assets are downloaded. Use this option on machines without network access.
+    -folder: Optional folder to store the assets in. Defaults to the user cache (sammi/vendor in
+    XDG_CACHE_HOME or ~/.cache), so installs that cannot be written to still work. Use
+    sammi.assets.packageFolder() when building the package to ship the assets with it.
+    Returns the manifest mapping each asset URL to its bundled file name.
+    """
+    folder = folder if folder is not None else userFolder()
+    os.makedirs(folder,exist_ok = True)
+    previous = readManifest(folder)
+    manifest = {}
+    for url in ASSETS:
+        name = url.split('/')[-1]
+        if source is not None:
+            content = open(os.path.join(source,name),'rb').read()
+        else:
+            content = urllib.request.urlopen(url).read()
+        stem,ext = os.path.splitext(name)
+        hashed = stem + '.' + hashlib.sha256(content).hexdigest()[:12] + ext
+        open(os.path.join(folder,hashed),'wb').write(content)
+        manifest[url] = hashed
+    #Remove copies written by the previous bundle and no longer used. Other files in folder are never touched
+    for f in set(previous.values()) - set(manifest.values()):
+        path = os.path.join(folder,os.path.basename(f))
+        if os.path.isfile(path):
+            os.remove(path)
+    json.dump(manifest,open(os.path.join(folder,'manifest.json'),'w'),indent = 1)
+    #Templates rewritten for the previous bundle point to removed files
+    sammi._templates.clear()
+    return manifest
+
+#Get bundled file of an asset from the first folder holding it
+def bundledFile(url,manifests):
+    for folder,manifest in manifests:
+        if url in manifest and os.path.isfile(os.path.join(folder,manifest[url])):
+            return os.path.join(folder,manifest[url])
+    raise Exception('Asset ' + url + ' is not bundled. Run sammi.bundle() to vendor the SAMMI assets')
+
+#Make a data URI of a file
+def dataURI(path):
+    mime = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    return 'data:' + mime + ';base64,' + base64.b64encode(open(path,'rb').read()).decode('ascii')
+
+#Read a script to be inlined in a script tag
+def inlineScript(path):
+    return '<script type="text/javascript">\n' + open(path,encoding = 'utf-8').read().replace('</script','<\\/script') + '\n</script>'
+
+def localize(index,mode,folder):
+    """
+    Replaces the references to external assets in the html template index. Inputs:
+    -index: html template text.
+    -mode: 'local' to point to the bundled copies, or 'inline' to embed every script, style sheet, and image
+    in the page so it is a single self-contained file.
+    -folder: folder of the template, holding the local scripts and style sheet.
+    Assets are taken from the package if it ships them, or else from the user cache filled by sammi.bundle().
+    """
+    manifest = [(f,readManifest(f)) for f in vendorFolders()]
+    if mode == 'local':
+        for url in re.findall(r'(?:src|href)="(https://[^"]+)"',index):
+            index = index.replace('"' + url + '"','"' + relativePath(bundledFile(url,manifest),folder) + '"')
+        return index
+    #Inline images and icon
+    def image(m):
+        return m.group(1) + dataURI(bundledFile(m.group(2),manifest)) + '"'
+    index = re.sub(r'(<(?:img|link)[^>]*?(?:src|href)=")(https://[^"]+)"',image,index)
+    #Inline external and local scripts
+    def script(m):
+        src = m.group(1)
+        path = bundledFile(src,manifest) if src.startswith('https://') else os.path.join(folder,src)
+        return inlineScript(path)
+    index = re.sub(r'<script type="text/javascript" src="([^"]+)"></script>',script,index)
+    #Inline style sheet
+    def style(m):
+        return '<style>\n' + open(os.path.join(folder,m.group(1)),encoding = 'utf-8').read() + '\n</style>'
+    return re.sub(r"<link rel='stylesheet' href='([^']+)'>",style,index)
+
+#Path of a local file of the template as seen from a page in another folder
+def relativePath(path,outdir):
+    try:
+        return os.path.relpath(path,outdir).replace(os.sep,'/')
+    except ValueError:
+        #Folders on different drives
+        return pathlib.Path(os.path.realpath(path)).as_uri()
+
+def relocate(index,folder,outdir):
+    """
+    Points the references to local scripts, style sheets, and images in the html template index to
+    their files in folder, for pages written to outdir. References to the web and inlined data are kept.
+    """
+    def local(m):
+        if re.match(r'(?:https?:|data:|file:|#|javascript:)',m.group(3)):
+            return m.group(0)
+        return m.group(1) + m.group(2) + relativePath(os.path.join(folder,m.group(3)),outdir) + m.group(2)
+    return re.sub(r'''(\b(?:src|href)=)(["'])([^"']+)\2''',local,index)
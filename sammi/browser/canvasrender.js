@@ -0,0 +1,205 @@
+//Canvas rendering of nodes, links, arrows, and labels, for maps too large to draw as SVG elements.
+//Enabled by usecanvas (SAMMIpy option renderer). The SVG holds the background, shapes, texts, and brush, and receives
+//all mouse events. The canvas is drawn on top of it in the animation frame after something changes, and only the
+//elements in view, found through quadtrees of nodes and links, are drawn
+var usecanvas = false,
+    canvas = null,
+    canvasindex = null,
+    canvaslinkindex = null,
+    canvaslonglinks = [],
+    canvasmaxr = 0,
+    canvasmoved = true,
+    canvasgraph = null,
+    canvasframe = null,
+    canvaslisten = false,
+    canvasstrain = null,
+    canvasminlabel = 4,
+    canvasminnode = 1,
+    canvaslonglink = 200;
+
+//Create the canvas over the SVG, and handle dragging of the nodes drawn in it
+function defineCanvas() {
+    if (canvas == null || !document.body.contains(canvas)) {
+        canvas = document.createElement("canvas");
+        canvas.id = "graphcanvas";
+        canvas.style.position = "absolute";
+        canvas.style.top = "0px";
+        canvas.style.left = "0px";
+        canvas.style.pointerEvents = "none";
+        svg.node().parentNode.appendChild(canvas);
+    }
+    var w = Number(svg.attr("width")),
+        h = Number(svg.attr("height")),
+        ratio = window.devicePixelRatio || 1;
+    canvas.width = w*ratio;
+    canvas.height = h*ratio;
+    canvas.style.width = w + "px";
+    canvas.style.height = h + "px";
+
+    //Nodes are dragged from the background, with positions taken in graph coordinates
+    rect.call(d3.drag()
+        .container(function() {return gDraw.node()})
+        .subject(canvasSubject)
+        .on("start", function() {dragstarted.call(this,d3.event.subject)})
+        .on("drag", function() {dragged.call(this,d3.event.subject)})
+        .on("end", function() {dragended.call(this,d3.event.subject)}))
+
+    listenCanvas()
+    canvasChanged()
+}
+
+//Colors, sizes, and labels request a frame where they are updated. Options of the menus and selections made with the
+//mouse or keyboard take effect on the next frame after the event, so a user action draws at most one frame
+function listenCanvas() {
+    if (canvaslisten) {return;}
+    canvaslisten = true;
+    ["input","change"].forEach(function(e) {document.addEventListener(e,canvasChanged)});
+    ["click","keyup"].forEach(function(e) {document.addEventListener(e,requestCanvas)});
+}
+
+//Node under the mouse, or null to leave the event to zooming
+function canvasSubject() {
+    if (canvasindex == null) {return null;}
+    var p = d3.mouse(gDraw.node()),
+        t = d3.zoomTransform(gMain.node()),
+        d = canvasindex.find(p[0],p[1],canvasmaxr + 3/t.k);
+    if (d && Math.max(Math.abs(d.x - p[0]),Math.abs(d.y - p[1])) <= d.r + 3/t.k) {return d;}
+    return null;
+}
+
+//Draw on the next animation frame
+function requestCanvas() {
+    if (!usecanvas || canvas == null || canvasframe != null) {return;}
+    canvasframe = requestAnimationFrame(drawCanvas);
+}
+
+//Draw on the next animation frame after nodes moved or changed size, indexing them again
+function canvasChanged() {
+    canvasmoved = true;
+    requestCanvas()
+}
+
+//Index nodes for hit testing and culling, and links by source node. Links longer than canvaslonglink are kept
+//apart, so links crossing the view are found among the links of nodes near it
+function indexCanvas() {
+    if (!canvasmoved && canvasgraph === graph) {return;}
+    canvasmoved = false;
+    canvasgraph = graph;
+    var hiderxns = document.getElementById("hiderxns").checked,
+        shown = [],
+        short = [];
+    canvasmaxr = 0;
+    graph.nodes.forEach(function(d) {
+        if (d.x == null || (hiderxns && d.group == 1)) {return;}
+        shown.push(d);
+        if (d.r > canvasmaxr) {canvasmaxr = d.r}
+    })
+    canvaslonglinks = [];
+    graph.links.forEach(function(l) {
+        if (l.source.x == null || l.target.x == null) {return;}
+        var len = Math.max(Math.abs(l.target.x - l.source.x),Math.abs(l.target.y - l.source.y));
+        (len > canvaslonglink ? canvaslonglinks : short).push(l);
+    })
+    canvasindex = d3.quadtree().x(function(d){return d.x}).y(function(d){return d.y}).addAll(shown);
+    canvaslinkindex = d3.quadtree().x(function(l){return l.source.x}).y(function(l){return l.source.y}).addAll(short);
+}
+
+//Data of the points of a quadtree inside a rectangle
+function searchCanvas(tree,x0,y0,x1,y1) {
+    var found = [];
+    tree.visit(function(q,qx0,qy0,qx1,qy1) {
+        if (!q.length) {
+            do {
+                var p = q.data,
+                    x = tree.x()(p),
+                    y = tree.y()(p);
+                if (x >= x0 && x <= x1 && y >= y0 && y <= y1) {found.push(p)}
+            } while (q = q.next)
+        }
+        return qx0 > x1 || qy0 > y1 || qx1 < x0 || qy1 < y0;
+    })
+    return found;
+}
+
+function drawCanvas() {
+    canvasframe = null;
+    var ctx = canvas.getContext("2d"),
+        w = Number(svg.attr("width")),
+        h = Number(svg.attr("height")),
+        ratio = window.devicePixelRatio || 1,
+        t = d3.zoomTransform(gMain.node());
+    ctx.setTransform(ratio,0,0,ratio,0,0);
+    ctx.clearRect(0,0,w,h);
+    ctx.setTransform(ratio*t.k,0,0,ratio*t.k,ratio*t.x,ratio*t.y);
+
+    //Area in view, in graph coordinates
+    var x0 = -t.x/t.k, y0 = -t.y/t.k, x1 = (w - t.x)/t.k, y1 = (h - t.y)/t.k;
+    function inView(xa,ya,xb,yb) {return Math.max(xa,xb) >= x0 && Math.min(xa,xb) <= x1 && Math.max(ya,yb) >= y0 && Math.min(ya,yb) <= y1;}
+
+    //Links and arrows. Links in view have their source within the longest short link of the view, or are long
+    indexCanvas()
+    var margin = 50,
+        reach = margin + canvaslonglink,
+        arrows = document.getElementById("arrows").checked && Number(document.getElementById("arrowsize").value)*t.k >= canvasminnode,
+        links = searchCanvas(canvaslinkindex,x0 - reach,y0 - reach,x1 + reach,y1 + reach).concat(canvaslonglinks);
+    links.sort(function(a,b){return a.index - b.index});
+    links.forEach(function(l) {
+        if (!inView(l.source.x - margin,l.source.y - margin,l.target.x + margin,l.target.y + margin) &&
+            !inView(l.source.x + margin,l.source.y + margin,l.target.x - margin,l.target.y - margin)) {return;}
+        var col = defineLinkColor(l);
+        ctx.strokeStyle = canvasstrain ? canvasstrain(l) : col;
+        ctx.lineWidth = defineLinkWidth(l);
+        if (l.bpath) {
+            ctx.stroke(new Path2D(l.bpath));
+        } else {
+            ctx.beginPath();
+            ctx.moveTo(l.source.x,l.source.y);
+            ctx.lineTo(l.target.x,l.target.y);
+            ctx.stroke();
+        }
+        if (arrows && l.ppath) {
+            ctx.fillStyle = col;
+            ctx.fill(new Path2D(l.ppath));
+        }
+    })
+
+    //Nodes in view, in graph order
+    var shown = searchCanvas(canvasindex,x0 - canvasmaxr,y0 - canvasmaxr,x1 + canvasmaxr,y1 + canvasmaxr),
+        rxnrect = document.getElementById("rxnshape").value == "rect",
+        metrect = document.getElementById("metshape").value == "rect";
+    shown = shown.filter(function(d){return inView(d.x - d.r,d.y - d.r,d.x + d.r,d.y + d.r)});
+    shown.sort(function(a,b){return a.index - b.index});
+    ctx.lineWidth = 1.5;
+    shown.forEach(function(d) {
+        var col = defineNodeColor(d);
+        ctx.fillStyle = col;
+        //Nodes smaller than a pixel are drawn as points
+        if (d.r*t.k < canvasminnode) {
+            ctx.fillRect(d.x,d.y,canvasminnode/t.k,canvasminnode/t.k);
+            return;
+        }
+        ctx.strokeStyle = d.selected ? "black" : col;
+        ctx.beginPath();
+        if ((d.group == 1 && rxnrect) || (d.group == 2 && metrect)) {
+            ctx.rect(d.x - d.r,d.y - d.r,2*d.r,2*d.r);
+        } else {
+            ctx.arc(d.x,d.y,d.r,0,2*Math.PI);
+        }
+        ctx.fill();
+        ctx.stroke();
+    })
+
+    //Labels are left out when too small to be read
+    var size = Number(document.getElementById("labelsize").value);
+    if (size*t.k < canvasminlabel) {return;}
+    var lines = [0.3, -0.3, -0.9];
+    ctx.font = size + "px sans-serif";
+    ctx.textAlign = "center";
+    ctx.fillStyle = "black";
+    shown.forEach(function(d) {
+        if (!d.labelarr) {return;}
+        var x = d.x + d.labelshift[0],
+            y = d.y + d.labelshift[1] + lines[d.labelarr.length-1]*size;
+        d.labelarr.forEach(function(s,i) {ctx.fillText(s,x,y + 1.2*i*size)})
+    })
+}
@@ -425,7 +425,7 @@ function nodedegree(){
             }
         })
     }
-    
+    if (usecanvas) {canvasChanged()}
 }
 
 function suspendMetabolite() {
@@ -571,19 +571,19 @@ function getSearchNodes(e,nodeid) {
 
         var sgs = [],
         ct = [];
-        for (j in parsedmodels) {
-            if (j == currentparsed) {continue;}
+        findParsed(function(pg,j) {
+            if (j == currentparsed) {return;}
             found = false;
             cct = 0;
-            for (var i = 0; i < parsedmodels[j].nodes.length; i++){
-                if (parsedmodels[j].nodes[i].group == 2) {
-                    if (re.test(parsedmodels[j].nodes[i][metkey])) {
+            for (var i = 0; i < pg.nodes.length; i++){
+                if (pg.nodes[i].group == 2) {
+                    if (re.test(pg.nodes[i][metkey])) {
                         cct++;
                         if (!found) {sgs.push(j)};
                         found = true;
                     }
                 } else {
-                    if (re.test(parsedmodels[j].nodes[i][rxnkey])) {
+                    if (re.test(pg.nodes[i][rxnkey])) {
                         cct++;
                         if (!found) {sgs.push(j)};
                         found = true;
@@ -591,7 +591,7 @@ function getSearchNodes(e,nodeid) {
                 }
             }
             if (cct > 0) {ct.push(cct)}
-        }
+        })
         
         if (sgs.length == 0) {return;}
 
@@ -770,14 +770,23 @@ function hexToRgb(hex) {
 function putBackCommit(com) {
     select = document.getElementById("commits")
 
-    parsedmodels = JSON.parse(JSON.stringify(backups[select.value]));
-    for (j in parsedmodels) {
+    //Subgraphs that were not built when committed are kept as their builder
+    var backup = backups[select.value];
+    parsedmodels = {};
+    for (j in backup) {
+        if (typeof backup[j] == "function") {
+            defineLazyParsed(j,backup[j]);
+            continue;
+        }
+        parsedmodels[j] = JSON.parse(JSON.stringify(backup[j]));
         parsedmodels[j].links.forEach(function(d){
             d.target = parsedmodels[j].nodes[d.target.index];
             d.source = parsedmodels[j].nodes[d.source.index];
         })
     }
+    builtorder = builtParsed();
     graph = parsedmodels[currentparsed]
+    touchParsed(currentparsed)
 
     defineSuspended()
     reDefineSimulation()
@@ -802,9 +811,15 @@ function commitGraph() {
         select.insertBefore(option,select.children[1])
     }
 
-    backups[commitname] = JSON.parse(JSON.stringify(parsedmodels));
+    //Subgraphs that are not built are kept as their builder
+    var copy = copyParsed();
+    backups[commitname] = {};
+    for (j in copy) {
+        backups[commitname][j] = typeof copy[j] == "function" ? copy[j] : JSON.parse(JSON.stringify(copy[j]));
+    }
 
     for (j in backups[commitname]) {
+        if (typeof backups[commitname][j] == "function") {continue;}
         backups[commitname][j].links.forEach(function(d){
             d.target = backups[commitname][j].nodes[d.target.index];
             d.source = backups[commitname][j].nodes[d.source.index];
@@ -855,6 +870,7 @@ function putAllBack() {
 }
 
 function reDefineSimulationParameters() {
+    if (simulation instanceof WorkerSimulation) {simulation.stop()}
     simulation = d3.forceSimulation()
         .force("link", d3.forceLink()
             .id(function(d) { return d.id; })
@@ -937,6 +953,8 @@ function reDefineSimulationParameters() {
     circlenode.attr("r", function(d){return d.r;})
     rectnode.attr("width", function(d){return 2*d.r;})
     rectnode.attr("height", function(d){return 2*d.r;})
+
+    if (useworker) {simulation = workerSimulation(simulation)}
 }
 
 function setdisplay() {
@@ -1107,11 +1125,12 @@ function addExistingReaction(e) {
         defineBackupGraph(); 
         setTimeout(function() {
             var rx = document.getElementById("existingReactions").value;
-            var nodeadded = false;
-            for (j in parsedmodels) {
-                for (var i = 0; i < parsedmodels[j].nodes.length; i++) {
-                    if (parsedmodels[j].nodes[i].class == rx) {
-                        graph.nodes.push(JSON.parse(JSON.stringify(parsedmodels[j].nodes[i])))
+            var nodeadded = false,
+            pg;
+            findParsed(function(g) {
+                for (var i = 0; i < g.nodes.length; i++) {
+                    if (g.nodes[i].class == rx) {
+                        graph.nodes.push(JSON.parse(JSON.stringify(g.nodes[i])))
                         graph.nodes[graph.nodes.length-1].id = graph.nodes[graph.nodes.length-1].id + "." + count;
                         count++;
                         if (graph.nodes[graph.nodes.length-1].fx !=null) {
@@ -1119,23 +1138,23 @@ function addExistingReaction(e) {
                             graph.nodes[graph.nodes.length-1].fy += 10;
                         }
                         nodeadded = true;
-                        break;
+                        pg = g;
+                        return true;
                     }
                 }
-                if (nodeadded) {break}
-            }
+            })
             if (nodeadded) {
-                var limit = parsedmodels[j].links.length;
+                var limit = pg.links.length;
                 var newnodeindex = graph.nodes.length-1;
                 graph.nodes[graph.nodes.length-1].index = newnodeindex;
                 for (var i = 0; i < limit; i++) {
-                    if (parsedmodels[j].links[i].source.class == rx) {
-                        var newlink = Object.assign(JSON.parse(JSON.stringify(parsedmodels[j].links[i])),{
+                    if (pg.links[i].source.class == rx) {
+                        var newlink = Object.assign(JSON.parse(JSON.stringify(pg.links[i])),{
                             source: graph.nodes[newnodeindex],
                             index: graph.links.length,
                         })
                         newlink.index = graph.links.length;
-                        var newnode = JSON.parse(JSON.stringify(parsedmodels[j].links[i].target));
+                        var newnode = JSON.parse(JSON.stringify(pg.links[i].target));
                         newnode.index = graph.nodes.length;
                         newnode.id = newnode.id + "." + count;
                         count++;
@@ -1147,13 +1166,13 @@ function addExistingReaction(e) {
                         newlink.target = newnode;
                         graph.links.push(newlink);
 
-                    } else if (parsedmodels[j].links[i].target.class == rx) {
-                        var newlink = Object.assign(JSON.parse(JSON.stringify(parsedmodels[j].links[i])),{
+                    } else if (pg.links[i].target.class == rx) {
+                        var newlink = Object.assign(JSON.parse(JSON.stringify(pg.links[i])),{
                             target: graph.nodes[newnodeindex],
                             index: graph.links.length,
                         })
                         newlink.index = graph.links.length;
-                        var newnode = JSON.parse(JSON.stringify(parsedmodels[j].links[i].source));
+                        var newnode = JSON.parse(JSON.stringify(pg.links[i].source));
                         newnode.index = graph.nodes.length;
                         newnode.id = newnode.id + "." + count;
                         count++;
@@ -1166,11 +1185,11 @@ function addExistingReaction(e) {
                         graph.links.push(newlink);
                     }
                 }
-                for (var i = 0; i < parsedmodels[j].suspended.length; i++) {
-                    for (var k = 1; k < (parsedmodels[j].suspended[i].length-1); k++) {
-                        tmp = parsedmodels[j].suspended[i][k].split(/([t,s])$/i);
+                for (var i = 0; i < pg.suspended.length; i++) {
+                    for (var k = 1; k < (pg.suspended[i].length-1); k++) {
+                        tmp = pg.suspended[i][k].split(/([t,s])$/i);
                         if (tmp[0] == graph.nodes[newnodeindex].class) {
-                            var newnode = JSON.parse(parsedmodels[j].suspended[i][parsedmodels[j].suspended[i].length-1]);
+                            var newnode = JSON.parse(pg.suspended[i][pg.suspended[i].length-1]);
                             newnode.id = newnode.id + "." + count;
                             count++;
                             graph.nodes.push(newnode)
@@ -1203,16 +1222,19 @@ function addExistingMetabolite(e) {
         defineBackupGraph(); 
         setTimeout(function() {
             var rx = document.getElementById("existingMetabolites").value;
-            for (j in parsedmodels) {
-                for (var i = 0; i < parsedmodels[j].nodes.length; i++) {
-                    if (parsedmodels[j].nodes[i].class == rx) {
-                        graph.nodes.push(JSON.parse(JSON.stringify(parsedmodels[j].nodes[i])))
+            var found = findParsed(function(g) {
+                for (var i = 0; i < g.nodes.length; i++) {
+                    if (g.nodes[i].class == rx) {
+                        graph.nodes.push(JSON.parse(JSON.stringify(g.nodes[i])))
                         graph.nodes[graph.nodes.length-1].id = graph.nodes[graph.nodes.length-1].id + "." + count;
                         count++;
-                        reDefineSimulation()
-                        return
+                        return true;
                     }
                 }
+            })
+            if (found != null) {
+                reDefineSimulation()
+                return
             }
 
             var newnode = newnodetemp(rx,2)
@@ -1284,6 +1306,7 @@ function reDefineColors() {
     reDefineSimulation()
     manageTooltips()
     node.classed("selected",function(d){return d.selected})
+    if (usecanvas) {requestCanvas()}
 }
 function defineLinkColor(d){
     if (d.flux != null && d.flux*d.reversed >= fluxmax) {
@@ -1298,23 +1321,49 @@ function defineLinkColor(d){
         return color(9)
     }
 }
-function defineFluxColor(val) {
-    for (var i = 0; i < rxncolorbreaks.length; i++) {if (val < rxncolorbreaks[i]) {break}}
-    if (i == rxncolorbreaks.length) {i = rxncolorbreaks.length-1;}
+function defineLinkWidth(l) {
+    if (l.width == null) {
+        return Number(document.getElementById("strokewidth").value);
+    } else {
+        return (l.width < minwidth ? minwidth:(l.width > maxwidth ? maxwidth:l.width))*Number(document.getElementById("widthscale").value);
+    }
+}
+//Color tables along the color scales, rebuilt when the breaks or colors change
+var colortablesize = 256,
+    fluxcolortable = null,
+    metcolortable = null;
+function defineColorTable(breaks,colors,table) {
+    if (table != null && table.breaks === breaks && table.colors === colors) {return table;}
+    table = {breaks: breaks, colors: colors, values: new Array(colortablesize)};
+    var min = breaks[0],
+        step = (breaks[breaks.length-1] - min)/(colortablesize-1);
+    for (var k = 0; k < colortablesize; k++) {table.values[k] = interpolateColor(min + k*step,breaks,colors)}
+    return table;
+}
+function readColorTable(table,val) {
+    var min = table.breaks[0],
+        k = Math.round((val - min)/(table.breaks[table.breaks.length-1] - min)*(colortablesize-1));
+    if (!(k > 0)) {k = 0;}
+    if (k > colortablesize-1) {k = colortablesize-1;}
+    return table.values[k];
+}
+function interpolateColor(val,breaks,colors) {
+    for (var i = 0; i < breaks.length; i++) {if (val < breaks[i]) {break}}
+    if (i == breaks.length) {i = breaks.length-1;}
+    if (i == 0) {i = 1;}
     var col = [];
     for (var j = 0; j < 3; j++) {
-        col.push(Math.round(rxncolor[i-1][j] + (rxncolor[i][j] - rxncolor[i-1][j]) * ((val - rxncolorbreaks[i-1]) /(rxncolorbreaks[i] - rxncolorbreaks[i-1]))))
+        col.push(Math.round(colors[i-1][j] + (colors[i][j] - colors[i-1][j]) * ((val - breaks[i-1]) /(breaks[i] - breaks[i-1]))))
     }
     return rgbToHex(col)
 }
+function defineFluxColor(val) {
+    fluxcolortable = defineColorTable(rxncolorbreaks,rxncolor,fluxcolortable);
+    return readColorTable(fluxcolortable,val)
+}
 function defineFluxColorMet(val) {
-    for (var i = 0; i < metcolorbreaks.length; i++) {if (val < metcolorbreaks[i]) {break}}
-    if (i == metcolorbreaks.length) {i = metcolorbreaks.length-1;}
-    var col = [];
-    for (var j = 0; j < 3; j++) {
-        col.push(Math.round(metcolor[i-1][j] + (metcolor[i][j] - metcolor[i-1][j]) * ((val - metcolorbreaks[i-1]) /(metcolorbreaks[i] - metcolorbreaks[i-1]))))
-    }
-    return rgbToHex(col)
+    metcolortable = defineColorTable(metcolorbreaks,metcolor,metcolortable);
+    return readColorTable(metcolortable,val)
 }
 
 function addAs(condition) {
@@ -1463,6 +1512,7 @@ function renameNodes() {
 
         tmp = tmp.map((d) => {return d+1.2});
     }
+    if (usecanvas) {requestCanvas()}
 }
 function editNodeProperties(d) {
 
@@ -1923,7 +1973,7 @@ function manageArrows() {
         arrows = gDraw.append("g")
         .attr("class","arrows")
         .selectAll(".arrows")
-        .data(graph.links)
+        .data(usecanvas ? [] : graph.links)
         .enter().append("svg:path")
         .style("fill",defineLinkColor)
     } else {
@@ -2474,8 +2524,8 @@ function trackMet() {
         graph.nodes[0].index = 0;
         graph.links = [];
 
-        for (j in parsedmodels) {
-            parsedmodels[j].links.forEach(function(l){
+        findParsed(function(pg,j) {
+            pg.links.forEach(function(l){
                 if (l.source.class == graph.nodes[0].class) {
                     graph.links.push(JSON.parse(JSON.stringify(l)));
                     graph.links[graph.links.length-1].source = graph.nodes[0];
@@ -2498,7 +2548,7 @@ function trackMet() {
                     graph.nodes[graph.nodes.length-1].jparse = j;
                 }
             })
-        }
+        })
     }
     graph.nodes.forEach(function(d){
         d.bezi = [null, null, null, null]; 
@@ -3361,51 +3411,65 @@ shelveStandard3 = () => {
 }
 
 function shelveList(vec) {
-
     var re = new RegExp(vec, "i");
+    shelveMatching(function(c){return re.test(c)})
+}
+//Shelve the metabolites with the given IDs, matched by SAMMIpy
+function shelveIds(ids) {
+    var set = new Set(ids);
+    shelveMatching(function(c){return set.has(c)})
+}
+function shelveMatching(match) {
     selected = [];
 
-    for (j in parsedmodels) {
-        //select right ones
-        for (var i = parsedmodels[j].nodes.length-1; i > -1; i--) {
-            var d = parsedmodels[j].nodes[i];
-            if (re.test(d.class) && d.group == 2 ){
-                var linktodel = [];
-                var cursel = [d.id];
-
-                for (var k = 0; k < parsedmodels[j].links.length; k++){
-                    if (parsedmodels[j].links[k].target.id == d.id) {
-                        linktodel.push(parsedmodels[j].links[k].index);
-                        cursel.push(parsedmodels[j].links[k].source.id + "t")
-                    } else if (parsedmodels[j].links[k].source.id == d.id) {
-                        linktodel.push(parsedmodels[j].links[k].index);
-                        cursel.push(parsedmodels[j].links[k].target.id + "s")
-                    }
-                }
-                cursel.push(JSON.stringify(d))
-                parsedmodels[j].suspended.push(cursel);
-
-                for (var k = linktodel.length - 1; k > -1; k--){
-                    parsedmodels[j].links.splice(linktodel[k],1)
-                }
-
-                parsedmodels[j].nodes.splice(d.index,1)
-    
-                for (var k = 0; k < parsedmodels[j].links.length; k++){
-                    parsedmodels[j].links[k].index = k;
-                }
-                for (var k = 0; k < parsedmodels[j].nodes.length; k++){
-                    parsedmodels[j].nodes[k].index = k;
-                }
-            } 
-        }
+    for (j of builtParsed()) {
+        shelveGraph(parsedmodels[j],match)
     }
+    //Subgraphs built later are shelved when built
+    pendingshelve.push(match)
 
     defineSuspended()
     reDefineSimulation()
     node.classed("selected",function(d){return d.selected})
     simulation.restart()
 }
+//Shelve the metabolites of a graph whose class is matched, reading the links once
+function shelveGraph(g,match) {
+    var shelved = {};
+    for (var i = g.nodes.length-1; i > -1; i--) {
+        var d = g.nodes[i];
+        if (d.group == 2 && match(d.class)) {shelved[d.id] = [d.id]}
+    }
+    if (Object.keys(shelved).length == 0) {return;}
+    var k = 0;
+    for (var i = 0; i < g.links.length; i++) {
+        var l = g.links[i];
+        if (shelved.hasOwnProperty(l.target.id)) {
+            shelved[l.target.id].push(l.source.id + "t")
+        } else if (shelved.hasOwnProperty(l.source.id)) {
+            shelved[l.source.id].push(l.target.id + "s")
+        } else {
+            l.index = k;
+            g.links[k++] = l;
+        }
+    }
+    g.links.length = k;
+    k = 0;
+    for (var i = g.nodes.length-1; i > -1; i--) {
+        var d = g.nodes[i];
+        if (shelved.hasOwnProperty(d.id)) {
+            shelved[d.id].push(JSON.stringify(d))
+            g.suspended.push(shelved[d.id]);
+        }
+    }
+    for (var i = 0; i < g.nodes.length; i++) {
+        if (!shelved.hasOwnProperty(g.nodes[i].id)) {
+            g.nodes[i].index = k;
+            g.nodes[k++] = g.nodes[i];
+        }
+    }
+    g.nodes.length = k;
+}
 
 selectConnected = () => {
     graph.nodes.filter(function(d){return d.selected})
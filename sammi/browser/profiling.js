@@ -0,0 +1,81 @@
+//Timing of the loading stages of the page with performance marks and measures, logged to the console.
+//Started by SAMMIpy pages written with the profile option, before the model and data are loaded. The measures
+//can be read in the performance panel of the browser, or with profileReport()
+var profilepage = false,
+    profilenames = [];
+
+//Functions measured on each call: inflating payloads, loading models, maps, and subgraphs, and loading data
+var profiledfunctions = ["inflatePayload","receivedJSONwrapper","filterWrapper","receivedTextSammi","receivedSammiMap","addParsedSubgraphs","receivedTextFlux",
+    "receivedTextConcentration","receivedTextSizeRxn","receivedTextSizeMet","receivedTextWidth","receivedDataColumns"];
+
+function startProfile() {
+    profilepage = true;
+    profiledfunctions.forEach(profileFunction);
+    //Watch the simulation once the first graph is loaded, since loading it restarts the simulation
+    ["receivedJSONwrapper","filterWrapper","receivedSammiMap"].forEach(function(name) {
+        var fun = window[name];
+        window[name] = function() {
+            var res = fun.apply(this,arguments);
+            watchSettle();
+            return res;
+        }
+    })
+}
+
+//Add a measure named name between two marks, and log it
+function profileMeasure(name,start,end) {
+    performance.measure(name,start,end);
+    var m = performance.getEntriesByName(name,"measure");
+    m = m[m.length - 1];
+    if (profilenames.indexOf(name) == -1) {profilenames.push(name)}
+    console.log("SAMMI profile: " + name + " " + m.duration.toFixed(1) + " ms");
+}
+
+//Replace a global function by one measuring each call. Calls returning a promise are measured until it settles
+function profileFunction(name) {
+    var fun = window[name];
+    window[name] = function() {
+        performance.mark(name + " start");
+        var res = fun.apply(this,arguments);
+        if (res && typeof res.then == "function") {
+            return res.then(function(v) {
+                performance.mark(name + " end");
+                profileMeasure(name,name + " start",name + " end");
+                return v;
+            })
+        }
+        performance.mark(name + " end");
+        profileMeasure(name,name + " start",name + " end");
+        return res;
+    }
+}
+
+//Measure the time from the start of the page until the force simulation of the first graph loaded settles.
+//Simulations still running after two minutes, for instance stopped by the user, are not measured
+var settlewatch = false;
+function watchSettle() {
+    if (settlewatch) {return;}
+    settlewatch = true;
+    var started = performance.now();
+    function check() {
+        var sim = simulation && simulation.sim ? simulation.sim : simulation;
+        if (simulation && simulation.alpha() < sim.alphaMin()) {
+            performance.mark("simulation settled");
+            profileMeasure("first simulation settle",undefined,"simulation settled");
+        } else if (performance.now() - started < 120000) {
+            requestAnimationFrame(check);
+        }
+    }
+    requestAnimationFrame(check);
+}
+
+//Durations of the measures recorded, in milliseconds
+function profileReport() {
+    var report = [];
+    profilenames.forEach(function(name) {
+        performance.getEntriesByName(name,"measure").forEach(function(m) {
+            report.push({name: name, start: m.startTime, duration: m.duration});
+        })
+    })
+    return report.sort(function(a,b) {return a.start - b.start});
+}
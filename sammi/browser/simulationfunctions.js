@@ -103,7 +103,8 @@ var svg,
     sizemetobj = {},
     linkwidthobj = {},
     sscale,
-    curtr = [0,0,1];
+    curtr = [0,0,1],
+    layoutalpha = 0.05;
 
     var numsts = ["labelsize", "addedtextsize", "strokewidth", "nodescale",
         "linkstrength", "nodestrength", "maparea", "velocityDecay", "centerstrength",
@@ -224,6 +225,7 @@ function zoomed() {
     if (document.getElementById("sizeref").checked) {
         drawSizeReference();
     }
+    if (usecanvas) {requestCanvas()}
 }
 
 function brushed() {
@@ -232,6 +234,19 @@ function brushed() {
 
     var extent = d3.event.selection;
 
+    //Nodes drawn in the canvas are selected from the graph, without updating their elements
+    if (usecanvas) {
+        var sel = new Set(selected);
+        graph.nodes.forEach(function(d) {
+            d.selected = d.previouslySelected ^
+            (extent[0][0] <= d.x && d.x < extent[1][0]
+             && extent[0][1] <= d.y && d.y < extent[1][1])
+            if (d.selected && !sel.has(d.index)) {selected.push(d.index); sel.add(d.index)};
+        })
+        requestCanvas()
+        return;
+    }
+
     node.classed("selected", function(d) {
         d.selected = d.previouslySelected ^
         (extent[0][0] <= d.x && d.x < extent[1][0]
@@ -1216,63 +1231,67 @@ function ticked() {
     link.attr("d",function(d){return d.bpath;})
     arrows.attr("d",function(d){return d.ppath;})
 
-    if (document.getElementById("linkstrain").checked) {
-        var tmpmincol = hexToRgb(document.getElementById("edgecolor").value),
-            tmpminval = maxatcf/2,
-            tmpmaxcol = hexToRgb(document.getElementById("linkstraincolor").value),
-            tmpmaxval = maxatcf;
-        
-        if (tmpminval >= tmpmaxval) {
-            link.style("stroke",document.getElementById("edgecolor").value)
-        } else {
-            link.style("stroke",function(l){
-                if (l.atcf > tmpmaxval) {
-                    return document.getElementById("linkstraincolor").value
-                } else if (l.atcf < tmpminval) {
-                    return document.getElementById("edgecolor").value;
-                } else {
-                    var col = [],
-                    tmpscale = (l.atcf-tmpminval)/(tmpmaxval-tmpminval);
-                    for (var j = 0; j < 3; j++) {
-                        col.push(Math.round(tmpmincol[j] + ((tmpmaxcol[j]-tmpmincol[j])*tmpscale)))
-                    }
-                    return rgbToHex(col)
-                }
-            })
-        }
-    }
+    canvasstrain = document.getElementById("linkstrain").checked ? defineLinkStrain(maxatcf) : null;
+    if (canvasstrain) {link.style("stroke",canvasstrain)}
 
+    //Nodes drawn in the canvas have no elements to move
+    if (usecanvas) {
+        canvasChanged()
+        return;
+    }
     circlenode.attr("cx", function(d) { return d.x; })
         .attr("cy", function(d) { return d.y; });
     rectnode.attr("x", function(d) { return d.x-d.r; })
         .attr("y", function(d) { return d.y-d.r; });
+}
+
+//Color of links by strain, from the edge color at half the longest link to the strain color at the longest link
+function defineLinkStrain(maxatcf) {
+    var tmpmincol = hexToRgb(document.getElementById("edgecolor").value),
+        tmpminval = maxatcf/2,
+        tmpmaxcol = hexToRgb(document.getElementById("linkstraincolor").value),
+        tmpmaxval = maxatcf;
 
+    if (tmpminval >= tmpmaxval) {
+        return function() {return document.getElementById("edgecolor").value}
+    }
+    return function(l){
+        if (l.atcf > tmpmaxval) {
+            return document.getElementById("linkstraincolor").value
+        } else if (l.atcf < tmpminval) {
+            return document.getElementById("edgecolor").value;
+        } else {
+            var col = [],
+            tmpscale = (l.atcf-tmpminval)/(tmpmaxval-tmpminval);
+            for (var j = 0; j < 3; j++) {
+                col.push(Math.round(tmpmincol[j] + ((tmpmaxcol[j]-tmpmincol[j])*tmpscale)))
+            }
+            return rgbToHex(col)
+        }
+    }
 }
 
 function defineSimulation() {
     drawShapes() 
     drawTexts()
 
+    //Nodes, links, and labels are drawn in a canvas instead of as SVG elements if usecanvas
     link = gDraw.append("g")
     .attr("class","link")
     .selectAll(".link")
-    .data(graph.links)
+    .data(usecanvas ? [] : graph.links)
     .enter().append("svg:path")
         .attr("class", "link")
         .style("stroke",defineLinkColor)
         .attr("fill","none")
-        .attr("stroke-width",function(l) {
-            if (l.width == null) {
-                return Number(document.getElementById("strokewidth").value);
-            } else {
-                return (l.width < minwidth ? minwidth:(l.width > maxwidth ? maxwidth:l.width))*Number(document.getElementById("widthscale").value);
-            }
-            
-        });
+        .attr("stroke-width",defineLinkWidth);
 
     manageArrows()
 
-    node = gDraw.append("g")
+    //Nodes drawn in the canvas keep elements outside the page, so selecting, filtering, and dragging them works
+    //as for SVG elements without drawing them
+    var nodeparent = usecanvas ? d3.select(document.createElementNS(d3.namespaces.svg,"g")) : d3;
+    node = (usecanvas ? nodeparent : gDraw).append("g")
     .attr("class", "node")
     
     node = node.selectAll(".node")
@@ -1299,9 +1318,9 @@ function defineSimulation() {
     node.filter(function(d){return d.group != 1 && d.group != 2})
         .append("circle").attr("class","circlenode")
 
-    node = d3.selectAll(".rectnode,.circlenode")
-    rectnode = d3.selectAll(".rectnode")
-    circlenode = d3.selectAll(".circlenode")
+    node = nodeparent.selectAll(".rectnode,.circlenode")
+    rectnode = nodeparent.selectAll(".rectnode")
+    circlenode = nodeparent.selectAll(".circlenode")
 
     node.attr("fill", defineNodeColor)
     .attr("stroke", defineNodeColor)
@@ -1353,7 +1372,7 @@ function defineSimulation() {
     text = gDraw.append("g")
         .attr("class","labels")
         .selectAll("text")
-        .data(graph.nodes)
+        .data(usecanvas ? [] : graph.nodes)
         .enter().append("text")
         .style("font-size", document.getElementById("labelsize").value + "px")
         //.attr("x", function(d) {return d.x + d.labelshift[0];})
@@ -1364,6 +1383,7 @@ function defineSimulation() {
     renameNodes()
 
     reDefineSimulationParameters()
+    if (usecanvas) {defineCanvas()}
 }
 
 function reDefineSimulation() {
@@ -1405,9 +1425,27 @@ function reDefineSimulation() {
         }
     })
 
+    var placed = placeLayout(graph)
     defineSimulation()
+    if (placed) {simulation.alpha(layoutalpha)}
     if (document.getElementById("sizeref").checked) {drawSizeReference();}
     node.classed("selected",function(d){return d.selected})
     defineSuspended()
     simulation.restart()
+}
+
+//Place nodes laid out by SAMMIpy around the center of the map, so the simulation only needs a short warm-up
+function placeLayout(g) {
+    var placed = false;
+    g.nodes.forEach(function(d) {
+        if (d.layout) {
+            d.x = parentWidth/2 + d.layout[0];
+            d.y = parentHeight/2 + d.layout[1];
+            d.vx = 0;
+            d.vy = 0;
+            delete d.layout;
+            placed = true;
+        }
+    })
+    return placed;
 }
\ No newline at end of file
@@ -18,8 +18,12 @@
 ////////////////////////////////////
 //Load SAMMI model
 function receivedTextSammi(e) {
-    
-    parsedmodels = JSON.parse(e);
+    receivedSammiMap(JSON.parse(e))
+}
+//Load a SAMMI map object. Links only need the index of their source and target nodes
+function receivedSammiMap(e) {
+
+    parsedmodels = e;
 
     selected = parsedmodels.selected;
     delete parsedmodels.selected;
@@ -33,8 +37,8 @@ function receivedTextSammi(e) {
     backups = parsedmodels.backups
     delete parsedmodels.backups;
 
-    fluxobj = parsedmodels.fluxobj;
-    concobj = parsedmodels.concobj;
+    fluxobj = objectToDataStore(parsedmodels.fluxobj);
+    concobj = objectToDataStore(parsedmodels.concobj);
     delete parsedmodels.fluxobj;
     delete parsedmodels.concobj;
 
@@ -102,13 +106,13 @@ function receivedTextSammi(e) {
     defineMetColorBar()
 
     //Reaction node size
-    sizerxnobj = parsedmodels.sizerxnobj;
+    sizerxnobj = objectToDataStore(parsedmodels.sizerxnobj);
     delete parsedmodels.sizerxnobj;
 
-    sizemetobj = parsedmodels.sizemetobj;
+    sizemetobj = objectToDataStore(parsedmodels.sizemetobj);
     delete parsedmodels.sizemetobj;
 
-    linkwidthobj = parsedmodels.linkwidthobj;
+    linkwidthobj = objectToDataStore(parsedmodels.linkwidthobj);
     delete parsedmodels.linkwidthobj;
 
     backupgraph = parsedmodels.backupgraph
@@ -450,6 +454,10 @@ function receivedJSON(e) {
             }
         }
     }
+    //Positions laid out by SAMMIpy
+    if (ograph.layout) {
+        graph.nodes.forEach(function(d,i){d.layout = [ograph.layout.x[i],ograph.layout.y[i]]})
+    }
     defineNameOptions()
 }
 function receivedJSONwrapper(e) {
@@ -464,8 +472,145 @@ function receivedJSONwrapper(e) {
     reDefineSimulation()
 }
 
+//Load a script written by SAMMIpy next to the page, then run callback
+function loadScript(src,callback) {
+    var script = document.createElement("script");
+    script.src = src;
+    script.onload = callback;
+    document.body.appendChild(script);
+}
+//Load a payload file written by SAMMIpy next to the page, then run callback
+function loadPayload(src,callback) {
+    loadScript(src,function() {
+        Promise.resolve(sammiPayload()).then(function() {
+            if (callback) {callback()}
+        })
+    })
+}
+
+//Inflate a compressed base64 payload with the browser DecompressionStream and run it in global scope
+function inflatePayload(str,method) {
+    var stream = new Blob([base64ToBytes(str)]).stream().pipeThrough(new DecompressionStream(method));
+    return new Response(stream).text().then(function(code) {
+        (0,eval)(code);
+    })
+}
+
+//Live session with SAMMIpy. Each message is javascript run in global scope, in the order sent
+var sessionsocket = null;
+function connectSession(url) {
+    sessionsocket = new WebSocket(url);
+    sessionsocket.binaryType = "arraybuffer";
+    sessionsocket.onmessage = function(event) {
+        if (event.data instanceof ArrayBuffer) {
+            receivedDataColumns(event.data);
+        } else {
+            (0,eval)(event.data);
+        }
+    }
+    sessionsocket.onclose = function() {
+        sessionsocket = null;
+        console.log("SAMMIpy session closed");
+    }
+}
+
+//Data layers that conditions can be appended to: the store, condition selector, switch function, and either the
+//color scale of each condition or the global range of the values
+var streamlayers = {
+    "reactions color": {store: function(){return fluxobj}, select: "fluxscroll", swap: FluxSetSwitch, scale: ["rcs","rcbs"]},
+    "metabolites color": {store: function(){return concobj}, select: "concscroll", swap: ConcSetSwitch, scale: ["mcs","mcbs"]},
+    "reactions size": {store: function(){return sizerxnobj}, select: "rxnsizescroll", swap: RxnSizeSetSwitch, range: ["minrxnsize","maxrxnsize"]},
+    "metabolites size": {store: function(){return sizemetobj}, select: "metsizescroll", swap: MetSizeSetSwitch, range: ["minmetsize","maxmetsize"]},
+    "links size": {store: function(){return linkwidthobj}, select: "widthscroll", swap: WidthSetSwitch, range: ["minwidth","maxwidth"]}
+};
+//Append conditions sent by a SAMMIpy session to loaded data. The message holds the length of a JSON header, the
+//header, padding to eight bytes, and the values of each condition. Previous conditions are not read again
+function receivedDataColumns(buffer) {
+    var n = new DataView(buffer).getUint32(0,true),
+        head = JSON.parse(new TextDecoder().decode(new Uint8Array(buffer,4,n))),
+        offset = Math.ceil((4 + n)/8)*8,
+        layer = streamlayers[head.group + " " + head.kind],
+        store = layer.store(),
+        select = document.getElementById(layer.select);
+    if (!store.ttls || store.ids.length != head.rows) {
+        console.log("No loaded " + head.group + " " + head.kind + " data matching the appended conditions");
+        return;
+    }
+    var last = select.selectedIndex == select.options.length - 1;
+    head.names.forEach(function(name,j){
+        var c = new Float64Array(buffer,offset + 8*j*head.rows,head.rows),
+            min = Infinity,
+            max = -Infinity;
+        for (var i = 0; i < c.length; i++) {
+            if (store.absolute) {c[i] = Math.abs(c[i])}
+            if (c[i] < min) {min = c[i]}
+            if (c[i] > max) {max = c[i]}
+        }
+        store.ttls.push(name);
+        store.columns.push(c);
+        store.min.push(min);
+        store.max.push(max);
+        //New conditions take the color scale of the last one, widened to their values
+        if (layer.scale) {
+            var colors = store[layer.scale[0]],
+                breaks = store[layer.scale[1]],
+                b = breaks[breaks.length-1].slice();
+            b[0] = Math.min(b[0],min);
+            b[b.length-1] = Math.max(b[b.length-1],max);
+            colors.push(colors[colors.length-1]);
+            breaks.push(b);
+        } else {
+            var range = layer.range;
+            window[range[0]] = Math.max(Math.min(window[range[0]],min),0);
+            window[range[1]] = Math.max(window[range[1]],max);
+            document.getElementById(range[0]).value = window[range[0]];
+            document.getElementById(range[1]).value = window[range[1]];
+        }
+        var option = document.createElement("option");
+        option.innerHTML = name;
+        select.appendChild(option);
+    })
+    //Show the newest condition if the last one was shown
+    if (head.follow && last) {
+        select.selectedIndex = select.options.length - 1;
+        layer.swap(select);
+    }
+}
+
+//Add subgraphs, given as positions of reactions in the model graph sammimodel, to the map.
+//Maps not loaded as subgraphs are replaced by the new subgraphs
+function addParsedSubgraphs(e) {
+    if (fullgraph == null) {
+        graph = sammimodel;
+        filterWrapper(e);
+        return;
+    }
+    var select = document.getElementById("onloadf1");
+    for (var i = 0; i < e.length; i++) {
+        var spec = e[i];
+        if (!(spec.name in parsedmodels)) {
+            var option = document.createElement("option")
+            option.innerHTML = spec.name;
+            option.id = spec.name;
+            select.appendChild(option)
+        }
+        builtorder = builtorder.filter(function(j){return j != spec.name});
+        defineLazyParsed(spec.name,buildParsedFromIndex.bind(null,spec))
+        specFluxRange(spec)
+    }
+    //The flux range follows loaded data if there is any
+    if (document.getElementById("fluxscroll") == null) {
+        fluxmax = fluxmaxtmp,
+        fluxmin = fluxmintmp;
+        document.getElementById("fluxmax").value = fluxmax;
+        document.getElementById("fluxmin").value = fluxmin;
+        defineFluxColorVectors();
+    }
+}
+
 //Download SAMMI fomat model
 function downloadSammi() {
+    if (!loadAllData(downloadSammi)) {return;}
     parsedmodels[currentparsed] = graph;
     if (Object.keys(fluxobj).length > 0) {
         id = fluxobj.ttls.indexOf(document.getElementById("fluxscroll").value);
@@ -503,7 +648,7 @@ function downloadSammi() {
     for (i in checksts) {parsedmodels.checksts.push(document.getElementById(checksts[i]).checked)}
 
     element = document.createElement('a');
-    var bb = new Blob([JSON.stringify(parsedmodels)], {type: 'text/plain'});
+    var bb = new Blob([JSON.stringify(copyParsed(),writeBuiltParsed)], {type: 'text/plain'});
     element.href = window.URL.createObjectURL(bb);
 
     element.setAttribute('download', 'SAMMI.json');
@@ -535,6 +680,7 @@ function downloadSammi() {
 
 //Download Current graph SAMMI fomat model
 function downloadCurrent() {
+    if (!loadAllData(downloadCurrent)) {return;}
     //parameters
     parsedmodels[currentparsed] = graph;
     if (Object.keys(fluxobj).length > 0) {
@@ -608,6 +754,7 @@ function onLoadSwitch(d) {
     parsedmodels[currentparsed] = Object.assign({},graph);
     currentparsed = d.selectedOptions[0].id;
     graph = parsedmodels[currentparsed];
+    touchParsed(currentparsed)
 
     reDefineSimulation()
     node.classed("selected",function(d){return d.selected})
@@ -697,6 +844,7 @@ function receivedTextFilterFiles(e,mapname) {
 }
 function filterWrapper(e) {
     receivedJSON(graph)
+    fullgraph = graph;
 
     var place = document.getElementById("onloadoptions");
     var select = document.createElement("select");
@@ -715,12 +863,25 @@ function filterWrapper(e) {
     a.onclick = function(){nextScroll("onloadf1")}
     place.appendChild(a)
 
+    //Index links by reaction
+    var nmet = ograph.metabolites.length;
+    rxnlinks = ograph.reactions.map(function(){return []});
+    fullgraph.links.forEach(function(l,i){
+        var r = l.source.group == 1 ? l.source : l.target;
+        rxnlinks[r.index - nmet].push(i);
+    })
+    //Subgraphs are built when first shown
+    parsedmodels = {};
+    builtorder = [];
+    pendingshelve = [];
     for (var i = 0; i < e.length; i++) {
+        var spec = Array.isArray(e[i]) ? parseVectorToIndex(e[i]) : e[i];
         var option = document.createElement("option")
-        option.innerHTML = e[i][0];
-        option.id = e[i][0];
+        option.innerHTML = spec.name;
+        option.id = spec.name;
         select.appendChild(option)
-        receivedTextFilterFiles(e[i].slice(1),e[i][0])
+        defineLazyParsed(spec.name,buildParsedFromIndex.bind(null,spec))
+        specFluxRange(spec)
     }
     fluxmax = fluxmaxtmp,
     fluxmin = fluxmintmp;
@@ -728,15 +889,251 @@ function filterWrapper(e) {
     document.getElementById("fluxmax").value = fluxmax;
     document.getElementById("fluxmin").value = fluxmin;
 
-    nm = e[0][0];
+    nm = Array.isArray(e[0]) ? e[0][0] : e[0].name;
     graph = parsedmodels[nm];
     currentparsed = nm;
+    touchParsed(nm)
 
-    loadExistingReactionToAdd(parsedmodels)
+    loadExistingReactionToAdd({graph: fullgraph})
     loadInitialGraph()
     reDefineSimulation()
 }
 
+//Lazily built subgraphs
+var fullgraph,
+rxnlinks = [],
+builtorder = [],
+pendingshelve = [],
+maxbuiltparsed = 20;
+//Convert a subgraph of reaction IDs and flux strings to reaction positions in the full graph
+function parseVectorToIndex(vec) {
+    var pos = {};
+    ograph.reactions.forEach(function(d,i){pos[d.id] = i})
+    var spec = {name: vec[0], rxns: [], flux: []};
+    for (var i = 1; i < vec.length; i++) {
+        if (!(vec[i][0] in pos)) {continue;}
+        spec.rxns.push(pos[vec[i][0]]);
+        spec.flux.push(vec[i].length > 1 && vec[i][1].length > 0 && !isNaN(vec[i][1]) ? Number(vec[i][1]) : null);
+    }
+    return spec;
+}
+//Widen the flux range to the flux of a subgraph
+function specFluxRange(spec) {
+    var flux = spec.flux || spec.fluxvals;
+    if (!flux) {return;}
+    flux = flux.filter(function(d){return d != null});
+    if (spec.fill != null && spec.fluxrxns.length < spec.rxns.length) {flux.push(spec.fill)}
+    fluxmaxtmp = Math.max(...flux,fluxmaxtmp)
+    fluxmintmp = Math.min(...flux,fluxmintmp)
+}
+//Build a subgraph from the positions of its reactions in the full graph
+function buildParsedFromIndex(spec) {
+    var nmet = ograph.metabolites.length;
+    var keep = {};
+    var linkidx = [];
+    spec.rxns.forEach(function(r){
+        keep[nmet + r] = true;
+        rxnlinks[r].forEach(function(li){
+            var l = fullgraph.links[li];
+            keep[l.source.index] = true;
+            keep[l.target.index] = true;
+            linkidx.push(li);
+        })
+    })
+    var idx = Object.keys(keep).map(Number).sort(function(a,b){return a-b});
+    var newpos = {};
+    var g = {nodes: [], links: [], suspended: [], shapes: [], text: []};
+    idx.forEach(function(i,k){
+        var d = JSON.parse(JSON.stringify(fullgraph.nodes[i]));
+        d.index = k;
+        d.isfixed = false;
+        d.weight = 1.01;
+        newpos[i] = k;
+        g.nodes.push(d);
+    })
+    //Reaction flux. Sparse flux gives the reactions with values, the others take the fill value
+    if (spec.flux) {
+        spec.rxns.forEach(function(r,k){g.nodes[newpos[nmet + r]].flux = spec.flux[k]})
+    } else if (spec.fluxrxns) {
+        if (spec.fill != null) {spec.rxns.forEach(function(r){g.nodes[newpos[nmet + r]].flux = spec.fill})}
+        spec.fluxrxns.forEach(function(r,k){g.nodes[newpos[nmet + r]].flux = spec.fluxvals[k]})
+    }
+    //Links, removing duplicates
+    linkidx.filter(onlyUnique).sort(function(a,b){return a-b}).forEach(function(li,j){
+        var l = fullgraph.links[li];
+        var newlink = {index: j, flux: null, refx: l.refx, refy: l.refy, width: l.width, reversed: l.reversed,
+            source: g.nodes[newpos[l.source.index]], target: g.nodes[newpos[l.target.index]]};
+        if (newlink.source.flux != null || newlink.target.flux != null) {
+            newlink.flux = newlink.source.flux + newlink.target.flux;
+        }
+        g.links.push(newlink);
+    })
+    //Positions laid out by SAMMIpy
+    if (spec.layout) {
+        g.nodes.forEach(function(d,k){d.layout = [spec.layout.x[k],spec.layout.y[k]]})
+    }
+    pendingshelve.forEach(function(match){shelveGraph(g,match)})
+    return g;
+}
+//Define a subgraph that is built, or restored, upon first access. Built subgraphs are counted in the recently used ones
+function defineLazyParsed(name,build) {
+    var get = function() {
+        var g = buildLazyParsed(build);
+        setParsed(name,g);
+        touchParsed(name);
+        return g;
+    }
+    get.build = build;
+    Object.defineProperty(parsedmodels,name,{configurable: true, enumerable: true, get: get,
+        set: function(g) {setParsed(name,g)}
+    })
+}
+//Build a subgraph with its builder, remembering the builder so the subgraph can be rebuilt when evicted
+function buildLazyParsed(build) {
+    var g = build();
+    applyLoadedData(g);
+    Object.defineProperty(g,"build",{value: build.base || build, configurable: true, writable: true});
+    return g;
+}
+function setParsed(name,g) {
+    Object.defineProperty(parsedmodels,name,{value: g, writable: true, enumerable: true, configurable: true})
+}
+//Names of the subgraphs that have been built
+function builtParsed() {
+    return Object.keys(parsedmodels).filter(function(j){
+        return "value" in Object.getOwnPropertyDescriptor(parsedmodels,j);
+    })
+}
+//Run f on each subgraph until it returns true, returning the name of that subgraph. Subgraphs that are not
+//built are only built for the call, so looking through every subgraph does not keep them all built
+function findParsed(f) {
+    for (var j of Object.keys(parsedmodels)) {
+        var desc = Object.getOwnPropertyDescriptor(parsedmodels,j);
+        if (f("value" in desc ? desc.value : buildLazyParsed(desc.get.build),j)) {return j;}
+    }
+}
+//Subgraphs and fields of parsedmodels, without building the subgraphs that are not built. These are given as their builder
+function copyParsed() {
+    var copy = {};
+    Object.keys(parsedmodels).forEach(function(j){
+        var desc = Object.getOwnPropertyDescriptor(parsedmodels,j);
+        copy[j] = "value" in desc ? desc.value : desc.get.build;
+    })
+    return copy;
+}
+//Replacer writing the builders of a copy of the subgraphs as the subgraphs they build
+function writeBuiltParsed(k,v) {
+    return typeof v == "function" ? buildLazyParsed(v) : v;
+}
+//Mark a subgraph as recently used, and evict the least recently used ones if there are too many
+function touchParsed(name) {
+    builtorder = builtorder.filter(function(j){return j != name});
+    builtorder.push(name);
+    var current = [];
+    while (builtorder.length > maxbuiltparsed) {
+        var old = builtorder.shift();
+        var desc = Object.getOwnPropertyDescriptor(parsedmodels,old);
+        if (desc == null || !("value" in desc)) {continue;}
+        //The subgraph shown stays built, and is evicted once another one is shown
+        if (old == currentparsed) {
+            current.push(old);
+            continue;
+        }
+        defineLazyParsed(old,evictedBuilder(desc.value))
+    }
+    builtorder = current.concat(builtorder);
+}
+//Builder restoring an evicted subgraph. Subgraphs with the nodes and links their builder makes are rebuilt, and only
+//node positions and the fields that changed are kept. Subgraphs edited since they were built are kept as a compact copy
+var positionfields = ["x","y","vx","vy","fx","fy"];
+function evictedBuilder(g) {
+    var base = g.build;
+    var fresh = base ? base() : null;
+    if (fresh == null || !sameStructure(g,fresh)) {
+        //Keep a compact copy with links pointing to node indexes
+        var snapshot = JSON.stringify(g,function(k,v){
+            return (k == "source" || k == "target") && v != null && typeof v == "object" ? v.index : v;
+        })
+        return function(){
+            var c = JSON.parse(snapshot);
+            c.links.forEach(function(l){
+                l.source = c.nodes[l.source];
+                l.target = c.nodes[l.target];
+            })
+            return c;
+        }
+    }
+    var pos = new Float64Array(g.nodes.length*positionfields.length);
+    g.nodes.forEach(function(d,i){
+        positionfields.forEach(function(f,k){pos[i*positionfields.length + k] = d[f] == null ? NaN : d[f]})
+    })
+    var nodediff = changedFields(g.nodes,fresh.nodes,positionfields),
+    linkdiff = changedFields(g.links,fresh.links,["source","target"]),
+    rest = {};
+    for (var k in g) {
+        if (k != "nodes" && k != "links") {rest[k] = g[k]}
+    }
+    var build = function() {
+        var c = base();
+        c.nodes.forEach(function(d,i){
+            positionfields.forEach(function(f,k){
+                var v = pos[i*positionfields.length + k];
+                d[f] = isNaN(v) ? (f == "fx" || f == "fy" ? null : undefined) : v;
+            })
+        })
+        applyChangedFields(c.nodes,nodediff);
+        applyChangedFields(c.links,linkdiff);
+        return Object.assign(c,JSON.parse(JSON.stringify(rest)));
+    }
+    build.base = base;
+    return build;
+}
+//Whether a subgraph has the nodes and links of another, in the same order
+function sameStructure(g,h) {
+    if (g.nodes.length != h.nodes.length || g.links.length != h.links.length) {return false;}
+    for (var i = 0; i < g.nodes.length; i++) {
+        if (g.nodes[i].id != h.nodes[i].id || g.nodes[i].index != i) {return false;}
+    }
+    for (var i = 0; i < g.links.length; i++) {
+        if (g.links[i].source.index != h.links[i].source.index || g.links[i].target.index != h.links[i].target.index) {return false;}
+    }
+    return true;
+}
+//Fields of each object of items differing from the matching object of built, by position, leaving out skip
+function changedFields(items,built,skip) {
+    var diff = {};
+    items.forEach(function(d,i){
+        var b = built[i],
+        changed = null;
+        for (var f of new Set(Object.keys(d).concat(Object.keys(b)))) {
+            if (skip.indexOf(f) != -1 || d[f] === b[f]) {continue;}
+            if (d[f] != null && typeof d[f] == "object" && JSON.stringify(d[f]) == JSON.stringify(b[f])) {continue;}
+            if (changed == null) {changed = diff[i] = {}}
+            changed[f] = d[f];
+        }
+    })
+    return diff;
+}
+function applyChangedFields(items,diff) {
+    for (var i in diff) {
+        for (var f in diff[i]) {
+            var v = diff[i][f];
+            if (v === undefined) {delete items[i][f]} else {items[i][f] = v != null && typeof v == "object" ? JSON.parse(JSON.stringify(v)) : v}
+        }
+    }
+}
+//Apply the currently selected data conditions to a newly built subgraph
+function applyLoadedData(g) {
+    if (fluxobj.ttls) {
+        applyDataColumn([g],fluxobj,document.getElementById("fluxscroll").selectedIndex,1,"flux")
+        sumLinkValues([g],"flux")
+    }
+    if (concobj.ttls) {applyDataColumn([g],concobj,document.getElementById("concscroll").selectedIndex,2,"concentration")}
+    if (sizerxnobj.ttls) {applyDataColumn([g],sizerxnobj,sizerxnobj.ttls.indexOf(document.getElementById("rxnsizescroll").value),1,"size")}
+    if (sizemetobj.ttls) {applyDataColumn([g],sizemetobj,sizemetobj.ttls.indexOf(document.getElementById("metsizescroll").value),2,"size")}
+    if (linkwidthobj.ttls) {applyWidthColumn([g],linkwidthobj,linkwidthobj.ttls.indexOf(document.getElementById("widthscroll").value))}
+}
+
 //Switch flux values
 //Load flux values
 function nextScrollF(nodeid) {
@@ -752,9 +1149,14 @@ function previousScrollF(nodeid) {
     FluxSetSwitch(x)
 }
 function FluxSetSwitch(opt) {
-    if(tracking){trackMet()}
    //Define index to switch it to
    var id = opt.selectedIndex;
+    if (!dataColumnLoaded(fluxobj,id)) {
+        loadDataColumn(fluxobj,id,function(){FluxSetSwitch(opt)})
+        return;
+    }
+    prefetchDataColumns(fluxobj,id)
+    if(tracking){trackMet()}
    //Remove previous color breaks
    var x = document.getElementsByClassName("rxnbreakcol");
    while (x.length > 0) {
@@ -785,51 +1187,309 @@ function FluxSetSwitch(opt) {
         }
     }
     defineFluxColorBar()
-    //Reset all values to null
-    for (j in parsedmodels) {
-        parsedmodels[j].nodes.forEach(function(d){
-            d.flux = null;
-            return d;
-        })
-    }
     //Set values to new
-    var rxn = Object.keys(fluxobj);
-    rxn.shift(); rxn.pop(); rxn.pop();
-    for (j in parsedmodels) {
-        parsedmodels[j].nodes.forEach(function(d){
-            index = rxn.indexOf(d.class);
-            if (index != -1 && d.group == 1) {d.flux = fluxobj[rxn[index]][id]}
-            return d;
+    applyDataColumn(builtGraphs(),fluxobj,id,1,"flux")
+    sumLinkValues(builtGraphs(),"flux")
+    reDefineColors()
+    manageTooltips()
+    node.classed("selected",function(d){return d.selected})
+}
+//Parse a data value. Numbers come from binary blocks and strings from text vectors
+function parseDataValue(d) {
+    if (typeof d == "number") {return isNaN(d) ? null : d;}
+    if (d == null || d === "" || isNaN(d)) {return null;}
+    return Number(d);
+}
+//Decode base64 string into bytes
+function base64ToBytes(str) {
+    var bin = atob(str);
+    var bytes = new Uint8Array(bin.length);
+    for (var i = 0; i < bin.length; i++) {bytes[i] = bin.charCodeAt(i);}
+    return bytes;
+}
+//Condition of sparse data: the rows holding values, in increasing order, and their values. Other rows take the fill
+//value, NaN if missing. Values are looked up when the condition is selected, so the condition is never expanded
+class SparseColumn {
+    constructor(length,rows,vals,fill) {
+        this.length = length;
+        this.rows = rows;
+        this.vals = vals;
+        this.fill = fill == null ? NaN : fill;
+    }
+    get(i) {
+        var lo = 0, hi = this.rows.length - 1;
+        while (lo <= hi) {
+            var mid = (lo + hi) >> 1;
+            if (this.rows[mid] < i) {lo = mid + 1} else if (this.rows[mid] > i) {hi = mid - 1} else {return this.vals[mid]}
+        }
+        return this.fill;
+    }
+    abs() {
+        for (var k = 0; k < this.vals.length; k++) {this.vals[k] = Math.abs(this.vals[k])}
+        this.fill = Math.abs(this.fill);
+    }
+    //Minimum and maximum, including the fill value if some rows take it
+    range() {
+        var min = Infinity, max = -Infinity;
+        for (var k = 0; k < this.vals.length; k++) {
+            if (this.vals[k] < min) {min = this.vals[k]}
+            if (this.vals[k] > max) {max = this.vals[k]}
+        }
+        if (this.rows.length < this.length) {
+            if (this.fill < min) {min = this.fill}
+            if (this.fill > max) {max = this.fill}
+        }
+        return [min,max];
+    }
+}
+//Value of a row of a condition, dense or sparse, with missing values as NaN
+function columnValue(c,i) {
+    return c instanceof SparseColumn ? c.get(i) : c[i];
+}
+//Columnar store of loaded data: one Float64Array or SparseColumn per condition, with missing values as NaN, and an
+//index from node IDs to rows. Switching conditions reads a column instead of the values of each ID. Conditions
+//written to chunk files are null until loaded
+class DataStore {
+    constructor(ttls,ids,columns) {
+        this.ttls = ttls;
+        this.ids = ids;
+        this.index = new Map();
+        for (var i = 0; i < ids.length; i++) {this.index.set(ids[i],i)}
+        this.columns = columns || ttls.map(function(){return new Float64Array(ids.length).fill(NaN)});
+        this.min = [];
+        this.max = [];
+    }
+    //Value of an ID in a condition, or null if missing
+    value(id,col) {
+        var i = this.index.get(id),
+            c = this.columns[col],
+            v = i == null || c == null ? NaN : columnValue(c,i);
+        return isNaN(v) ? null : v;
+    }
+    //Take absolute values, for sizes and widths. Conditions loaded later are also taken as absolute values
+    abs() {
+        this.absolute = true;
+        this.columns.forEach(function(c){
+            if (c == null) {return;}
+            if (c instanceof SparseColumn) {return c.abs();}
+            for (var i = 0; i < c.length; i++) {c[i] = Math.abs(c[i])}
         })
-        parsedmodels[j].links.forEach(function(d){
-            if (d.source.flux == null && d.target.flux == null) {
-                d.flux = null;
-            } else {
-                d.flux = d.source.flux + d.target.flux;
+        return this;
+    }
+    //Minimum and maximum of each loaded condition
+    range() {
+        var store = this;
+        this.columns.forEach(function(c,j){
+            if (c == null) {return;}
+            if (c instanceof SparseColumn) {
+                var r = c.range();
+                store.min[j] = r[0];
+                store.max[j] = r[1];
+                return;
+            }
+            var min = Infinity, max = -Infinity;
+            for (var i = 0; i < c.length; i++) {
+                if (c[i] < min) {min = c[i]}
+                if (c[i] > max) {max = c[i]}
             }
+            store.min[j] = min;
+            store.max[j] = max;
         })
+        return this;
+    }
+    //Minimum and maximum over all conditions, including the given values
+    extent(min,max) {
+        for (var j = 0; j < this.columns.length; j++) {
+            if (this.min[j] < min) {min = this.min[j]}
+            if (this.max[j] > max) {max = this.max[j]}
+        }
+        return [min,max];
+    }
+    //Saved files keep one array of values per ID
+    toJSON() {
+        var obj = {ttls: this.ttls};
+        for (var k of ["rcs","rcbs","mcs","mcbs"]) {if (k in this) {obj[k] = this[k]}}
+        for (var i = 0; i < this.ids.length; i++) {
+            obj[this.ids[i]] = this.columns.map(function(c){
+                var v = c == null ? NaN : columnValue(c,i);
+                return isNaN(v) ? null : v;
+            });
+        }
+        return obj;
     }
-    reDefineColors()
-    manageTooltips()
-    node.classed("selected",function(d){return d.selected})
 }
-function receivedTextFlux(e) {
-    //Get titles
-    ttls = e[0];
-    fluxobj.ttls = ttls;
-    //save values
-    for (var i = 1; i < e.length; i++) {
-        //Parse and save
-        tmp = e[i];
-        var rxn = tmp[0];
-        if (rxn == "") {continue;}
-        tmp.shift();
-        tmp = tmp.map(d => {if (isNaN(d) || d == "") {d = null;} else {d = Number(d);}; return d;})
-        fluxobj[rxn] = tmp;
-        //Make max and min
-        fluxmax = Math.max(...tmp,fluxmax)
-        fluxmin = Math.min(...tmp,fluxmin)
+//Store data given as rows of an ID followed by its values, with the condition titles as first row
+function rowsToDataStore(e) {
+    if (e instanceof DataStore) {return e;}
+    var rows = e.slice(1).filter(function(r){return r[0] != ""});
+    var store = new DataStore(e[0],rows.map(function(r){return r[0]}));
+    rows.forEach(function(r,i){
+        for (var j = 0; j < store.columns.length; j++) {
+            var v = parseDataValue(r[j+1]);
+            store.columns[j][i] = v == null ? NaN : v;
+        }
+    })
+    return store.range();
+}
+//Store data saved in a SAMMI file, as one array of values per ID
+function objectToDataStore(obj) {
+    if (obj == null || !obj.ttls) {return {};}
+    var ids = Object.keys(obj).filter(function(k){return ["ttls","rcs","rcbs","mcs","mcbs"].indexOf(k) == -1});
+    var store = rowsToDataStore([obj.ttls].concat(ids.map(function(k){return [k].concat(obj[k])})));
+    for (var k of ["rcs","rcbs","mcs","mcbs"]) {if (k in obj) {store[k] = obj[k]}}
+    return store;
+}
+//Decode a binary data block into a data store. Each condition is a view of the decoded values
+function decodeDataBlock(block) {
+    var n = block.ids.length;
+    var bytes = base64ToBytes(block.values);
+    var columns = block.conditions.map(function(d,j){
+        if (block.dtype == "float32") {return Float64Array.from(new Float32Array(bytes.buffer,4*j*n,n))}
+        return new Float64Array(bytes.buffer,8*j*n,n);
+    })
+    //Set missing values to NaN
+    var mask = base64ToBytes(block.mask);
+    for (var b = 0; b < mask.length; b++) {
+        if (mask[b] == 0) {continue;}
+        for (var k = 8*b; k < 8*b + 8; k++) {
+            if ((mask[b] >> (k & 7)) & 1) {columns[Math.floor(k/n)][k % n] = NaN}
+        }
     }
+    return new DataStore(block.conditions,block.ids,columns).range();
+}
+//Decode a sparse data block into a data store. Each condition keeps its stored entries, sorted by row, and values
+//not stored take the fill value
+function decodeSparseBlock(block) {
+    var rows = new Int32Array(base64ToBytes(block.rows).buffer);
+    var cols = new Int32Array(base64ToBytes(block.cols).buffer);
+    var bytes = base64ToBytes(block.values);
+    var vals = block.dtype == "float32" ? new Float32Array(bytes.buffer) : new Float64Array(bytes.buffer);
+    //Group the entries by condition
+    var start = new Int32Array(block.conditions.length + 1);
+    for (var k = 0; k < cols.length; k++) {start[cols[k] + 1]++}
+    for (var j = 0; j < block.conditions.length; j++) {start[j + 1] += start[j]}
+    var next = start.slice(0,-1),
+        order = new Int32Array(cols.length);
+    for (var k = 0; k < cols.length; k++) {order[next[cols[k]]++] = k}
+    var columns = block.conditions.map(function(d,j){
+        var entries = Array.from(order.subarray(start[j],start[j + 1])).sort(function(a,b){return rows[a] - rows[b]});
+        return new SparseColumn(block.ids.length,Int32Array.from(entries,function(k){return rows[k]}),
+            Float64Array.from(entries,function(k){return vals[k]}),block.fill);
+    })
+    return new DataStore(block.conditions,block.ids,columns).range();
+}
+//Data store whose conditions are in chunk files written by SAMMIpy next to the page, with the range of each
+//condition computed in advance
+var datachunks = {};
+function chunkedDataStore(index) {
+    var store = new DataStore(index.conditions,index.ids,index.conditions.map(function(){return null}));
+    store.min = index.min;
+    store.max = index.max;
+    store.chunks = index.chunks;
+    store.chunksize = index.size;
+    store.pending = {};
+    return store;
+}
+//Whether a condition of a data store can be read
+function dataColumnLoaded(store,col) {
+    return !(store instanceof DataStore) || store.columns[col] !== null;
+}
+//Load the chunk file holding a condition, then run callback
+function loadDataColumn(store,col,callback) {
+    if (dataColumnLoaded(store,col)) {
+        if (callback) {callback()}
+        return;
+    }
+    var k = Math.floor(col/store.chunksize);
+    if (k in store.pending) {
+        if (callback) {store.pending[k].push(callback)}
+        return;
+    }
+    store.pending[k] = callback ? [callback] : [];
+    datachunks[store.chunks[k]] = {store: store, chunk: k};
+    var script = document.createElement("script");
+    script.src = store.chunks[k];
+    script.onload = function() {script.remove()}
+    document.body.appendChild(script);
+}
+//Load the conditions before and after the selected one, for the scroll buttons
+function prefetchDataColumns(store,col) {
+    if (col > 0) {loadDataColumn(store,col-1)}
+    if (col < store.ttls.length-1) {loadDataColumn(store,col+1)}
+}
+//Receive a chunk file
+function receivedDataChunk(src,block) {
+    var target = datachunks[src];
+    if (target == null) {return;}
+    delete datachunks[src];
+    var store = target.store,
+        start = target.chunk*store.chunksize;
+    if (store.absolute) {block.abs()}
+    block.columns.forEach(function(c,j){store.columns[start + j] = c})
+    var callbacks = store.pending[target.chunk];
+    delete store.pending[target.chunk];
+    callbacks.forEach(function(f){f()})
+}
+//Load every condition of the loaded data, then run callback. Returns true if all were loaded already
+function loadAllData(callback) {
+    var missing = [];
+    [fluxobj,concobj,sizerxnobj,sizemetobj,linkwidthobj].forEach(function(store){
+        if (!(store instanceof DataStore)) {return;}
+        store.columns.forEach(function(c,j){if (c === null) {missing.push([store,j])}})
+    })
+    if (missing.length == 0) {return true;}
+    var left = missing.length;
+    missing.forEach(function(m){loadDataColumn(m[0],m[1],function(){if (--left == 0) {callback()}})})
+    return false;
+}
+//Set a property of the nodes of a group from a condition of a data store
+function applyDataColumn(graphs,store,col,group,prop) {
+    var c = store.columns[col];
+    if (c == null) {return;}
+    graphs.forEach(function(g){
+        g.nodes.forEach(function(d){
+            if (d.group != group) {return;}
+            var i = store.index.get(d.class),
+                v = i == null ? NaN : columnValue(c,i);
+            d[prop] = isNaN(v) ? null : v;
+        })
+    })
+}
+//Set the widths of links, and of their reactions, from a condition of a data store
+function applyWidthColumn(graphs,store,col) {
+    var c = store.columns[col];
+    if (c == null) {return;}
+    graphs.forEach(function(g){
+        g.nodes.forEach(function(d){d.width = null})
+        g.links.forEach(function(l){
+            var r = l.source.group == 1 ? l.source : l.target,
+                i = r.group == 1 ? store.index.get(r.class) : null,
+                v = i == null ? NaN : columnValue(c,i);
+            l.width = isNaN(v) ? null : v;
+            if (l.width != null) {r.width = l.width}
+        })
+    })
+}
+//Set a link property as the sum of the values of its nodes
+function sumLinkValues(graphs,prop) {
+    graphs.forEach(function(g){
+        g.links.forEach(function(d){
+            d[prop] = d.source[prop] == null && d.target[prop] == null ? null : d.source[prop] + d.target[prop];
+        })
+    })
+}
+//Subgraphs built so far
+function builtGraphs() {
+    return builtParsed().map(function(j){return parsedmodels[j]});
+}
+function receivedTextFlux(e) {
+    //Save values
+    fluxobj = rowsToDataStore(e);
+    ttls = fluxobj.ttls;
+    //Make max and min
+    var range = fluxobj.extent(fluxmin,fluxmax);
+    fluxmin = range[0];
+    fluxmax = range[1];
     //Make options
     wind = document.getElementById("onloadoptions");
     if (document.getElementById("onloadoptions").childElementCount != 0) {
@@ -884,23 +1544,11 @@ function receivedTextFlux(e) {
     defineFluxColorVectors()
     defineFluxColorBar()
 
+    //Values in chunk files are set once loaded
+    if (!dataColumnLoaded(fluxobj,0)) {loadDataColumn(fluxobj,0,function(){FluxSetSwitch(document.getElementById("fluxscroll"))})}
     //Set values to initial
-    var rxn = Object.keys(fluxobj);
-    rxn.shift(); rxn.pop(); rxn.pop();
-    for (j in parsedmodels) {
-        parsedmodels[j].nodes.forEach(function(d){
-            index = rxn.indexOf(d.class);
-            if (index != -1 && d.group == 1) {d.flux = fluxobj[rxn[index]][0]}
-            return d;
-        })
-        parsedmodels[j].links.forEach(function(d){
-            if (d.source.flux == null && d.target.flux == null) {
-                d.flux = null;
-            } else {
-                d.flux = d.source.flux + d.target.flux;
-            }
-        })
-    }
+    applyDataColumn(builtGraphs(),fluxobj,0,1,"flux")
+    sumLinkValues(builtGraphs(),"flux")
     reDefineColors()
     node.classed("selected",function(d){return d.selected})
     manageTooltips()
@@ -938,9 +1586,9 @@ function receivedTextGene(e) {
     grspl = '[' + grspl.replace(/;/g,',') + ']'
     var grspl = new RegExp(grspl,'i');
     //parse
-    for (var g in parsedmodels) {
-        for (n in parsedmodels[g].nodes) { 
-            d = parsedmodels[g].nodes[n];
+    findParsed(function(pg){
+        for (n in pg.nodes) { 
+            d = pg.nodes[n];
             if (d.group == 2) {continue;}
             if (allrx.indexOf(d.id) == -1){
                 allrx.push(d.id)
@@ -954,7 +1602,7 @@ function receivedTextGene(e) {
                 allgr.push(tmp.filter(onlyUnique))
             }
         }
-    }
+    })
     //make gex object
     gex = {};
     for (var i = 1; i < e.length; i++) {
@@ -1227,10 +1875,14 @@ function previousScrollC(nodeid) {
     ConcSetSwitch(x)
 }
 function ConcSetSwitch(opt) {
-    if(tracking){trackMet()}
-    //Define index to switch it to
     //Define index to switch it to
     var id = opt.selectedIndex;
+    if (!dataColumnLoaded(concobj,id)) {
+        loadDataColumn(concobj,id,function(){ConcSetSwitch(opt)})
+        return;
+    }
+    prefetchDataColumns(concobj,id)
+    if(tracking){trackMet()}
     //Remove previous color breaks
     var x = document.getElementsByClassName("metbreakcol");
     while (x.length > 0) {
@@ -1262,51 +1914,21 @@ function ConcSetSwitch(opt) {
     }
     defineMetColorBar()
 
-    //Reset all values to null
-    for (j in parsedmodels) {
-        parsedmodels[j].nodes.forEach(function(d){
-            d.concentration = null;
-            return d;
-        })
-    }
     //Set values to new
-    var met = Object.keys(concobj);
-    met.shift(); met.pop(); met.pop();
-    for (j in parsedmodels) {
-        parsedmodels[j].nodes.forEach(function(d){
-            index = met.indexOf(d.class);
-            if (index != -1 && d.group == 2) {d.concentration = concobj[met[index]][id]}
-            return d;
-        })
-        parsedmodels[j].links.forEach(function(d){
-            if (d.source.concentration == null && d.target.concentration == null) {
-                d.concentration = null;
-            } else {
-                d.concentration = d.source.concentration + d.target.concentration;
-            }
-        })
-    }
+    applyDataColumn(builtGraphs(),concobj,id,2,"concentration")
+    sumLinkValues(builtGraphs(),"concentration")
     reDefineColors()
     node.classed("selected",function(d){return d.selected})
 }
 //Load concentration values
 function receivedTextConcentration(e) {
-    //Get titles
-    ttls = e[0];
-    concobj.ttls = ttls;
-    //save values
-    for (var i = 1; i < e.length; i++) {
-        //Parse and save
-        tmp = e[i];
-        var met = tmp[0];
-        if (met == "") {continue;}
-        tmp.shift();
-        tmp = tmp.map(d => {if (isNaN(d) || d == "") {d = null;} else {d = Number(d);}; return d;})
-        concobj[met] = tmp;
-        //Make max and min
-        concentrationmax = Math.max(...tmp,concentrationmax)
-        concentrationmin = Math.min(...tmp,concentrationmin)
-    }
+    //Save values
+    concobj = rowsToDataStore(e);
+    ttls = concobj.ttls;
+    //Make max and min
+    var range = concobj.extent(concentrationmin,concentrationmax);
+    concentrationmin = range[0];
+    concentrationmax = range[1];
     //Make options
     wind = document.getElementById("onloadoptions");
     if (document.getElementById("onloadoptions").childElementCount != 0) {
@@ -1356,16 +1978,10 @@ function receivedTextConcentration(e) {
     }
     concobj.mcs = mcs;
     concobj.mcbs = mcbs;
+    //Values in chunk files are set once loaded
+    if (!dataColumnLoaded(concobj,0)) {loadDataColumn(concobj,0,function(){ConcSetSwitch(document.getElementById("concscroll"))})}
     //Set values to initial
-    var met = Object.keys(concobj);
-    met.shift(); met.pop(); met.pop();
-    for (j in parsedmodels) {
-        parsedmodels[j].nodes.forEach(function(d){
-            index = met.indexOf(d.class);
-            if (index != -1 && d.group == 2) {d.concentration = concobj[met[index]][0]}
-            return d;
-        })
-    }
+    applyDataColumn(builtGraphs(),concobj,0,2,"concentration")
     defineMetColorVectors()
     defineMetColorBar()
     reDefineColors()
@@ -1598,49 +2214,28 @@ function previousScrollRS(nodeid) {
     RxnSizeSetSwitch(x)
 }
 function RxnSizeSetSwitch(opt) {
-    if(tracking){trackMet()}
     //Define index to switch it to
     var id = sizerxnobj.ttls.indexOf(opt.value);
-    
-    //Reset all values to null
-    for (j in parsedmodels) {
-        parsedmodels[j].nodes.filter(function(d){return d.group == 1})
-        .forEach(function(d){
-            d.size = null;
-            return d;
-        })
+    if (!dataColumnLoaded(sizerxnobj,id)) {
+        loadDataColumn(sizerxnobj,id,function(){RxnSizeSetSwitch(opt)})
+        return;
     }
-    //Set values to new
-    var rxn = Object.keys(sizerxnobj);
-    rxn.shift();
+    prefetchDataColumns(sizerxnobj,id)
+    if(tracking){trackMet()}
     
-    for (j in parsedmodels) {
-        parsedmodels[j].nodes.forEach(function(d){
-            index = rxn.indexOf(d.class);
-            if (index != -1 && d.group == 1) {d.size = sizerxnobj[rxn[index]][id]}
-            return d;
-        })
-    }
+    //Set values to new
+    applyDataColumn(builtGraphs(),sizerxnobj,id,1,"size")
     reDefineSimulation()
     simulation.alpha(0)
 }
 function receivedTextSizeRxn(e) {
-    //Get titles
-    ttls = e[0];
-    sizerxnobj.ttls = ttls;
-    //save values
-    for (var i = 1; i < e.length; i++) {
-        //Parse and save
-        tmp = e[i];
-        var rxn = tmp[0];
-        if (rxn == "") {continue;}
-        tmp.shift();
-        tmp = tmp.map(d => {if (isNaN(d) || d == "") {d = null;} else {d = Math.abs(Number(d));}; return d;})
-        sizerxnobj[rxn] = tmp;
-        //Make max and min
-        maxrxnsize = Math.max(...tmp,maxrxnsize)
-        minrxnsize = Math.min(...tmp,minrxnsize)
-    }
+    //Save values
+    sizerxnobj = rowsToDataStore(e).abs().range();
+    ttls = sizerxnobj.ttls;
+    //Make max and min
+    var range = sizerxnobj.extent(minrxnsize,maxrxnsize);
+    minrxnsize = range[0];
+    maxrxnsize = range[1];
     document.getElementById("minrxnsize").value = minrxnsize;
     document.getElementById("maxrxnsize").value = maxrxnsize;
     //Make options
@@ -1677,16 +2272,10 @@ function receivedTextSizeRxn(e) {
     a.onclick = function(){nextScrollRS("rxnsizescroll")}
     wind.appendChild(a)
 
+    //Values in chunk files are set once loaded
+    if (!dataColumnLoaded(sizerxnobj,0)) {loadDataColumn(sizerxnobj,0,function(){RxnSizeSetSwitch(document.getElementById("rxnsizescroll"))})}
     //Set values to initial
-    var rxn = Object.keys(sizerxnobj);
-    rxn.shift();
-    for (j in parsedmodels) {
-        parsedmodels[j].nodes.forEach(function(d){
-            index = rxn.indexOf(d.class);
-            if (index != -1 && d.group == 1) {d.size = sizerxnobj[rxn[index]][0]}
-            return d;
-        })
-    }
+    applyDataColumn(builtGraphs(),sizerxnobj,0,1,"size")
     reDefineSimulation()
     simulation.alpha(0)
 }
@@ -1714,49 +2303,28 @@ function previousScrollMS(nodeid) {
     MetSizeSetSwitch(x)
 }
 function MetSizeSetSwitch(opt) {
-    if(tracking){trackMet()}
     //Define index to switch it to
     var id = sizemetobj.ttls.indexOf(opt.value);
-    
-    //Reset all values to null
-    for (j in parsedmodels) {
-        parsedmodels[j].nodes.filter(function(d){return d.group == 2})
-        .forEach(function(d){
-            d.size = null;
-            return d;
-        })
+    if (!dataColumnLoaded(sizemetobj,id)) {
+        loadDataColumn(sizemetobj,id,function(){MetSizeSetSwitch(opt)})
+        return;
     }
-    //Set values to new
-    var met = Object.keys(sizemetobj);
-    met.shift();
+    prefetchDataColumns(sizemetobj,id)
+    if(tracking){trackMet()}
     
-    for (j in parsedmodels) {
-        parsedmodels[j].nodes.forEach(function(d){
-            index = met.indexOf(d.class);
-            if (index != -1 && d.group == 2) {d.size = sizemetobj[met[index]][id]}
-            return d;
-        })
-    }
+    //Set values to new
+    applyDataColumn(builtGraphs(),sizemetobj,id,2,"size")
     reDefineSimulation()
     simulation.alpha(0)
 }
 function receivedTextSizeMet(e) {
-    //Get titles
-    ttls = e[0];
-    sizemetobj.ttls = ttls;
-    //save values
-    for (var i = 1; i < e.length; i++) {
-        //Parse and save
-        tmp = e[i];
-        var met = tmp[0];
-        if (met == "") {continue;}
-        tmp.shift();
-        tmp = tmp.map(d => {if (isNaN(d) || d == "") {d = null;} else {d = Math.abs(Number(d));}; return d;})
-        sizemetobj[met] = tmp;
-        //Make max and min
-        maxmetsize = Math.max(...tmp,maxmetsize)
-        minmetsize = Math.min(...tmp,minmetsize)
-    }
+    //Save values
+    sizemetobj = rowsToDataStore(e).abs().range();
+    ttls = sizemetobj.ttls;
+    //Make max and min
+    var range = sizemetobj.extent(minmetsize,maxmetsize);
+    minmetsize = range[0];
+    maxmetsize = range[1];
     if (minmetsize < 0) {minmetsize = 0;}
     document.getElementById("minmetsize").value = minmetsize;
     document.getElementById("maxmetsize").value = maxmetsize;
@@ -1794,16 +2362,10 @@ function receivedTextSizeMet(e) {
     a.onclick = function(){nextScrollMS("metsizescroll")}
     wind.appendChild(a)
 
+    //Values in chunk files are set once loaded
+    if (!dataColumnLoaded(sizemetobj,0)) {loadDataColumn(sizemetobj,0,function(){MetSizeSetSwitch(document.getElementById("metsizescroll"))})}
     //Set values to initial
-    var met = Object.keys(sizemetobj);
-    met.shift();
-    for (j in parsedmodels) {
-        parsedmodels[j].nodes.forEach(function(d){
-            index = met.indexOf(d.class);
-            if (index != -1 && d.group == 2) {d.size = sizemetobj[met[index]][0]}
-            return d;
-        })
-    }
+    applyDataColumn(builtGraphs(),sizemetobj,0,2,"size")
     reDefineSimulation()
     simulation.alpha(0)
 }
@@ -1831,62 +2393,28 @@ function previousScrollW(nodeid) {
     WidthSetSwitch(x)
 }
 function WidthSetSwitch(opt) {
-    if(tracking){trackMet()}
     //Define index to switch it to
     var id = linkwidthobj.ttls.indexOf(opt.value);
-    
-    //Reset all values to null
-    for (j in parsedmodels) {
-        parsedmodels[j].links.forEach(function(l){
-            l.width = null;
-            return l;
-        })
-        parsedmodels[j].nodes.forEach(function(d){
-            d.width = null;
-            return d;
-        })
+    if (!dataColumnLoaded(linkwidthobj,id)) {
+        loadDataColumn(linkwidthobj,id,function(){WidthSetSwitch(opt)})
+        return;
     }
+    prefetchDataColumns(linkwidthobj,id)
+    if(tracking){trackMet()}
+    
     //Set values to new
-    var rxn = Object.keys(linkwidthobj);
-    rxn.shift();
-    for (j in parsedmodels) {
-        parsedmodels[j].links.forEach(function(l){
-            if (l.source.group == 1) {
-                index = rxn.indexOf(l.source.class);
-                if (index != -1) {
-                    l.width = linkwidthobj[rxn[index]][id];
-                    l.source.width = linkwidthobj[rxn[index]][id];
-                }
-            } else if (l.target.group == 1) {
-                index = rxn.indexOf(l.target.class);
-                if (index != -1) {
-                    l.width = linkwidthobj[rxn[index]][id];
-                    l.target.width = linkwidthobj[rxn[index]][id];
-                }
-            }
-            return l;
-        })
-    }
+    applyWidthColumn(builtGraphs(),linkwidthobj,id)
     reDefineSimulation()
     simulation.alpha(0)
 }
 function receivedTextWidth(e) {
-    //Get titles
-    ttls = e[0];
-    linkwidthobj.ttls = ttls;
-    //save values
-    for (var i = 1; i < e.length; i++) {
-        //Parse and save
-        tmp = e[i];
-        var rxn = tmp[0];
-        if (rxn == "") {continue;}
-        tmp.shift();
-        tmp = tmp.map(d => {if (isNaN(d) || d == "") {d = null;} else {d = Math.abs(Number(d));}; return d;})
-        linkwidthobj[rxn] = tmp;
-        //Make max and min
-        maxwidth = Math.max(...tmp,maxwidth)
-        minwidth = Math.min(...tmp,minwidth)
-    }
+    //Save values
+    linkwidthobj = rowsToDataStore(e).abs().range();
+    ttls = linkwidthobj.ttls;
+    //Make max and min
+    var range = linkwidthobj.extent(minwidth,maxwidth);
+    minwidth = range[0];
+    maxwidth = range[1];
     if (minwidth < 0) {minwidth = 0;}
     document.getElementById("minwidth").value = minwidth;
     document.getElementById("maxwidth").value = maxwidth;
@@ -1924,28 +2452,10 @@ function receivedTextWidth(e) {
     a.onclick = function(){nextScrollW("widthscroll")}
     wind.appendChild(a)
 
+    //Values in chunk files are set once loaded
+    if (!dataColumnLoaded(linkwidthobj,0)) {loadDataColumn(linkwidthobj,0,function(){WidthSetSwitch(document.getElementById("widthscroll"))})}
     //Set values to initial
-    var rxn = Object.keys(linkwidthobj);
-    rxn.shift();
-    for (j in parsedmodels) {
-        parsedmodels[j].links.forEach(function(l){
-            if (l.source.group == 1) {
-                index = rxn.indexOf(l.source.class);
-                if (index != -1) {
-                    l.width = linkwidthobj[rxn[index]][0];
-                    l.source.width = linkwidthobj[rxn[index]][0];
-                }
-            } else if (l.target.group == 1) {
-                index = rxn.indexOf(l.target.class);
-                if (index != -1) {
-                    l.width = linkwidthobj[rxn[index]][0];
-                    l.source.width = linkwidthobj[rxn[index]][0];
-                }
-            }
-            
-            return l;
-        })
-    }
+    applyWidthColumn(builtGraphs(),linkwidthobj,0)
     reDefineSimulation()
     simulation.alpha(0)
 }
@@ -0,0 +1,290 @@
+//Force simulation run in a Web Worker. The page keeps the nodes and draws them, while the worker integrates
+//the forces and sends positions back through transferable buffers, applied once per animation frame.
+//Enabled by useworker (SAMMIpy option worker). If the worker cannot be started the d3 simulation of the page is used
+var useworker = false,
+    simworker = null,
+    simgeneration = 0;
+
+//Code run by the worker. Forces are evaluated in the page and sent as arrays, since their accessors read the page
+var workersource = [
+    'var sim, nodes;',
+    'onmessage = function(e) {',
+    '    var m = e.data;',
+    '    if (m.type == "init") {',
+    '        nodes = [];',
+    '        for (var i = 0; i < m.x.length; i++) {',
+    '            nodes.push({index: i, x: m.x[i], y: m.y[i], vx: 0, vy: 0});',
+    '        }',
+    '        var links = [];',
+    '        for (var i = 0; i < m.source.length; i++) {',
+    '            links.push({source: m.source[i], target: m.target[i]});',
+    '        }',
+    '        sim = d3.forceSimulation(nodes).stop()',
+    '            .alpha(m.alpha).alphaTarget(m.alphaTarget).alphaMin(m.alphaMin).alphaDecay(m.alphaDecay)',
+    '            .velocityDecay(m.velocityDecay)',
+    '            .force("link", d3.forceLink(links)',
+    '                .distance(function(l,i){return m.distance[i]})',
+    '                .strength(function(l,i){return m.strength[i]}))',
+    '            .force("charge", d3.forceManyBody()',
+    '                .distanceMax(m.distanceMax)',
+    '                .strength(function(d,i){return m.charge[i]}))',
+    '            .force("x", d3.forceX(function(d,i){return m.xtarget[i]}).strength(function(d,i){return m.xstrength[i]}))',
+    '            .force("y", d3.forceY(function(d,i){return m.ytarget[i]}).strength(function(d,i){return m.ystrength[i]}))',
+    '            .force("collision", d3.forceCollide(function(d,i){return m.radius[i]}));',
+    '    } else if (m.type == "tick") {',
+    '        var c = new Float64Array(m.control), n = nodes.length;',
+    '        for (var i = 0; i < n; i++) {',
+    '            nodes[i].fx = isNaN(c[i]) ? null : c[i];',
+    '            nodes[i].fy = isNaN(c[n+i]) ? null : c[n+i];',
+    '            if (!isNaN(c[2*n+i])) {nodes[i].x = c[2*n+i]; nodes[i].y = c[3*n+i];}',
+    '        }',
+    '        if (m.alpha != null) {sim.alpha(m.alpha)}',
+    '        sim.alphaTarget(m.alphaTarget).velocityDecay(m.velocityDecay).tick();',
+    '        var p = new Float64Array(m.positions);',
+    '        for (var i = 0; i < n; i++) {',
+    '            p[2*i] = nodes[i].x;',
+    '            p[2*i+1] = nodes[i].y;',
+    '        }',
+    '        postMessage({generation: m.generation, positions: m.positions, control: m.control, alpha: sim.alpha()}, [m.positions, m.control]);',
+    '    }',
+    '}'
+].join('\n');
+
+//Address of the d3 script loaded by the page
+function d3Source() {
+    var scripts = document.getElementsByTagName("script");
+    for (var i = 0; i < scripts.length; i++) {
+        if (/\/d3\.v4[.0-9a-f]*\.js$/.test(scripts[i].src)) {return scripts[i].src;}
+    }
+    return null;
+}
+
+//Start the worker, returning false if it cannot be started
+function startSimWorker() {
+    if (simworker) {return true;}
+    var src = d3Source();
+    if (!src || typeof Worker == 'undefined') {return false;}
+    try {
+        var blob = new Blob(['importScripts(' + JSON.stringify(src) + ');\n' + workersource],{type: 'text/javascript'});
+        simworker = new Worker(URL.createObjectURL(blob));
+    } catch (err) {
+        return false;
+    }
+    simworker.onmessage = function(e) {
+        if (simulation instanceof WorkerSimulation && e.data.generation == simulation.generation) {simulation.receive(e.data)}
+    }
+    simworker.onerror = function(e) {
+        //Fall back to the simulation of the page
+        console.log("Simulation worker failed, running the simulation in the page");
+        useworker = false;
+        simworker = null;
+        if (simulation instanceof WorkerSimulation) {
+            var ws = simulation;
+            ws.stop()
+            simulation = ws.sim;
+            simulation.alpha(ws.alpha()).alphaTarget(ws.alphaTarget()).restart()
+        }
+    }
+    return true;
+}
+
+//Run a d3 simulation, already defined on the page nodes, in the worker
+function workerSimulation(sim) {
+    if (!startSimWorker()) {return sim;}
+    return new WorkerSimulation(sim);
+}
+
+function WorkerSimulation(sim) {
+    sim.stop()
+    this.sim = sim;
+    this.generation = ++simgeneration;
+    this.listener = sim.on("tick");
+    this.currentalpha = sim.alpha();
+    this.target = sim.alphaTarget();
+    this.newalpha = null;
+    this.running = false;
+    this.pending = false;
+    this.frame = null;
+    this.latest = null;
+    this.buffers = null;
+    this.init()
+    this.restart()
+}
+
+//Send the nodes, links, and forces to the worker
+WorkerSimulation.prototype.init = function() {
+    var sim = this.sim,
+        nodes = sim.nodes(),
+        n = nodes.length,
+        link = sim.force("link"),
+        links = link ? link.links() : [],
+        charge = sim.force("charge"),
+        fx = sim.force("x"),
+        fy = sim.force("y"),
+        collide = sim.force("collision");
+    var m = {type: "init",
+        alpha: this.currentalpha, alphaTarget: this.target, alphaMin: sim.alphaMin(), alphaDecay: sim.alphaDecay(),
+        velocityDecay: sim.velocityDecay(), distanceMax: charge ? charge.distanceMax() : Infinity,
+        x: new Float64Array(n), y: new Float64Array(n), charge: new Float64Array(n),
+        xtarget: new Float64Array(n), xstrength: new Float64Array(n), ytarget: new Float64Array(n), ystrength: new Float64Array(n),
+        radius: new Float64Array(n), source: new Int32Array(links.length), target: new Int32Array(links.length),
+        distance: new Float64Array(links.length), strength: new Float64Array(links.length)};
+    nodes.forEach(function(d,i){
+        m.x[i] = d.x;
+        m.y[i] = d.y;
+        m.charge[i] = charge ? charge.strength()(d,i,nodes) : 0;
+        m.xtarget[i] = fx ? fx.x()(d,i,nodes) : 0;
+        m.xstrength[i] = fx ? fx.strength()(d,i,nodes) : 0;
+        m.ytarget[i] = fy ? fy.y()(d,i,nodes) : 0;
+        m.ystrength[i] = fy ? fy.strength()(d,i,nodes) : 0;
+        m.radius[i] = collide ? collide.radius()(d,i,nodes) : 0;
+    })
+    links.forEach(function(l,i){
+        m.source[i] = l.source.index;
+        m.target[i] = l.target.index;
+        m.distance[i] = link.distance()(l,i,links);
+        m.strength[i] = link.strength()(l,i,links);
+    })
+    //Targets and radii without a value exert no force
+    for (var i = 0; i < n; i++) {
+        if (isNaN(m.xtarget[i])) {m.xtarget[i] = 0; m.xstrength[i] = 0;}
+        if (isNaN(m.ytarget[i])) {m.ytarget[i] = 0; m.ystrength[i] = 0;}
+        if (isNaN(m.radius[i])) {m.radius[i] = 0;}
+    }
+    this.n = n;
+    this.lastx = Float64Array.from(m.x);
+    this.lasty = Float64Array.from(m.y);
+    this.buffers = [new ArrayBuffer(16*n),new ArrayBuffer(32*n)];
+    this.latest = null;
+    this.pending = false;
+    simworker.postMessage(m,[m.x.buffer,m.y.buffer,m.charge.buffer,m.xtarget.buffer,m.xstrength.buffer,m.ytarget.buffer,
+        m.ystrength.buffer,m.radius.buffer,m.source.buffer,m.target.buffer,m.distance.buffer,m.strength.buffer]);
+}
+
+//Ask the worker for the next tick, passing the nodes fixed or moved by the page
+WorkerSimulation.prototype.request = function() {
+    var nodes = this.sim.nodes(), n = this.n;
+    if (this.buffers == null || nodes.length != n) {return;}
+    var c = new Float64Array(this.buffers[1]);
+    for (var i = 0; i < n; i++) {
+        var d = nodes[i];
+        c[i] = d.fx == null ? NaN : d.fx;
+        c[n+i] = d.fy == null ? NaN : d.fy;
+        var moved = d.x !== this.lastx[i] || d.y !== this.lasty[i];
+        c[2*n+i] = moved ? d.x : NaN;
+        c[3*n+i] = moved ? d.y : NaN;
+        if (moved) {
+            this.lastx[i] = d.x;
+            this.lasty[i] = d.y;
+        }
+    }
+    simworker.postMessage({type: "tick", generation: this.generation, alpha: this.newalpha, alphaTarget: this.target,
+        velocityDecay: this.sim.velocityDecay(), positions: this.buffers[0], control: this.buffers[1]},this.buffers);
+    this.buffers = null;
+    this.newalpha = null;
+    this.pending = true;
+}
+
+WorkerSimulation.prototype.receive = function(m) {
+    this.pending = false;
+    this.latest = m;
+    this.currentalpha = this.newalpha == null ? m.alpha : this.newalpha;
+}
+
+//Apply the latest positions and draw them, once per animation frame
+WorkerSimulation.prototype.onFrame = function() {
+    this.frame = null;
+    if (this.latest) {
+        var m = this.latest, p = new Float64Array(m.positions), nodes = this.sim.nodes();
+        this.latest = null;
+        this.buffers = [m.positions,m.control];
+        if (nodes.length == this.n) {
+            for (var i = 0; i < this.n; i++) {
+                //Nodes moved by the page since the last frame keep their position, and are sent with the next request
+                if (nodes[i].x !== this.lastx[i] || nodes[i].y !== this.lasty[i]) {continue;}
+                nodes[i].x = this.lastx[i] = p[2*i];
+                nodes[i].y = this.lasty[i] = p[2*i+1];
+            }
+            if (this.listener) {this.listener.call(this)}
+        }
+        if (this.currentalpha < this.sim.alphaMin() && this.target < this.sim.alphaMin() && this.newalpha == null) {this.running = false}
+    }
+    if (!this.running) {return;}
+    if (!this.pending) {this.request()}
+    this.frame = requestAnimationFrame(this.onFrame.bind(this));
+}
+
+WorkerSimulation.prototype.restart = function() {
+    this.running = true;
+    if (this.frame == null) {this.frame = requestAnimationFrame(this.onFrame.bind(this))}
+    return this;
+}
+
+WorkerSimulation.prototype.stop = function() {
+    this.running = false;
+    if (this.frame != null) {cancelAnimationFrame(this.frame)}
+    this.frame = null;
+    return this;
+}
+
+WorkerSimulation.prototype.alpha = function(a) {
+    if (!arguments.length) {return this.currentalpha;}
+    this.currentalpha = this.newalpha = +a;
+    return this;
+}
+
+WorkerSimulation.prototype.alphaTarget = function(a) {
+    if (!arguments.length) {return this.target;}
+    this.target = +a;
+    return this;
+}
+
+WorkerSimulation.prototype.velocityDecay = function(a) {
+    if (!arguments.length) {return this.sim.velocityDecay();}
+    this.sim.velocityDecay(a);
+    return this;
+}
+
+WorkerSimulation.prototype.nodes = function(nodes) {
+    if (!arguments.length) {return this.sim.nodes();}
+    this.sim.nodes(nodes).stop();
+    this.init();
+    return this;
+}
+
+WorkerSimulation.prototype.force = function(name,force) {
+    if (arguments.length < 2) {return this.sim.force(name);}
+    this.sim.force(name,force).stop();
+    this.init();
+    return this;
+}
+
+WorkerSimulation.prototype.on = function(name,listener) {
+    if (arguments.length < 2) {return this.listener;}
+    this.listener = listener;
+    return this;
+}
+
+//Measure frame times over duration milliseconds, optionally panning the map every frame, and log
+//the mean, 95th percentile, and maximum frame time. The simulation is restarted so it runs during the measurement
+function measureFrames(duration,pan,callback) {
+    var times = [], last = null, start = null;
+    simulation.alpha(1).restart()
+    function frame(t) {
+        if (last != null) {times.push(t - last)}
+        if (start == null) {start = t}
+        last = t;
+        if (pan) {gMain.call(zoom.translateBy,Math.sin(t/500),Math.cos(t/500))}
+        if (t - start < duration) {
+            requestAnimationFrame(frame);
+            return;
+        }
+        times.sort(function(a,b){return a-b});
+        var res = {worker: simulation instanceof WorkerSimulation, nodes: graph.nodes.length, frames: times.length,
+            mean: times.reduce(function(a,b){return a+b},0)/times.length,
+            p95: times[Math.floor(0.95*(times.length-1))], max: times[times.length-1]};
+        console.log("Frame times (ms): " + JSON.stringify(res));
+        if (callback) {callback(res)}
+    }
+    requestAnimationFrame(frame);
+}
@@ -0,0 +1,141 @@
+#Command line conversion of model files and data tables to SAMMI html files. For instance:
+#sammi model.xml -o map.html --parse subsystem --reaction-color fluxes.csv
+import argparse
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import sys
+import time
+import sammi
+
+#Version of the cached javascript. Increase when the javascript written by sammi.writeModel changes
+CACHE_VERSION = 3
+
+#Default folder of the model cache
+def cacheDir():
+    return os.path.join(os.environ.get('XDG_CACHE_HOME',os.path.join(os.path.expanduser('~'),'.cache')),'sammi')
+
+#Read a model file with cobra, by extension. SBML files can be compressed with gzip
+def loadModel(path):
+    import cobra
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ['.xml','.sbml'] or path.lower().endswith(('.xml.gz','.sbml.gz')):
+        return cobra.io.read_sbml_model(path)
+    elif ext == '.json':
+        return cobra.io.load_json_model(path)
+    elif ext == '.mat':
+        return cobra.io.load_matlab_model(path)
+    elif ext in ['.yml','.yaml']:
+        return cobra.io.load_yaml_model(path)
+    raise Exception('Model files must be SBML (.xml, .sbml), JSON (.json), MAT (.mat), or YAML (.yml, .yaml)')
+
+#Hash of the content of a file
+def fileHash(path):
+    h = hashlib.sha256()
+    with open(path,'rb') as f:
+        for block in iter(lambda: f.read(1 << 20),b''):
+            h.update(block)
+    return h.hexdigest()
+
+def modelPayload(path,parsert,opts,cache = None):
+    """
+    Returns the javascript loading the model file at path, parsed as in sammi.plot, the IDs of the model
+    metabolites, and whether they were read from the cache. Inputs:
+    -path: model file.
+    -parsert: empty list, name of a reaction or metabolite field, SAMMI map file, or list of reaction IDs. Map files are reconciled with the model.
+    -opts: options object (sammi.options). Only the layout field changes the model javascript.
+    -cache: folder of the cache. Entries are keyed on the content of the model and map files, so unchanged
+    models are not read by cobra again. Entries hold the metabolite IDs in their first line. Default None (no cache).
+    """
+    mapfile = isinstance(parsert,str) and os.path.isfile(parsert)
+    key = hashlib.sha256(sammi._encoder.encode([CACHE_VERSION,fileHash(path),fileHash(parsert) if mapfile else parsert,opts.layout]).encode('utf-8')).hexdigest()
+    f = os.path.join(cache,key + '.js') if cache is not None else None
+    if f is not None and os.path.isfile(f):
+        with open(f,encoding = 'utf-8') as fin:
+            mets = json.loads(fin.readline())
+            return fin.read(),mets,True
+    model = loadModel(path)
+    out = io.StringIO()
+    sammi.writeModel(out,model,parsert,opts)
+    text = out.getvalue()
+    mets = [m.id for m in model.metabolites]
+    if f is not None:
+        #Write to a temporary file first, so concurrent runs never read a partial entry
+        os.makedirs(cache,exist_ok = True)
+        tmp = f + '.' + str(os.getpid()) + '.tmp'
+        with open(tmp,'w',encoding = 'utf-8') as fout:
+            fout.write(sammi._encoder.encode(mets) + '\n')
+            fout.write(text)
+        os.replace(tmp,f)
+    return text,mets,False
+
+#Read a table with IDs in the first column and one column per condition, with the condition names in the first row
+def readTable(path,group,kind):
+    import numpy as np
+    with open(path,newline = '',encoding = 'utf-8') as f:
+        rows = [r for r in csv.reader(f,delimiter = '\t' if os.path.splitext(path)[1].lower() in ['.tsv','.tab'] else ',') if len(r) > 0]
+    conditions = rows[0][1:]
+    ids = [r[0] for r in rows[1:]]
+    values = np.full((len(ids),len(conditions)),np.nan)
+    for i,r in enumerate(rows[1:]):
+        for j,v in enumerate(r[1:len(conditions) + 1]):
+            try:
+                values[i,j] = float(v)
+            except ValueError:
+                pass
+    return sammi.data(group,kind,values,ids,conditions)
+
+#Data tables given on the command line, with the group and kind they are mapped to
+TABLES = [('reaction_color','reactions','color'),('reaction_size','reactions','size'),('metabolite_color','metabolites','color'),
+    ('metabolite_size','metabolites','size'),('link_size','links','size')]
+
+def makeParser():
+    ap = argparse.ArgumentParser(prog = 'sammi',description = 'Convert a metabolic model, and optionally data tables, to a SAMMI html file.')
+    ap.add_argument('model',help = 'model file: SBML (.xml, .sbml, optionally gzipped), JSON (.json), MAT (.mat), or YAML (.yml, .yaml)')
+    ap.add_argument('-o','--output',help = 'html file to write. Default the model file name with extension .html')
+    group = ap.add_mutually_exclusive_group()
+    group.add_argument('--parse',help = 'reaction or metabolite field to draw one subgraph per value of (e.g. subsystem), or a SAMMI map file to render')
+    group.add_argument('--reactions',nargs = '+',help = 'IDs of the reactions to draw')
+    for name,g,k in TABLES:
+        ap.add_argument('--' + name.replace('_','-'),action = 'append',default = [],metavar = 'TABLE',
+            help = 'table of ' + g[:-1] + ' ' + k + ' data: IDs in the first column and one column per condition, named in the first row. CSV, or TSV with extension .tsv')
+    ap.add_argument('--secondaries',nargs = '+',default = [],metavar = 'REGEX',help = 'regular expressions of metabolites to shelve')
+    ap.add_argument('--jscode',default = None,help = 'javascript to run after loading the map')
+    ap.add_argument('--binary',choices = ['float32','float64'],default = None,help = 'embed data as binary blocks')
+    ap.add_argument('--compress',choices = ['gzip','deflate'],default = None,help = 'compress the model and data')
+    ap.add_argument('--offline',choices = ['local','inline'],default = None,help = 'load scripts and images from the copies vendored by sammi.bundle()')
+    ap.add_argument('--chunks',type = int,default = None,help = 'number of data conditions per data file')
+    ap.add_argument('--layout',action = 'store_true',help = 'lay out graphs before opening the map')
+    ap.add_argument('--worker',action = 'store_true',help = 'run the force simulation in a Web Worker')
+    ap.add_argument('--renderer',choices = ['svg','canvas'],default = None,help = 'draw nodes and links as SVG elements or in a canvas')
+    ap.add_argument('--cache',default = cacheDir(),help = 'folder of the model cache. Default %(default)s')
+    ap.add_argument('--no-cache',action = 'store_true',help = 'read the model with cobra even if it is cached')
+    ap.add_argument('--open',action = 'store_true',help = 'open the html file in the default browser')
+    return ap
+
+def main(argv = None):
+    args = makeParser().parse_args(argv)
+    start = time.perf_counter()
+    output = args.output if args.output is not None else os.path.splitext(re.sub(r'\.gz$','',os.path.basename(args.model)))[0] + '.html'
+    folder = os.path.dirname(os.path.abspath(output))
+    opts = sammi.options(htmlName = os.path.basename(output),load = args.open,jscode = args.jscode,binary = args.binary,compress = args.compress,
+        offline = args.offline,layout = args.layout,worker = args.worker,renderer = args.renderer,chunks = args.chunks)
+    parsert = args.parse if args.parse is not None else (args.reactions if args.reactions is not None else [])
+    model,mets,cached = modelPayload(args.model,parsert,opts,None if args.no_cache else args.cache)
+    #Match secondaries on the model metabolites here, so the page shelves them by ID. Maps are matched on their own metabolites
+    secondaries = args.secondaries
+    if len(secondaries) > 0 and not (isinstance(parsert,str) and os.path.isfile(parsert)):
+        secondaries = [set(sammi.matchIds(mets,secondaries))]
+    datat = [readTable(f,g,k) for name,g,k in TABLES for f in getattr(args,name)]
+    os.makedirs(folder,exist_ok = True)
+    sammi.writePage(model,parsert,datat,secondaries,opts,folder)
+    print('Wrote ' + output + (' (model from cache)' if cached else '') + ' in ' + str(round(time.perf_counter() - start,3)) + ' s')
+    if args.open:
+        sammi.openPage(os.path.join(folder,opts.htmlName))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#Force directed layout of SAMMI graphs, computed before the map is opened
+import hashlib
+import json
+import numpy as np
+
+#Default parameters, matching the defaults of the SAMMI simulation menu
+DEFAULTS = {'iterations':300,'distance':30.0,'charge':30.0,'center':0.02,'decay':0.4,'distanceMax':500.0,'cellWidth':20.0,'tolerance':0.1}
+
+#Get the nodes and links of a graph written by makeJson, in the order the browser builds them
+def graphLinks(graph):
+    """
+    Returns the node IDs of graph, metabolites first and then reactions, and the source and target
+    positions of its links. Links go from reactants to reactions and from reactions to products.
+    """
+    if isinstance(graph,str):
+        graph = json.loads(graph)
+    ids = [m['id'] for m in graph['metabolites']]
+    pos = {f:i for i,f in enumerate(ids)}
+    nmet = len(ids)
+    source = []
+    target = []
+    for i,r in enumerate(graph['reactions']):
+        ids.append(r['id'])
+        for m,v in r['metabolites'].items():
+            if m not in pos:
+                continue
+            if v < 0:
+                source.append(pos[m])
+                target.append(nmet + i)
+            else:
+                source.append(nmet + i)
+                target.append(pos[m])
+    return ids,np.array(source,dtype = int),np.array(target,dtype = int)
+
+#Repulsion between nodes on a grid of cells cellWidth wide: exact between nodes of the same or neighbouring cells, and
+#from the node counts of farther cells within distanceMax, summed for every cell at once with a fast Fourier transform
+def repulsion(pos,strength,distanceMax,cellWidth,rng):
+    n = len(pos)
+    dmax2 = distanceMax*distanceMax
+    #Small graphs are cheaper to solve exactly
+    if n <= 400:
+        d = pos[None,:,:] - pos[:,None,:]
+        l2 = np.maximum((d*d).sum(2),1.0)
+        w = np.where(l2 < dmax2,strength/l2,0)
+        return np.einsum('ijk,ij->ik',d,w)
+    #Cells are widened if the graph spreads over more than 1024 cells a side
+    lo = pos.min(0)
+    h = max(cellWidth,(pos.max(0) - lo).max()/1024)
+    cell = np.floor((pos - lo)/h).astype(int)
+    nx,ny = cell.max(0) + 1
+    cid = cell[:,0]*ny + cell[:,1]
+    count = np.bincount(cid,minlength = nx*ny)
+    #Far field: force of each offset between cells, left out for neighbouring cells, convolved with the node counts
+    R = int(np.ceil(distanceMax/h))
+    o = np.arange(-R,R + 1)
+    ox,oy = np.meshgrid(o,o,indexing = 'ij')
+    l2 = np.maximum((ox*ox + oy*oy)*h*h,1.0)
+    w = np.where((l2 < dmax2) & (np.maximum(abs(ox),abs(oy)) > 1),strength/l2*h,0)
+    shape = (nx + 2*R,ny + 2*R)
+    fcount = np.fft.rfft2(count.reshape(nx,ny).astype(float),shape)
+    force = np.zeros_like(pos)
+    for c,k in enumerate([ox*w,oy*w]):
+        #Correlating counts with the kernel is convolving them with the flipped kernel
+        full = np.fft.irfft2(fcount*np.fft.rfft2(-k,shape),shape)
+        force[:,c] = full[R:R + nx,R:R + ny].ravel()[cid]
+    #Near field between the nodes of each cell and of the cell itself and its upper and right neighbours
+    order = np.argsort(cid,kind = 'stable')
+    start = np.cumsum(count) - count
+    occ = np.nonzero(count)[0]
+    occcell = np.stack([occ//ny,occ % ny],1)
+    a = []
+    b = []
+    for dx,dy in [(0,0),(0,1),(1,-1),(1,0),(1,1)]:
+        nb = occcell + [dx,dy]
+        inside = (nb[:,0] < nx) & (nb[:,1] >= 0) & (nb[:,1] < ny)
+        nbid = nb[inside,0]*ny + nb[inside,1]
+        keep = count[nbid] > 0
+        a.append(occ[inside][keep])
+        b.append(nbid[keep])
+    a = np.concatenate(a)
+    b = np.concatenate(b)
+    #Expand each pair of cells to all pairs of their nodes
+    size = count[a]*count[b]
+    block = np.repeat(np.arange(len(a)),size)
+    t = np.arange(size.sum()) - np.repeat(np.cumsum(size) - size,size)
+    ia = t//count[b][block]
+    ib = t % count[b][block]
+    keep = (a[block] != b[block]) | (ia < ib)
+    i = order[start[a[block]] + ia][keep]
+    j = order[start[b[block]] + ib][keep]
+    d = pos[j] - pos[i]
+    #Separate coincident nodes
+    same = (d == 0).all(1)
+    if same.any():
+        d[same] = (rng.random((same.sum(),2)) - 0.5)*1e-6
+    l2 = np.maximum((d*d).sum(1),1.0)
+    w = np.where(l2 < dmax2,strength/l2,0)
+    for c in range(2):
+        force[:,c] += np.bincount(i,d[:,c]*w,n) - np.bincount(j,d[:,c]*w,n)
+    return force
+
+def forceLayout(graph,cache = None,**params):
+    """
+    Computes a force directed layout of a SAMMI graph, so maps open with nodes already in place. The
+    simulation follows the forces of the SAMMI browser simulation (link distance, node repulsion, and
+    centering) with repulsion approximated on a grid: nodes in neighbouring cells repel each other
+    exactly and farther cells act through their node counts, summed for all cells by a fast Fourier
+    transform. The simulation stops early once nodes settle. Inputs:
+    -graph: graph written by sammi.makeJson, as a string or parsed dictionary.
+    -cache: optional cache object (sammi.cache). Layouts are stored under the graph structure and
+    parameters, so the layout of a subgraph is only computed once.
+    -params: simulation parameters overriding DEFAULTS: iterations, distance (link length), charge
+    (node repulsion), center (centering strength), decay (velocity decay), distanceMax (repulsion cutoff),
+    cellWidth (width of the grid cells), and tolerance (mean distance moved by nodes in an iteration below
+    which the simulation stops, 0 to run every iteration).
+    Returns a dictionary with the x and y coordinates of each node, centered on zero, in the node order
+    of the browser (metabolites first and then reactions).
+    """
+    for f in params:
+        if f not in DEFAULTS:
+            raise Exception('Unknown layout parameter ' + f)
+    params = dict(DEFAULTS,**params)
+    ids,source,target = graphLinks(graph)
+    if cache is not None:
+        key = hashlib.sha1(json.dumps([ids,source.tolist(),target.tolist(),sorted(params.items())]).encode('utf-8')).hexdigest()
+        out = cache.get(key)
+        if out is not None:
+            return out
+    n = len(ids)
+    rng = np.random.default_rng(0)
+    #Initial phyllotaxis arrangement, as in d3
+    i = np.arange(n)
+    radius = 10*np.sqrt(0.5 + i)
+    angle = i*np.pi*(3 - np.sqrt(5))
+    pos = np.stack([radius*np.cos(angle),radius*np.sin(angle)],1)
+    vel = np.zeros_like(pos)
+    #Link strength and bias by node degree, as in d3
+    degree = np.bincount(source,minlength = n) + np.bincount(target,minlength = n)
+    lstrength = 1/np.minimum(degree[source],degree[target]) if len(source) > 0 else np.zeros(0)
+    bias = degree[source]/(degree[source] + degree[target]) if len(source) > 0 else np.zeros(0)
+    alpha = 1.0
+    alphaDecay = 1 - 0.001**(1/max(params['iterations'],1))
+    for it in range(params['iterations'] if n > 1 else 0):
+        alpha += -alpha*alphaDecay
+        #Links
+        d = pos[target] + vel[target] - pos[source] - vel[source]
+        l = np.maximum(np.sqrt((d*d).sum(1)),1e-6)
+        d *= ((l - params['distance'])/l*alpha*lstrength)[:,None]
+        for j in range(2):
+            vel[:,j] -= np.bincount(target,d[:,j]*bias,n)
+            vel[:,j] += np.bincount(source,d[:,j]*(1 - bias),n)
+        #Repulsion
+        vel += repulsion(pos,-params['charge'],params['distanceMax'],params['cellWidth'],rng)*alpha
+        #Centering
+        vel -= pos*params['center']*alpha
+        vel *= 1 - params['decay']
+        pos += vel
+        #Stop once nodes have settled, moving less than tolerance on average
+        if np.sqrt((vel*vel).sum(1)).mean() < params['tolerance']:
+            break
+    pos -= pos.mean(0) if n > 0 else 0
+    out = {'x':np.round(pos[:,0],1).tolist(),'y':np.round(pos[:,1],1).tolist()}
+    if cache is not None:
+        cache.put(key,out)
+    return out
@@ -0,0 +1,178 @@
+#Saved SAMMI map files. Maps are parsed once, indexed by reaction and metabolite ID, and reconciled with the model
+#they are plotted with, so maps saved for an earlier version of a model open with the reactions that remain
+import json
+import os
+import sys
+import warnings
+import sammi
+
+#Maps read, keyed on path, with the modification time and size of the file
+_maps = {}
+
+#Fields of map nodes holding the state of the page rather than model values
+_PAGEFIELDS = frozenset(['index','group','secondary','flux','size','trap','concentration','bezi','labelshift','grouping','reversed',
+    'width','class','isfixed','weight','selected','labelarr','x','y','vx','vy','fx','fy','degree','r','previouslySelected'])
+
+#Whether a map node is a reaction of the model. Nodes added in the page, such as collapsed nodes, have no stoichiometry
+def isReaction(d):
+    return d.get('group') == 1 and 'metabolites' in d
+
+#Define saved map class
+class savedmap:
+    """
+    SAMMI map file saved from the browser, indexed by reaction and metabolite ID. Inputs:
+    -state: dictionary read from the map file.
+    The subgraphs field lists the names of the subgraphs of the map, and the reactions and metabolites fields map
+    each reaction and metabolite ID in the map to the subgraphs holding it. Shelved metabolites are included.
+    """
+    def __init__(self,state):
+        self.state = state
+        self.subgraphs = [k for k,v in state.items() if isinstance(v,dict) and 'nodes' in v and 'links' in v]
+        self.reactions = {}
+        self.metabolites = {}
+        for name in self.subgraphs:
+            g = state[name]
+            for d in g['nodes']:
+                if isReaction(d):
+                    self.reactions.setdefault(d['class'],{})[name] = None
+                elif d.get('group') == 2:
+                    self.metabolites.setdefault(d['class'],{})[name] = None
+            for s in g.get('suspended',[]):
+                self.metabolites.setdefault(s[0],{})[name] = None
+
+def readMap(path):
+    """
+    Returns the SAMMI map saved at path as a sammi.savedmap. The file is parsed once and kept until it changes.
+    """
+    st = os.stat(path)
+    key = os.path.realpath(path)
+    if key not in _maps or _maps[key][0] != (st.st_mtime,st.st_size):
+        with open(path,encoding = 'utf-8') as f:
+            _maps[key] = ((st.st_mtime,st.st_size),savedmap(json.load(f)))
+    return _maps[key][1]
+
+#Copy of a subgraph of a saved map without the reactions in gone, and with the fields of its nodes updated from the model.
+#Links point to their nodes by index only, instead of holding copies of them. Reactions whose metabolites changed are added to changed
+#fields holds the fields written for reactions and for metabolites
+def reconcileGraph(g,model,gone,changed,fields = None):
+    nodes = g['nodes']
+    keep = [not (isReaction(d) and d['class'] in gone) for d in nodes]
+    removed = set(d['id'] for d,k in zip(nodes,keep) if not k)
+    if len(removed) > 0:
+        #Metabolites only linked to removed reactions are removed with them
+        linked = set()
+        orphan = set()
+        for l in g['links']:
+            s,t = l['source']['index'],l['target']['index']
+            if keep[s] and keep[t]:
+                linked.update((s,t))
+            else:
+                orphan.update(i for i in (s,t) if keep[i])
+        for i in orphan - linked:
+            keep[i] = False
+            removed.add(nodes[i]['id'])
+    pos = {}
+    newnodes = []
+    for i,d in enumerate(nodes):
+        if not keep[i]:
+            continue
+        pos[i] = len(newnodes)
+        d = dict(d)
+        d['index'] = len(newnodes)
+        if model is not None:
+            updateNode(d,model,changed,fields)
+        newnodes.append(d)
+    newlinks = []
+    for l in g['links']:
+        s,t = l['source']['index'],l['target']['index']
+        if s in pos and t in pos:
+            l = dict(l)
+            l['index'] = len(newlinks)
+            l['source'] = {'index':pos[s]}
+            l['target'] = {'index':pos[t]}
+            newlinks.append(l)
+    out = dict(g)
+    out['nodes'] = newnodes
+    out['links'] = newlinks
+    #Shelved metabolites no longer link to removed reactions
+    if len(removed) > 0:
+        out['suspended'] = [[s[0]] + [f for f in s[1:-1] if f[:-1] not in removed] + [s[-1]] for s in g.get('suspended',[])]
+    return out
+
+#Update the model fields of a reaction or metabolite node, keeping its coordinates and page state
+def updateNode(d,model,changed,fields):
+    if isReaction(d):
+        objs,fields = model.reactions,fields[0]
+    elif d.get('group') == 2:
+        objs,fields = model.metabolites,fields[1]
+    else:
+        return
+    if d['class'] not in objs:
+        return
+    obj = objs.get_by_id(d['class'])
+    for f,v in zip(fields,sammi.nodeValues(obj,fields)):
+        if f not in _PAGEFIELDS:
+            d[f] = float('nan') if v is None else v
+    if objs is model.reactions:
+        stoich = {m.id:v for m,v in obj.metabolites.items()}
+        if set(stoich) != set(d['metabolites']):
+            changed[obj.id] = None
+        d['metabolites'] = stoich
+
+def reconcileMap(smap,model = None):
+    """
+    Reconciles a saved SAMMI map with a model. Returns a copy of the map and a report. Inputs:
+    -smap: saved map (sammi.readMap) or path of a map file.
+    -model: COBRA model. Default None (the map is only made compact).
+    Reactions no longer in the model are removed from the map, with the metabolites only linked to them. The other
+    reactions and metabolites keep their saved coordinates and take the names, bounds, and other fields of the model.
+    The report lists the reactions 'removed', the reactions of the model not in the map ('added'), and the reactions
+    whose metabolites changed since the map was saved ('changed'). Links of the copy refer to their nodes by index,
+    which is all the browser reads of them. The saved map is not modified.
+    """
+    if isinstance(smap,str):
+        smap = readMap(smap)
+    if model is not None:
+        removed = [r for r in smap.reactions if r not in model.reactions]
+        added = [r.id for r in model.reactions if r.id not in smap.reactions]
+        #Nodes take the fields written for the model, those of its first reaction and metabolite
+        fields = tuple(sammi.getFields(objs[0]) if len(objs) > 0 else () for objs in [model.reactions,model.metabolites])
+    else:
+        removed,added = [],[]
+        fields = None
+    gone = set(removed)
+    changed = {}
+    state = dict(smap.state)
+    for name in smap.subgraphs:
+        state[name] = reconcileGraph(smap.state[name],model,gone,changed,fields)
+    #Selections refer to node positions, which change when nodes are removed
+    if len(removed) > 0:
+        state['selected'] = []
+    return savedmap(state),{'removed':removed,'added':added,'changed':list(changed)}
+
+#Warn that a map differs from the model it is plotted with, listing the first reactions removed, added, and changed
+def warnReport(path,report,shown = 10):
+    parts = []
+    for k,text in [('removed','removed from the map, not in the model'),('added','in the model, not in the map'),
+        ('changed','with metabolites changed since the map was saved')]:
+        ids = report[k]
+        if len(ids) > 0:
+            parts.append(str(len(ids)) + ' reactions ' + text + ': ' + ', '.join(ids[:shown]) + (' and ' + str(len(ids) - shown) + ' more' if len(ids) > shown else ''))
+    if len(parts) > 0:
+        #Point the warning at the first caller outside the package, such as the call to sammi.plot
+        root = os.path.dirname(os.path.realpath(__file__)) + os.sep
+        frame = sys._getframe(1)
+        level = 2
+        while frame is not None and os.path.realpath(frame.f_code.co_filename).startswith(root):
+            frame = frame.f_back
+            level += 1
+        warnings.warn('Map ' + path + ' does not match the model. ' + '. '.join(parts) + '. Use sammi.reconcileMap for the full report',stacklevel = level)
+
+#Check that each data object maps onto reactions or metabolites of the map
+def checkData(smap,datat):
+    if isinstance(datat,sammi.data):
+        datat = [datat]
+    for dat in datat:
+        ids = smap.metabolites if dat.group == 'metabolites' else smap.reactions
+        if len(dat.ids) > 0 and not any(f in ids for f in dat.ids):
+            raise Exception('None of the ' + dat.group + ' of the ' + dat.kind + ' data are in the map')
@@ -0,0 +1,142 @@
+#Flux panels: solve a list of perturbations of a model and turn the fluxes into parsers or data for sammi.plot
+import concurrent.futures
+import numpy as np
+import sammi
+
+#Define a perturbation of the model
+class perturbation:
+    """
+    Changes made to the model before solving one condition of a flux panel. Inputs:
+    -name: name of the condition, used as subgraph or condition name.
+    -knockouts: list of reaction IDs to knock out. Default [].
+    -objective: reaction ID, or dictionary of reaction IDs and coefficients, to be set as objective. Default None (keep the model objective).
+    -direction: 'max' or 'min'. Direction of the objective. Default None (keep the model direction).
+    -bounds: dictionary of reaction IDs and (lower, upper) bound pairs. Default {}.
+    """
+    def __init__(self,name,knockouts = [],objective = None,direction = None,bounds = {}):
+        if direction not in [None,'max','min']:
+            raise Exception('Perturbation direction must be \'max\' or \'min\'')
+        self.name = name
+        self.knockouts = knockouts
+        self.objective = objective
+        self.direction = direction
+        self.bounds = bounds
+
+    def apply(self,model):
+        """
+        Applies the perturbation to model. Use inside a with model: block to revert it.
+        """
+        for r,b in self.bounds.items():
+            model.reactions.get_by_id(r).bounds = b
+        for r in self.knockouts:
+            model.reactions.get_by_id(r).knock_out()
+        if isinstance(self.objective,dict):
+            model.objective = {model.reactions.get_by_id(r):v for r,v in self.objective.items()}
+        elif self.objective is not None:
+            model.objective = self.objective
+        if self.direction is not None:
+            model.objective_direction = self.direction
+
+#Solve one perturbation, returning the objective value and the fluxes in the order of model.reactions
+def solve(model,p,method = 'pfba'):
+    from cobra.exceptions import OptimizationError
+    from cobra.flux_analysis import pfba
+    from cobra.flux_analysis.loopless import loopless_solution
+    with model:
+        if p is not None:
+            p.apply(model)
+        sol = model.optimize()
+        if sol.status != 'optimal':
+            return float('nan'),np.full(len(model.reactions),np.nan)
+        try:
+            if method == 'pfba':
+                flux = pfba(model).fluxes
+            elif method == 'loopless':
+                flux = loopless_solution(model,fluxes = sol.fluxes).fluxes
+            else:
+                flux = sol.fluxes
+        except OptimizationError:
+            return float('nan'),np.full(len(model.reactions),np.nan)
+        return sol.objective_value,flux.values.astype(float)
+
+#Model of the worker processes
+_panelmodel = None
+
+def _initPanel(model):
+    global _panelmodel
+    _panelmodel = model
+
+def _solvePanel(p,method):
+    return solve(_panelmodel,p,method)
+
+#Solve perturbations in order, in this process or in a pool of worker processes
+def solveAll(model,perturbations,method = 'pfba',processes = None):
+    """
+    Yields the objective value and fluxes of each perturbation, in order. Inputs:
+    -model: COBRA model. Perturbations are reverted after solving, so the model is not modified.
+    -perturbations: list of sammi.perturbation objects.
+    -method: 'fba', 'pfba', or 'loopless'. Default 'pfba'.
+    -processes: number of worker processes. Each worker receives a copy of the model once. Default None (solve in this process).
+    """
+    if method not in ['fba','pfba','loopless']:
+        raise Exception('Method must be \'fba\', \'pfba\', or \'loopless\'')
+    if processes is None or processes <= 1:
+        for p in perturbations:
+            yield solve(model,p,method)
+        return
+    with concurrent.futures.ProcessPoolExecutor(processes,initializer = _initPanel,initargs = (model,)) as pool:
+        chunk = max(1,len(perturbations)//(4*processes))
+        yield from pool.map(_solvePanel,perturbations,[method]*len(perturbations),chunksize = chunk)
+
+#Difference to the wild type and thresholding, on a matrix with one row per perturbation
+def panelValues(flux,obj,wild = None,difference = False,threshold = 1e-3):
+    """
+    Returns the values plotted for fluxes flux (perturbations by reactions) with objective values obj.
+    With difference True the values are wild type minus perturbed fluxes, and with 'scaled' the wild
+    type fluxes wild = (objective, fluxes) are first scaled by the ratio of objective values. Values
+    with absolute value below threshold are set to zero.
+    """
+    flux = np.atleast_2d(flux)
+    if difference:
+        ref = np.tile(wild[1],(flux.shape[0],1))
+        if difference == 'scaled':
+            with np.errstate(divide = 'ignore',invalid = 'ignore'):
+                ref = ref*(np.asarray(obj,dtype = float)/wild[0])[:,None]
+        flux = ref - flux
+    return np.where(np.abs(flux) < threshold,0.0,flux)
+
+def fluxPanel(model,perturbations,method = 'pfba',threshold = 1e-3,difference = False,processes = None,showObjective = False):
+    """
+    Solves each perturbation and yields a sammi.parser object with the reactions carrying flux, in order,
+    so they can be collected into a list for sammi.plot. Inputs:
+    -model: COBRA model. The model is not modified.
+    -perturbations: list of sammi.perturbation objects.
+    -method: 'fba', 'pfba', or 'loopless'. Default 'pfba'.
+    -threshold: reactions with absolute values below threshold are left out. Default 1e-3.
+    -difference: False, True, or 'scaled'. Plot the difference with the unperturbed model instead of the fluxes. See panelValues. Default False.
+    -processes: number of worker processes. Default None (solve in this process).
+    -showObjective: append the objective value to the subgraph names. Default False.
+    Knocked out reactions are always included, with NaN values.
+    """
+    ids = np.array([r.id for r in model.reactions])
+    wild = solve(model,None,method) if difference else None
+    for p,(obj,flux) in zip(perturbations,solveAll(model,perturbations,method,processes)):
+        vals = panelValues(flux,[obj],wild,difference,threshold)[0]
+        vals[np.isin(ids,p.knockouts)] = np.nan
+        keep = (vals != 0) & (~np.isnan(flux) | np.isin(ids,p.knockouts))
+        name = p.name + (' - ' + str(round(obj,4)) if showObjective else '')
+        yield sammi.parser(name,list(ids[keep]),list(vals[keep]))
+
+def fluxData(model,perturbations,method = 'pfba',threshold = 1e-3,difference = False,processes = None,kind = 'color'):
+    """
+    Solves each perturbation and returns a sammi.data object with one condition per perturbation, mapped
+    onto all reactions of the model. Inputs are as in sammi.fluxPanel, plus:
+    -kind: 'color' or 'size'. Default 'color'.
+    Values below threshold are set to zero, and reactions of infeasible perturbations are NaN.
+    """
+    wild = solve(model,None,method) if difference else None
+    res = list(solveAll(model,perturbations,method,processes))
+    obj = np.array([r[0] for r in res],dtype = float)
+    flux = np.array([r[1] for r in res],dtype = float).reshape(len(res),len(model.reactions))
+    vals = panelValues(flux,obj,wild,difference,threshold)
+    return sammi.data('reactions',kind,vals.T,[r.id for r in model.reactions],[p.name for p in perturbations])
@@ -0,0 +1,60 @@
+#Timing of the stages of sammi.plot, recorded when the profile field of sammi.options is given.
+#Stages are recorded by the functions writing the page, and cost nothing but a check when no plot is being profiled
+import time
+from contextlib import contextmanager
+
+#Stages of the plot being profiled, function called with each stage, and start time. None when not profiling
+_stages = None
+_hook = None
+_start = None
+
+def start(hook = None):
+    global _stages,_hook,_start
+    _stages,_hook,_start = [],hook,time.perf_counter()
+
+def active():
+    return _stages is not None
+
+#Stop profiling, returning the report of the stages recorded with the given fields added
+def finish(**fields):
+    global _stages,_hook,_start
+    report = {'stages':_stages,'seconds':time.perf_counter() - _start}
+    report.update(fields)
+    _stages,_hook,_start = None,None,None
+    return report
+
+@contextmanager
+def stage(name,out = None,**counts):
+    """
+    Records the time of the code run in the block as a stage of the plot being profiled. Inputs:
+    -name: name of the stage.
+    -out: optional buffer the stage writes to. The number of characters written to it is recorded as bytes.
+    -counts: numbers of objects handled by the stage, recorded with it. More can be added to the dictionary
+    returned by the block.
+    """
+    rec = {'stage':name}
+    rec.update(counts)
+    if _stages is None:
+        yield rec
+        return
+    size = out.tell() if out is not None else None
+    t = time.perf_counter()
+    yield rec
+    rec['seconds'] = time.perf_counter() - t
+    if size is not None:
+        rec['bytes'] = out.tell() - size
+    _stages.append(rec)
+    if _hook is not None:
+        _hook(rec)
+
+def summary(report):
+    """
+    Returns a report returned by sammi.plot as a table of text, with one line per stage and the total
+    time and size of the page.
+    """
+    lines = ['%-12s %10s %12s  %s' % ('stage','time (s)','bytes','counts')]
+    for rec in report['stages']:
+        counts = ', '.join(str(k) + ' ' + str(v) for k,v in rec.items() if k not in ['stage','seconds','bytes'])
+        lines.append('%-12s %10.4f %12s  %s' % (rec['stage'],rec['seconds'],rec.get('bytes',''),counts))
+    lines.append('%-12s %10.4f %12s' % ('total',report['seconds'],report.get('bytes','')))
+    return '\n'.join(lines)
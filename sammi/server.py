@@ -0,0 +1,393 @@
+#Live sessions: a local HTTP and WebSocket server showing a visualization and pushing changes to the open page
+import asyncio
+import base64
+import copy
+import hashlib
+import io
+import mimetypes
+import os
+import secrets
+import shutil
+import struct
+import tempfile
+import threading
+import urllib.parse
+import webbrowser
+import numpy as np
+import sammi
+
+#Key suffix of the WebSocket handshake
+_WSGUID = '258EAFA5-E914-47DA-95CA-C5AB0DC85B11'
+
+#Encode a WebSocket frame sent by the server. Server frames are not masked
+def makeFrame(payload,opcode = 0x1):
+    if isinstance(payload,str):
+        payload = payload.encode('utf-8')
+    n = len(payload)
+    if n < 126:
+        head = struct.pack('!BB',0x80 | opcode,n)
+    elif n < 65536:
+        head = struct.pack('!BBH',0x80 | opcode,126,n)
+    else:
+        head = struct.pack('!BBQ',0x80 | opcode,127,n)
+    return head + payload
+
+#Encode conditions appended to a data layer as a binary frame: the length of a JSON header, the header, padding to
+#eight bytes, and the values of each condition as little-endian float64
+def makeColumnFrame(group,kind,names,values,follow = True):
+    head = sammi._encoder.encode({'group':group,'kind':kind,'names':names,'rows':values.shape[0],'follow':follow}).encode('utf-8')
+    pad = -(4 + len(head)) % 8
+    return makeFrame(struct.pack('<I',len(head)) + head + bytes(pad) + np.ascontiguousarray(values.T,dtype = '<f8').tobytes(),0x2)
+
+#Read a WebSocket message sent by the browser, joining fragments. Returns the opcode and the unmasked payload
+async def readFrame(reader):
+    opcode = None
+    data = b''
+    while True:
+        b0,b1 = await reader.readexactly(2)
+        n = b1 & 0x7f
+        if n == 126:
+            n = struct.unpack('!H',await reader.readexactly(2))[0]
+        elif n == 127:
+            n = struct.unpack('!Q',await reader.readexactly(8))[0]
+        mask = await reader.readexactly(4) if b1 & 0x80 else bytes(4)
+        payload = await reader.readexactly(n)
+        payload = bytes(b ^ mask[i % 4] for i,b in enumerate(payload))
+        #Control frames can come between fragments
+        if b0 & 0x0f >= 0x8:
+            return b0 & 0x0f,payload
+        if b0 & 0x0f:
+            opcode = b0 & 0x0f
+        data += payload
+        if b0 & 0x80:
+            return opcode,data
+
+#Define a live session
+class session:
+    """
+    Local server showing a visualization in the browser. Changes are pushed to the open page over a
+    WebSocket, so the page is not written and reloaded for every change. Inputs:
+    -port: port to listen on. Default 0 (any free port).
+    -host: address to listen on. Default '127.0.0.1' (this machine only).
+    -batch: number of conditions appended by appendCondition sent together. Default 32.
+    -interval: seconds after which appended conditions are sent even if the batch is not full. Default 0.2.
+    -replay: number of the last conditions appended to each data layer replayed to reloaded pages. Default 1000.
+    Pages and data files are written to a temporary folder, removed by close(). SAMMI scripts and
+    images are served from the package. Changes pushed to a page are replayed when it is reloaded. Data
+    sent for a layer replaces the changes previously sent for it, and conditions appended to a layer are
+    replayed as a single message.
+    """
+    def __init__(self,port = 0,host = '127.0.0.1',batch = 32,interval = 0.2,replay = 1000):
+        self.host = host
+        self.batch = batch
+        self.interval = interval
+        self.replay = replay
+        self.folder = tempfile.mkdtemp(prefix = 'sammi_')
+        self.browser = os.path.join(sammi.__path__[0],'browser')
+        self.token = secrets.token_hex(16)
+        self.model = None
+        self.opts = None
+        self.pushes = 0
+        self.clients = set()
+        self.connections = set()
+        #Changes replayed to pages opened later, as the layers they set and their message. Conditions appended
+        #to a layer are kept in appended, as names, values, and follow, and have no message in the log
+        self.log = []
+        self.appended = {}
+        self.files = {}
+        #Appended conditions waiting to be sent, by layer
+        self.pending = {}
+        self.pendinglock = threading.Lock()
+        self.timer = None
+        self.sendlock = None
+        #Listen in this thread so errors such as a busy port are raised here, then serve from a background thread
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(asyncio.start_server(self._handle,host,port))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.url = 'http://' + host + ':' + str(self.port) + '/'
+        self.thread = threading.Thread(target = self.loop.run_forever,daemon = True)
+        self.thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self,*args):
+        self.close()
+
+    def plot(self,model,parsert = [],datat = [],secondaries = [],opts = None):
+        """
+        Writes a visualization, as in sammi.plot, and opens it from the server. If a page of the session is
+        open it is reloaded instead. The model is kept to push subgraphs later. Inputs are as in sammi.plot.
+        """
+        opts = copy.copy(opts) if opts is not None else sammi.options()
+        self.model = model
+        self.opts = opts
+        #The model graph is served as a separate script, cached by the browser and used for subgraphs pushed later
+        shared = sammi.writeModelScript(model,self.folder,opts.layout and isinstance(parsert,list) and len(parsert) == 0)
+        load = opts.load
+        opts.load = False
+        opts.jscode = 'connectSession(' + sammi._encoder.encode(self.socketUrl()) + ');\n' + opts.jscode
+        sammi.writePage(model,parsert,datat,secondaries,opts,self.folder,shared,self.browser)
+        if self._call(self._reload(self.url + opts.htmlName)) == 0 and load:
+            webbrowser.open(self.url + opts.htmlName)
+
+    def socketUrl(self):
+        return 'ws://' + self.host + ':' + str(self.port) + '/session?token=' + self.token
+
+    def addData(self,datat):
+        """
+        Sends data objects (sammi.data) to the open page. Each replaces the data of its group and kind.
+        """
+        self._check()
+        self.pushes += 1
+        out = io.StringIO()
+        sammi.writeData(out,datat,self.opts,self.folder,os.path.splitext(self.opts.htmlName)[0] + '_push' + str(self.pushes) + '_data')
+        self._call(self._push(out.getvalue(),frozenset((d.group,d.kind) for d in datat)))
+
+    def addSubgraphs(self,parsert):
+        """
+        Sends subgraphs to the open page. parsert is a list of parser objects (sammi.parser) or the name of
+        a reaction or metabolite field, as in sammi.plot. Subgraphs with existing names are replaced.
+        """
+        self._check()
+        if isinstance(parsert,str):
+            parsert = [sammi.parser(k,v) for k,v in sammi.groupBy(self.model,parsert).items()]
+        mets = list(self.model.metabolites) if self.opts.layout else None
+        self.run('addParsedSubgraphs(' + sammi.makeParseIndex(parsert,list(self.model.reactions),mets) + ');')
+
+    def shelve(self,secondaries):
+        """
+        Shelves metabolites matching any of the regular expressions in secondaries in the open page. Sets of
+        metabolite IDs can also be given, as in sammi.plot.
+        """
+        self._check()
+        out = io.StringIO()
+        sammi.writeSecondaries(out,self.model,[],secondaries)
+        self.run(out.getvalue())
+
+    def appendCondition(self,layer,name,values,follow = True):
+        """
+        Appends a condition to a data layer of the open page, for instance each step of a dynamic simulation.
+        Only the new values are sent, and the page updates its condition list and value ranges without reading
+        the previous conditions again. Conditions are sent in binary batches, and this call waits while the
+        page has not received previous batches. Inputs:
+        -layer: data object (sammi.data) plotted or sent in this session.
+        -name: name of the condition.
+        -values: values matching the ids of layer. NaN values are unmapped.
+        -follow: if the last condition is shown, show the new one. Default True.
+        """
+        self._check()
+        values = np.asarray(values,dtype = float)
+        if values.shape != (len(layer.ids),):
+            raise Exception('Number of values do not match the ids of the layer')
+        with self.pendinglock:
+            key = (layer.group,layer.kind,follow)
+            if key not in self.pending:
+                self.pending[key] = ([],[])
+            self.pending[key][0].append(str(name))
+            self.pending[key][1].append(values)
+            full = sum(len(v[0]) for v in self.pending.values()) >= self.batch
+            if not full and self.timer is None:
+                self.timer = self.loop.call_soon_threadsafe(self._startTimer)
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Sends the appended conditions waiting to be sent.
+        """
+        self._call(self._push(None))
+
+    def run(self,jscode):
+        """
+        Runs javascript code in the open pages of the session, and in pages opened or reloaded later.
+        """
+        self._call(self._push(jscode))
+
+    def close(self):
+        """
+        Stops the server and removes the session folder.
+        """
+        if self.loop.is_closed():
+            return
+        self.flush()
+        self._call(self._shutdown())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        shutil.rmtree(self.folder,ignore_errors = True)
+
+    def _check(self):
+        if self.model is None:
+            raise Exception('Plot a model in the session before sending changes')
+
+    #Run a coroutine in the server thread and wait for its result
+    def _call(self,coro):
+        return asyncio.run_coroutine_threadsafe(coro,self.loop).result()
+
+    #Send appended conditions and a message to all pages, keeping them to bring pages opened later up to date.
+    #layers are the data layers the message replaces. Messages are sent one at a time, so each waits for slow
+    #pages to receive the previous ones
+    async def _push(self,message,layers = frozenset()):
+        if self.sendlock is None:
+            self.sendlock = asyncio.Lock()
+        async with self.sendlock:
+            with self.pendinglock:
+                pending = self.pending
+                self.pending = {}
+                if self.timer is not None:
+                    self.timer.cancel()
+                    self.timer = None
+            frames = []
+            for (g,k,f),v in pending.items():
+                values = np.stack(v[1],1)
+                frames.append(makeColumnFrame(g,k,v[0],values,f))
+                self._keepConditions((g,k),v[0],values,f)
+            if message is not None:
+                frames.append(makeFrame(message))
+                self._keepMessage(frames[-1],layers)
+            for frame in frames:
+                await self._send(frame)
+
+    #Keep a message for replay. Messages setting only the layers of this one, and conditions appended to them, are replaced
+    def _keepMessage(self,frame,layers):
+        if layers:
+            self.log = [e for e in self.log if not (e[0] and e[0] <= layers)]
+            for key in layers:
+                self.appended.pop(key,None)
+        self.log.append((layers,frame))
+
+    #Keep the last conditions appended to a layer for replay, in place of the batches sent
+    def _keepConditions(self,key,names,values,follow):
+        if key not in self.appended:
+            self.appended[key] = [[],np.zeros((values.shape[0],0)),follow]
+            self.log.append((frozenset([key]),None))
+        kept = self.appended[key]
+        kept[0] = (kept[0] + names)[-self.replay:] if self.replay > 0 else []
+        kept[1] = np.concatenate([kept[1],values],1)[:,kept[1].shape[1] + values.shape[1] - len(kept[0]):]
+        kept[2] = follow
+
+    #Messages bringing a page opened later up to date
+    def _replayFrames(self):
+        frames = []
+        for layers,frame in self.log:
+            if frame is None:
+                key = next(iter(layers))
+                names,values,follow = self.appended[key]
+                if names:
+                    frames.append(makeColumnFrame(key[0],key[1],names,values,follow))
+            else:
+                frames.append(frame)
+        return frames
+
+    def _startTimer(self):
+        with self.pendinglock:
+            self.timer = self.loop.call_later(self.interval,lambda: self.loop.create_task(self._push(None)))
+
+    async def _send(self,frame):
+        for w in list(self.clients):
+            w.write(frame)
+        for w in list(self.clients):
+            try:
+                await w.drain()
+            except ConnectionError:
+                self.clients.discard(w)
+
+    #Point open pages to a new page. Returns the number of open pages
+    async def _reload(self,url):
+        self.log = []
+        self.appended = {}
+        with self.pendinglock:
+            self.pending = {}
+        await self._send(makeFrame('window.location.replace(' + sammi._encoder.encode(url) + ');'))
+        return len(self.clients)
+
+    async def _shutdown(self):
+        self.server.close()
+        for w in list(self.clients):
+            w.write(makeFrame(struct.pack('!H',1001),0x8))
+        for w in list(self.connections):
+            w.close()
+
+    #Handle a connection: HTTP requests, kept alive, or a WebSocket
+    async def _handle(self,reader,writer):
+        self.connections.add(writer)
+        try:
+            while True:
+                lines = (await reader.readuntil(b'\r\n\r\n')).decode('latin-1').split('\r\n')
+                method,target = lines[0].split(' ')[:2]
+                headers = {k.strip().lower():v.strip() for k,v in (f.split(':',1) for f in lines[1:] if ':' in f)}
+                url = urllib.parse.urlsplit(target)
+                if headers.get('upgrade','').lower() == 'websocket':
+                    await self._socket(reader,writer,url,headers)
+                    return
+                await self._serve(writer,method,url.path,headers)
+                if headers.get('connection','').lower() == 'close':
+                    return
+        except (asyncio.IncompleteReadError,asyncio.LimitOverrunError,ConnectionError,ValueError):
+            pass
+        finally:
+            self.connections.discard(writer)
+            writer.close()
+
+    #Find a file in the session folder or in the SAMMI browser folder
+    def _resolve(self,path):
+        name = urllib.parse.unquote(path).lstrip('/')
+        for root in [self.folder,self.browser]:
+            root = os.path.realpath(root)
+            f = os.path.realpath(os.path.join(root,name))
+            if f.startswith(root + os.sep) and os.path.isfile(f):
+                return f
+        return None
+
+    #Serve a file. Files are kept in memory until modified, and revalidated by the browser with their ETag
+    async def _serve(self,writer,method,path,headers):
+        f = self._resolve(path) if method in ['GET','HEAD'] else None
+        if f is None:
+            writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n')
+            await writer.drain()
+            return
+        st = os.stat(f)
+        tag = '"' + str(st.st_mtime_ns) + '-' + str(st.st_size) + '"'
+        if f not in self.files or self.files[f][0] != tag:
+            with open(f,'rb') as fin:
+                self.files[f] = (tag,fin.read())
+        body = self.files[f][1]
+        ctype = mimetypes.guess_type(f)[0] or 'application/octet-stream'
+        if ctype.startswith('text/') or ctype.endswith('javascript') or ctype.endswith('json'):
+            ctype += '; charset=utf-8'
+        #Model scripts are named after their content and never change
+        cache = 'max-age=31536000, immutable' if os.path.basename(f).startswith('sammimodel.') else 'no-cache'
+        if headers.get('if-none-match') == tag:
+            writer.write(('HTTP/1.1 304 Not Modified\r\nETag: ' + tag + '\r\nCache-Control: ' + cache + '\r\n\r\n').encode())
+        else:
+            writer.write(('HTTP/1.1 200 OK\r\nContent-Type: ' + ctype + '\r\nContent-Length: ' + str(len(body)) +
+                '\r\nETag: ' + tag + '\r\nCache-Control: ' + cache + '\r\n\r\n').encode())
+            if method == 'GET':
+                writer.write(body)
+        await writer.drain()
+
+    #Accept a WebSocket from a page of the session, send it the changes made since the page was written, and answer control frames
+    async def _socket(self,reader,writer,url,headers):
+        if url.path != '/session' or urllib.parse.parse_qs(url.query).get('token') != [self.token] or 'sec-websocket-key' not in headers:
+            writer.write(b'HTTP/1.1 403 Forbidden\r\nContent-Length: 0\r\n\r\n')
+            await writer.drain()
+            return
+        accept = base64.b64encode(hashlib.sha1((headers['sec-websocket-key'] + _WSGUID).encode('ascii')).digest()).decode('ascii')
+        writer.write(('HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\nSec-WebSocket-Accept: ' + accept + '\r\n\r\n').encode())
+        for frame in self._replayFrames():
+            writer.write(frame)
+        self.clients.add(writer)
+        try:
+            await writer.drain()
+            while True:
+                opcode,payload = await readFrame(reader)
+                if opcode == 0x8:
+                    writer.write(makeFrame(payload[:2],0x8))
+                    await writer.drain()
+                    return
+                elif opcode == 0x9:
+                    writer.write(makeFrame(payload,0xA))
+                    await writer.drain()
+        finally:
+            self.clients.discard(writer)
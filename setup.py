@@ -1,6 +1,7 @@
 #Uploading the package
 #Remove build,dist,sammi.egg-info
 #Define new version
+#python -c "import sammi; sammi.bundle(folder = sammi.assets.packageFolder())" #Ships the offline assets in browser/vendor
 #python setup.py sdist bdist_wheel #Writes the package
 #python -m twine upload dist/* #Uploads
 import setuptools
@@ -19,7 +20,8 @@ setuptools.setup(
     url="https://github.com/schultzdre/SAMMIpy.git",
     packages=setuptools.find_packages(),
     include_package_data=True,
-    package_data={'sammi': ['sammi.py','browser/demo.json','browser/helpfunctions.js','browser/index.html','browser/index_load.html','browser/sammi.css','browser/simulationfunctions.js','browser/uploaddownload.js']},
+    entry_points={'console_scripts': ['sammi=sammi.cli:main']},
+    package_data={'sammi': ['sammi.py','browser/vendor/*','browser/demo.json','browser/helpfunctions.js','browser/index.html','browser/index_load.html','browser/sammi.css','browser/simulationfunctions.js','browser/uploaddownload.js','browser/workersimulation.js','browser/canvasrender.js','browser/profiling.js']},
     classifiers=[
         "Programming Language :: Python :: 3",
         "License :: OSI Approved :: MIT License",
@@ -0,0 +1,161 @@
+#Checks of the Python side of SAMMI: the model is left unchanged, graphs match the previous serializer, data blocks
+#decode to the data written, and saved maps are reconciled with the model. Run from the repository root with: python -m pytest
+import base64
+import io
+import json
+import os
+import re
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0,os.path.join(os.path.dirname(os.path.realpath(__file__)),'..'))
+import sammi
+
+cobra = pytest.importorskip('cobra')
+sp = pytest.importorskip('scipy.sparse')
+
+DEMO = os.path.join(os.path.dirname(os.path.realpath(sammi.__file__)),'browser','demo.json')
+
+@pytest.fixture(scope = 'module')
+def model():
+    return sammi.testModel('textbook')
+
+#State of a model that writing a page must not change
+def modelState(model):
+    return ([(r.id,r.bounds,tuple(sorted((m.id,v) for m,v in r.metabolites.items()))) for r in model.reactions],
+        [(m.id,m.name,m.compartment) for m in model.metabolites],len(model.constraints),len(model.variables))
+
+#Argument of the javascript call wrapping a block, such as decodeDataBlock({...})
+def blockArgument(text):
+    return json.loads(re.search(r'\((\{.*\})\)',text).group(1))
+
+#Decode a data block as the browser does, to an array of one row per ID and one column per condition
+def decodeDataBlock(block):
+    n = len(block['ids'])
+    dtype = '<f4' if block['dtype'] == 'float32' else '<f8'
+    vals = np.frombuffer(base64.b64decode(block['values']),dtype = dtype).astype(float).reshape(len(block['conditions']),n)
+    mask = np.unpackbits(np.frombuffer(base64.b64decode(block['mask']),dtype = np.uint8),bitorder = 'little')[:vals.size]
+    vals[mask.reshape(vals.shape).astype(bool)] = np.nan
+    return vals.T
+
+#Decode a sparse data block as the browser does, with the fill value in the entries not stored
+def decodeSparseBlock(block):
+    dtype = '<f4' if block['dtype'] == 'float32' else '<f8'
+    rows = np.frombuffer(base64.b64decode(block['rows']),dtype = '<i4')
+    cols = np.frombuffer(base64.b64decode(block['cols']),dtype = '<i4')
+    vals = np.full((len(block['ids']),len(block['conditions'])),np.nan if block['fill'] is None else block['fill'])
+    vals[rows,cols] = np.frombuffer(base64.b64decode(block['values']),dtype = dtype)
+    return vals
+
+def testPlotLeavesModelUnchanged(model,tmp_path):
+    before = modelState(model)
+    rxns = [r.id for r in model.reactions[:10]]
+    opts = sammi.options(load = False,htmlName = 'unchanged.html')
+    sammi.writePage(model,rxns,[],['^h_'],opts,str(tmp_path))
+    sammi.writePage(model,[sammi.parser('a',rxns[:5]),sammi.parser('b',rxns[5:])],[],[],opts,str(tmp_path))
+    sammi.makeJson(model,rxns)
+    assert modelState(model) == before
+
+def testSubgraphHoldsReactionsAndTheirMetabolites(model):
+    graph = json.loads(sammi.makeJson(model,['PGI','PFK','missing']))
+    #Reactions are written in model order, and IDs not in the model are ignored
+    assert [r['id'] for r in graph['reactions']] == [r.id for r in model.reactions if r.id in ['PFK','PGI']]
+    mets = set(m.id for f in ['PFK','PGI'] for m in model.reactions.get_by_id(f).metabolites)
+    assert set(m['id'] for m in graph['metabolites']) == mets
+
+def testMakeJsonMatchesPreviousImplementation(model):
+    sys.path.insert(0,os.path.join(os.path.dirname(os.path.realpath(__file__)),'..','benchmarks'))
+    from bench_makejson import legacyMakeJson
+    #A model whose first metabolite lacks some fields is written without them, and the next model keeps them
+    odd = model.copy()
+    for f in ['charge','formula','compartment']:
+        setattr(odd.metabolites[0],f,None)
+    for m in [odd,model]:
+        old = json.loads(legacyMakeJson(m))
+        new = json.loads(sammi.makeJson(m))
+        assert json.dumps(new,sort_keys = True) == json.dumps(old,sort_keys = True)
+    assert 'charge' in json.loads(sammi.makeJson(model))['metabolites'][0]
+
+@pytest.mark.parametrize('dtype',['float64','float32'])
+def testBinaryBlockRoundTrip(dtype):
+    rng = np.random.default_rng(0)
+    values = rng.standard_normal((30,4))
+    values[rng.random(values.shape) < 0.2] = np.nan
+    dat = sammi.data('reactions','color',values,['r' + str(i) for i in range(30)],['c' + str(j) for j in range(4)])
+    block = blockArgument(sammi.makeDataBlock(dat,dtype))
+    assert block['ids'] == dat.ids
+    np.testing.assert_allclose(decodeDataBlock(block),values.astype('<f4' if dtype == 'float32' else float),equal_nan = True)
+
+@pytest.mark.parametrize('fill',[0.0,np.nan,2.5])
+def testSparseBlockRoundTrip(fill):
+    rng = np.random.default_rng(1)
+    ids = ['r' + str(i) for i in range(40)]
+    values = np.where(rng.random((40,5)) < 0.2,rng.standard_normal((40,5)),0.0)
+    conditions = ['c' + str(j) for j in range(5)]
+    #A scipy matrix stores its nonzero entries
+    block = blockArgument(sammi.makeSparseBlock(sammi.data('reactions','color',sp.csr_matrix(values),ids,conditions,fill)))
+    np.testing.assert_allclose(decodeSparseBlock(block),np.where(values != 0,values,fill),equal_nan = True)
+    #An (ids, values) pair stores every value of its IDs, in any order
+    rows = [i for i in range(40) if values[i].any()][::-1]
+    block = blockArgument(sammi.makeSparseBlock(sammi.data('reactions','color',([ids[i] for i in rows],values[rows]),ids,conditions,fill)))
+    expected = np.full(values.shape,fill)
+    expected[rows] = values[rows]
+    np.testing.assert_allclose(decodeSparseBlock(block),expected,equal_nan = True)
+
+@pytest.mark.parametrize('sparse',[False,True])
+def testChunkedDataRoundTrip(sparse,tmp_path):
+    rng = np.random.default_rng(2)
+    ids = ['r' + str(i) for i in range(25)]
+    values = np.where(rng.random((25,7)) < 0.3,rng.standard_normal((25,7)),0.0)
+    values[3,2] = np.nan
+    dat = sammi.data('reactions','size',sp.csr_matrix(np.nan_to_num(values)) if sparse else values,ids,['c' + str(j) for j in range(7)])
+    index = blockArgument(sammi.makeDataChunks(dat,sammi.options(chunks = 3),'chunk',str(tmp_path)))
+    assert len(index['chunks']) == 3
+    parts = []
+    for src in index['chunks']:
+        with open(os.path.join(str(tmp_path),src),encoding = 'utf-8') as f:
+            text = f.read()
+        block = blockArgument(text)
+        parts.append(decodeSparseBlock(block) if 'decodeSparseBlock' in text else decodeDataBlock(block))
+    decoded = np.concatenate(parts,1)
+    expected = np.nan_to_num(values) if sparse else values
+    np.testing.assert_allclose(decoded,expected,equal_nan = True)
+    #Ranges of each condition are those of the absolute values, as sizes are read
+    np.testing.assert_allclose(index['min'],np.nanmin(np.abs(expected),0))
+    np.testing.assert_allclose(index['max'],np.nanmax(np.abs(expected),0))
+
+def testReconcileMap(model):
+    smap = sammi.readMap(DEMO)
+    state = json.dumps(smap.state)
+    out,report = sammi.reconcileMap(smap,model)
+    #The saved map is not modified
+    assert json.dumps(smap.state) == state
+    assert set(report['removed']) == set(smap.reactions) - set(r.id for r in model.reactions)
+    assert set(report['added']) == set(r.id for r in model.reactions) - set(smap.reactions)
+    assert len(report['removed']) > 0 and len(report['added']) > 0
+    assert not any(f in out.reactions for f in report['removed'])
+    for name in out.subgraphs:
+        g = out.state[name]
+        n = len(g['nodes'])
+        assert all(d['index'] == i for i,d in enumerate(g['nodes']))
+        assert all(0 <= l['source']['index'] < n and 0 <= l['target']['index'] < n for l in g['links'])
+    #Kept nodes keep their coordinates and take the fields of the model
+    for name in out.subgraphs:
+        saved = {d['id']:d for d in smap.state[name]['nodes']}
+        for d in out.state[name]['nodes']:
+            assert (d.get('x'),d.get('y')) == (saved[d['id']].get('x'),saved[d['id']].get('y'))
+            if d.get('group') == 2 and d['class'] in model.metabolites:
+                assert d['name'] == model.metabolites.get_by_id(d['class']).name
+
+def testReconcileWarnsFromWriteModel(model):
+    with pytest.warns(UserWarning,match = 'does not match the model'):
+        sammi.writeModel(io.StringIO(),model,DEMO,sammi.options())
+
+def testCheckData(model):
+    smap = sammi.readMap(DEMO)
+    rxns = list(smap.reactions)[:3]
+    sammi.maps.checkData(smap,sammi.data('reactions','color',np.ones((3,1)),rxns,['c']))
+    with pytest.raises(Exception,match = 'None of the metabolites'):
+        sammi.maps.checkData(smap,[sammi.data('metabolites','color',np.ones((2,1)),['not_a','not_b'],['c'])])